@@ -1,14 +1,22 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from src.models.board import ConnectFourBoard
-from src.algorithms.minimax import decision
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, NonNegativeInt, ValidationError
+from typing import List, Literal, Optional, Union
+from src.algorithms.search_pool import SearchPool, PoolBusy, SearchDeadlineExceeded, WorkerCrashed
+from src.models.tree_cache import TreeCache
+from src.models.result_cache import ResultCache
+from src import metrics
+import asyncio
+import json
+import numpy as np
+import os
+import time
 import traceback
 import logging
-import numpy as np
 
 # Set up logging
-logging.basicConfig(level=logging.DEBUG)
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"))
 logger = logging.getLogger(__name__)
 
 app = FastAPI()
@@ -21,55 +29,327 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Captured trees, browsed through /ai/tree/{tree_id}/node
+trees = TreeCache()
+
+# Answers by position, so repeated positions skip the search
+# (sized by RESULT_CACHE_SIZE; RESULT_CACHE_MIRROR=1 also matches reflections)
+results = ResultCache.from_env(trees)
+
+# Worker processes the searches run in, started with the first search
+# (sized by SEARCH_WORKERS, SEARCH_MAX_PENDING and SEARCH_DEADLINE_S; with
+# OPENING_BOOK naming a book file, they answer book positions from it)
+pool: Optional[SearchPool] = None
+
+def search_pool() -> SearchPool:
+    global pool
+    if pool is None:
+        pool = SearchPool.from_env()
+    return pool
+
+# Pool and cache gauges on /metrics
+metrics.register_service(lambda: pool, results, trees)
+
+@app.on_event("shutdown")
+def stop_search_pool():
+    if pool is not None:
+        pool.shutdown()
+
+# Search algorithms a request may name
+Algorithm = Literal["minimax", "alphabeta", "pvs", "mtdf", "expectimax"]
+
+# Deepest search a request may ask for: a game lasts at most 42 plies.
+# Algorithm and depth label the search metrics, so both are bounded.
+MAX_DEPTH = 42
+
 class GameState(BaseModel):
     board: list[list[int]]
     current_player: int
-    algorithm: str = "minimax"  # Default to standard minimax
-    depth: int = 4  # Default depth
+    algorithm: Algorithm = "minimax"
+    depth: int = Field(4, ge=1, le=MAX_DEPTH)  # The maximum depth when time_ms is set
+    time_ms: Optional[int] = Field(None, ge=1)  # Time budget for iterative deepening
+    # Search tree to keep for /ai/tree: none, pv (principal variation), full
+    # (for the tree page), or the number of plies below the root
+    tree: Union[Literal["none", "pv", "full"], NonNegativeInt] = "full"
+
+class StreamRequest(GameState):
+    stream_tree: bool = False  # Send the captured tree in chunks before the move
+
+class BatchPosition(GameState):
+    tree: Union[Literal["none", "pv", "full"], NonNegativeInt] = "none"  # Batches rarely need the trees
+
+# Most positions in one /ai/moves/batch request
+MAX_BATCH = 10_000
+
+class BatchRequest(BaseModel):
+    positions: List[BatchPosition] = Field(min_length=1, max_length=MAX_BATCH)
+
+# Nodes per tree message on /ai/move/stream
+TREE_CHUNK_SIZE = 256
+
+def log_search(game_state: GameState, result: dict):
+    """One INFO line with the search's counters."""
+    stats = result["stats"]
+    if stats is None:
+        return
+    logger.info("%s move %s: depth %d, %d nodes, %d leaves, %d cutoffs, %s TT hits, max depth %d, %.3fs",
+                game_state.algorithm, result["move"], stats["depth"], stats["nodes"], stats["leaves"],
+                stats["cutoffs"], stats["table"]["hits"] if "table" in stats else None, stats["max_depth"],
+                stats["elapsed_s"])
+
+def respond(endpoint: str, content) -> JSONResponse:
+    """``content`` as JSON, with its size recorded for /metrics."""
+    response = JSONResponse(content)
+    metrics.RESPONSE_BYTES.labels(endpoint).observe(len(response.body))
+    return response
 
 @app.get("/")
 async def root():
     return {"message": "Connect 4 AI API is running"}
 
 @app.post("/ai/move")
-async def get_ai_move(game_state: GameState):
+async def get_ai_move(game_state: GameState, request: Request):
     try:
-        logger.debug(f"Received game state: {game_state}")
-        
-        # Convert the board state to ConnectFourBoard
-        board = ConnectFourBoard()
-        # Convert list of lists to numpy array
-        board.board = np.array(game_state.board, dtype=int)
-        board.current_player = game_state.current_player
-        
-        logger.debug(f"Created board with current player: {board.current_player}")
-        logger.debug(f"Board state:\n{board}")
-        
-        # Get AI move based on selected algorithm
-        use_alpha_beta = game_state.algorithm == "alphabeta"
-        use_expected_minimax = game_state.algorithm == "expectimax"
-        
-        move, root = decision(
-            state=board,
-            k=game_state.depth,
-            use_alpha_beta=use_alpha_beta,
-            use_expected_minimax=use_expected_minimax
-        )
-        
-        logger.debug(f"AI chose move: {move}")
-        
-        if move == -1:
+        logger.debug("Received %s request for player %d at depth %d", game_state.algorithm,
+                     game_state.current_player, game_state.depth)
+        board = np.array(game_state.board, dtype=int)
+        cached = results.get(board, game_state.current_player, game_state.algorithm, game_state.depth,
+                             game_state.tree)
+        if cached is not None:
+            logger.debug("AI move %d from the result cache", cached["move"])
+            # The stats are those of the search that found the answer
+            response = {"move": cached["move"], "depth": cached["depth"], "score": cached["score"], "cached": True,
+                        "stats": cached["stats"]}
+            if cached["tree_id"] is not None:
+                response["tree_id"] = cached["tree_id"]
+            return respond("move", response)
+
+        # The search runs in a worker process and stops if the client goes away
+        started = time.perf_counter()
+        result = await search_pool().run(game_state.model_dump(), disconnected=request.is_disconnected)
+        metrics.record_search(game_state.algorithm, game_state.depth, time.perf_counter() - started, result)
+        log_search(game_state, result)
+
+        if result["move"] is None:
+            if result["cancelled"]:
+                raise HTTPException(status_code=499, detail="Client closed the request")
             raise HTTPException(status_code=400, detail="No valid moves available")
-            
-        return {
+        move = result["move"]
+
+        response = {
             "move": move,
-            "root": root.to_dict()
+            "depth": result["depth"],
+            "score": result["score"],
+            "cached": False,
+            "stats": result["stats"]
         }
+        if result["root"] is not None:
+            response["tree_id"] = trees.put(result["root"])
+        results.put(board, game_state.current_player, game_state.algorithm, move, result["depth"],
+                    result["score"], game_state.tree, response.get("tree_id"), result["stats"])
+        return respond("move", response)
+    except HTTPException:
+        raise
+    except PoolBusy as e:
+        metrics.record_failure(game_state.algorithm, "busy")
+        raise HTTPException(status_code=503, detail=str(e))
+    except SearchDeadlineExceeded as e:
+        metrics.record_failure(game_state.algorithm, "deadline")
+        raise HTTPException(status_code=504, detail=str(e))
+    except WorkerCrashed as e:
+        metrics.record_failure(game_state.algorithm, "crashed")
+        raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
-        logger.error(f"Error in get_ai_move: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.error("Error in get_ai_move: %s", e)
+        logger.error("Traceback: %s", traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/ai/moves/batch")
+async def get_ai_moves(batch: BatchRequest):
+    """
+    /ai/move for many positions at once.
+
+    The positions are spread over the worker processes, which share one
+    transposition table for the batch. Results are streamed as NDJSON in the
+    order they finish, one line per position:
+    ``{"index", "move", "depth", "score", "nodes", "tree_id", "stats"}`` with
+    ``index`` the position's place in the request, or ``{"index", "status",
+    "detail"}`` when that position failed with the status /ai/move would
+    have answered.
+    """
+    logger.debug("Received batch of %d positions", len(batch.positions))
+
+    async def lines():
+        started = time.perf_counter()
+        nodes = 0
+        size = 0
+        async for index, result in search_pool().run_batch([position.model_dump() for position in batch.positions]):
+            position = batch.positions[index]
+            if not isinstance(result, Exception):
+                # Searches overlap in a batch, so each is timed by its own clock
+                metrics.record_search(position.algorithm, position.depth,
+                                      result["stats"]["elapsed_s"] if result["stats"] else 0.0, result)
+            if isinstance(result, PoolBusy):
+                metrics.record_failure(position.algorithm, "busy")
+                line = {"index": index, "status": 503, "detail": str(result)}
+            elif isinstance(result, SearchDeadlineExceeded):
+                metrics.record_failure(position.algorithm, "deadline")
+                line = {"index": index, "status": 504, "detail": str(result)}
+            elif isinstance(result, WorkerCrashed):
+                metrics.record_failure(position.algorithm, "crashed")
+                line = {"index": index, "status": 500, "detail": str(result)}
+            elif result["move"] is None:
+                line = {"index": index, "status": 400, "detail": "No valid moves available"}
+            else:
+                line = {"index": index, "move": result["move"], "depth": result["depth"],
+                        "score": result["score"], "nodes": result["nodes"],
+                        "tree_id": trees.put(result["root"]) if result["root"] is not None else None,
+                        "stats": result["stats"]}
+                nodes += result["nodes"]
+            line = json.dumps(line) + "\n"
+            size += len(line)
+            yield line
+        metrics.RESPONSE_BYTES.labels("batch").observe(size)
+        logger.info("Batch of %d positions: %d nodes, %.3fs", len(batch.positions), nodes,
+                    time.perf_counter() - started)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.websocket("/ai/move/stream")
+async def stream_ai_move(websocket: WebSocket):
+    """
+    /ai/move with progress reports.
+
+    The client sends one StreamRequest. The search always deepens one ply
+    at a time, and each completed iteration is reported as
+    ``{"type": "iteration", "depth", "move", "score", "nodes", "nps"}`` so a
+    provisional move can be shown at once. Sending ``{"type": "cancel"}`` or
+    disconnecting stops the search, which then answers from the deepest
+    finished iteration. With ``stream_tree`` the captured tree follows as
+    ``{"type": "tree", "tree_id", "nodes"}`` messages, breadth-first in
+    chunks of TREE_CHUNK_SIZE. The last message is
+    ``{"type": "move", "move", "depth", "score", "tree_id", "cancelled", "stats"}``,
+    or ``{"type": "error", "detail"}``.
+    """
+    await websocket.accept()
+    try:
+        game_state = StreamRequest.model_validate(await websocket.receive_json())
+    except (ValidationError, ValueError) as e:
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close()
+        return
+    except WebSocketDisconnect:
+        return
+    logger.debug("Received streamed %s request for player %d at depth %d", game_state.algorithm,
+                 game_state.current_player, game_state.depth)
+
+    messages = asyncio.Queue()
+    cancelled = asyncio.Event()
+
+    async def listen():
+        # Cancel on request or when the client goes away
+        try:
+            while True:
+                message = await websocket.receive_json()
+                if message.get("type") == "cancel":
+                    cancelled.set()
+        except (WebSocketDisconnect, ValueError):
+            cancelled.set()
+
+    listener = asyncio.create_task(listen())
+    started = time.perf_counter()
+    search = asyncio.create_task(search_pool().run(game_state.model_dump(exclude={"stream_tree"}),
+                                                   on_iteration=messages.put_nowait, cancelled=cancelled))
+    try:
+        while not search.done() or not messages.empty():
+            waiting = asyncio.create_task(messages.get())
+            await asyncio.wait((waiting, search), return_when=asyncio.FIRST_COMPLETED)
+            if not waiting.done():
+                waiting.cancel()
+                continue
+            await websocket.send_json(waiting.result())
+
+        try:
+            result = search.result()
+        except (PoolBusy, SearchDeadlineExceeded, WorkerCrashed) as e:
+            outcome = {PoolBusy: "busy", SearchDeadlineExceeded: "deadline", WorkerCrashed: "crashed"}[type(e)]
+            metrics.record_failure(game_state.algorithm, outcome)
+            await websocket.send_json({"type": "error", "detail": str(e)})
+            return
+        except Exception as e:
+            logger.error("Error in stream_ai_move: %s", e)
+            logger.error("Traceback: %s", traceback.format_exc())
+            await websocket.send_json({"type": "error", "detail": str(e)})
+            return
+        metrics.record_search(game_state.algorithm, game_state.depth, time.perf_counter() - started, result)
+        if result["move"] is None:
+            detail = "Search cancelled" if result["cancelled"] else "No valid moves available"
+            await websocket.send_json({"type": "error", "detail": detail})
+            return
+        log_search(game_state, result)
+        move, root = result["move"], result["root"]
+
+        tree_id = trees.put(root) if root is not None else None
+        if tree_id is not None and game_state.stream_tree:
+            nodes = []
+            for node in trees.get(tree_id).walk():
+                nodes.append(node)
+                if len(nodes) == TREE_CHUNK_SIZE:
+                    await websocket.send_json({"type": "tree", "tree_id": tree_id, "nodes": nodes})
+                    nodes = []
+            if nodes:
+                await websocket.send_json({"type": "tree", "tree_id": tree_id, "nodes": nodes})
+
+        await websocket.send_json({
+            "type": "move",
+            "move": move,
+            "depth": result["depth"],
+            "score": result["score"],
+            "tree_id": tree_id,
+            "cancelled": result["cancelled"],
+            "stats": result["stats"]
+        })
+        await websocket.close()
+    except WebSocketDisconnect:
+        cancelled.set()  # The worker stops at its next clock check
+    finally:
+        listener.cancel()
+
+@app.get("/ai/cache")
+async def get_cache_stats():
+    """Size and hit rate of the /ai/move result cache."""
+    return results.stats()
+
+@app.get("/ai/tree/{tree_id}/node")
+@app.get("/ai/tree/{tree_id}/node/{path:path}")
+async def get_tree_node(tree_id: str, path: str = ""):
+    """
+    One node of a stored search tree with its immediate children.
+
+    ``path`` lists the position of the child to follow at each level from
+    the root, separated by slashes (e.g. ``3/0``); it is empty for the root.
+    """
+    tree = trees.get(tree_id)
+    if tree is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired tree")
+    try:
+        ranks = [int(rank) for rank in path.split("/") if rank]
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid node path: {path}")
+    try:
+        return respond("tree_node", tree.node(ranks))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Search, pool and cache metrics in the Prometheus text format: search
+    latency by algorithm and depth, nodes and nodes per second, response
+    sizes, searches in flight and queued, and cache and table hit rates.
+    """
+    return Response(metrics.render(), headers={"Content-Type": metrics.CONTENT_TYPE_LATEST})
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
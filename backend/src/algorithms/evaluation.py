@@ -0,0 +1,245 @@
+import numpy as np
+from functools import lru_cache
+from typing import NamedTuple
+
+MAX_PLAYER = 2 # Ai player
+MIN_PLAYER = 1 # Opponent player
+
+# Window directions as (d_row, d_col) with row 0 at the top
+HORIZONTAL, VERTICAL, DIAGONAL_UP, DIAGONAL_DOWN = range(4)
+
+# A window's cells are packed as code = c0 + 3 * c1 + 9 * c2 + 27 * c3
+CODES = 81
+CODE_WEIGHTS = np.array([1, 3, 9, 27], dtype=np.int64)
+# Threat tallies are packed into one integer: max threats + MIN_THREAT * min threats
+MIN_THREAT = 256
+
+class WindowTables(NamedTuple):
+    """Precomputed geometry and weights of every four-cell window on a board."""
+    windows: np.ndarray      # (n, 4) flat cell indices (row * width + col)
+    kinds: np.ndarray        # (n,) direction of each window
+    rows: np.ndarray         # (n,) row of each window's first cell
+    offsets: np.ndarray      # (n,) window index * CODES, to index the flat tables
+    scores: np.ndarray       # (n * CODES,) score contribution per window and code
+    threats: np.ndarray      # (n * CODES,) packed threat tally per window and code
+    fours: np.ndarray        # (n * CODES,) +1 for a MAX four, MIN_THREAT for a MIN four
+    positional: np.ndarray   # (cells,) column-control bonus per cell
+    through: tuple           # through[cell] = indices of the windows covering it
+
+def window_score(kind: int, row: int, cells: tuple) -> int:
+    """
+    Score contribution of one window, matching the rules of eval().
+
+    Connected fours are worth 1000, three pieces with one gap 600 + 50 * row
+    horizontally, 800 vertically and 700 diagonally. Two pieces with two gaps
+    in a horizontal window add 200 whoever owns them, or 300 for adjacent MIN
+    pieces (eval() compares ``window[i:i+2].all()`` with the player number,
+    which only matches for player 1).
+    """
+    max_pieces = cells.count(MAX_PLAYER)
+    min_pieces = cells.count(MIN_PLAYER)
+    score = 0
+    if max_pieces == 4:
+        score += 1000
+    if min_pieces == 4:
+        score -= 1000
+    three = 600 + row * 50 if kind == HORIZONTAL else 800 if kind == VERTICAL else 700
+    if max_pieces == 3 and min_pieces == 0:
+        score += three
+    if min_pieces == 3 and max_pieces == 0:
+        score -= three
+    if kind == HORIZONTAL and max_pieces == 2 and min_pieces == 0:
+        score += 200
+    if kind == HORIZONTAL and min_pieces == 2 and max_pieces == 0:
+        adjacent = any(cells[i] and cells[i + 1] for i in range(3))
+        score += 300 if adjacent else 200
+    return score
+
+@lru_cache(maxsize=None)
+def window_tables(width: int = 7, height: int = 6) -> WindowTables:
+    """Build the window tables for a board size (cached)."""
+    windows, kinds, rows = [], [], []
+    directions = {HORIZONTAL: (0, 1), VERTICAL: (1, 0), DIAGONAL_UP: (-1, 1), DIAGONAL_DOWN: (1, 1)}
+    for kind, (d_row, d_col) in directions.items():
+        for row in range(height):
+            for col in range(width):
+                cells = [(row + i * d_row, col + i * d_col) for i in range(4)]
+                if all(0 <= r < height and 0 <= c < width for r, c in cells):
+                    windows.append([r * width + c for r, c in cells])
+                    kinds.append(kind)
+                    rows.append(row)
+
+    scores, threats, fours = [], [], []
+    for kind, row in zip(kinds, rows):
+        for code in range(CODES):
+            cells = tuple(code // 3 ** i % 3 for i in range(4))
+            max_pieces = cells.count(MAX_PLAYER)
+            min_pieces = cells.count(MIN_PLAYER)
+            scores.append(window_score(kind, row, cells))
+            threat = 0
+            if max_pieces == 3 and min_pieces == 0:
+                threat += 1
+            if min_pieces == 3 and max_pieces == 0:
+                threat += MIN_THREAT
+            threats.append(threat)
+            fours.append(1 if max_pieces == 4 else MIN_THREAT if min_pieces == 4 else 0)
+
+    positional = np.zeros(width * height, dtype=np.int64)
+    center = width // 2
+    for row in range(height):
+        positional[row * width + center] = 50 + row * 10
+        for col in (center - 1, center + 1):
+            positional[row * width + col] = 30 + row * 5
+
+    through = [[] for _ in range(width * height)]
+    for index, window in enumerate(windows):
+        for cell in window:
+            through[cell].append(index)
+
+    count = len(windows)
+    return WindowTables(
+        windows=np.array(windows, dtype=np.intp),
+        kinds=np.array(kinds, dtype=np.int64),
+        rows=np.array(rows, dtype=np.int64),
+        offsets=np.arange(count, dtype=np.intp) * CODES,
+        scores=np.array(scores, dtype=np.int64),
+        threats=np.array(threats, dtype=np.int64),
+        fours=np.array(fours, dtype=np.int64),
+        positional=positional,
+        through=tuple(tuple(indices) for indices in through),
+    )
+
+def threat_bonus(max_threats: int, min_threats: int) -> int:
+    """Bonus for having, and penalty for allowing, multiple threats."""
+    score = 0
+    if max_threats >= 2:
+        score += 1000
+    if min_threats >= 2:
+        score -= 1500
+    return score
+
+def evaluate_cells(cells: np.ndarray, width: int, height: int, is_full: bool) -> int:
+    """
+    Table-driven equivalent of eval() on a flattened board.
+
+    Args:
+        cells: Board values in row-major order (row 0 is the top)
+        width: Board width
+        height: Board height
+        is_full: Whether every cell is occupied
+
+    Returns:
+        The same score eval() gives for the position
+    """
+    tables = window_tables(width, height)
+    codes = tables.offsets + cells[tables.windows] @ CODE_WEIGHTS
+
+    if is_full:
+        max_fours, min_fours = divmod(int(tables.fours[codes].sum()), MIN_THREAT)[::-1]
+        if max_fours > min_fours:
+            return 10000
+        if min_fours > max_fours:
+            return -10000
+        return 0
+
+    max_threats, min_threats = divmod(int(tables.threats[codes].sum()), MIN_THREAT)[::-1]
+    score = int(tables.scores[codes].sum())
+    score += int(tables.positional @ ((cells == MAX_PLAYER).astype(np.int64) - (cells == MIN_PLAYER)))
+    return score + threat_bonus(max_threats, min_threats)
+
+# Set to True to cross-check every incremental score against a full rescan
+CHECK_INCREMENTAL = False
+
+class IncrementalEvaluator:
+    """
+    Running eval() state that is updated one cell at a time.
+
+    Keeps the pattern code of every window plus the summed window scores,
+    threat and four tallies and the positional bonus. Adding or removing a
+    piece only touches the windows through that cell, so value() is O(1).
+    Attach it to a board as ``board.evaluator`` and the board keeps it in sync
+    on every move.
+    """
+
+    def __init__(self, board):
+        """
+        Args:
+            board: Position to start from (any board with a ``board`` array)
+        """
+        self.width = board.width
+        self.height = board.height
+        tables = window_tables(self.width, self.height)
+        self._scores = tables.scores.tolist()
+        self._threats = tables.threats.tolist()
+        self._fours = tables.fours.tolist()
+        self._adds, self._removes = _cell_updates(self.width, self.height)
+        self._positional = tables.positional.tolist()
+
+        cells = np.asarray(board.board).ravel()
+        self.codes = (tables.offsets + cells[tables.windows] @ CODE_WEIGHTS).tolist()
+        self.window_score = sum(self._scores[code] for code in self.codes)
+        self.threat_tally = sum(self._threats[code] for code in self.codes)
+        self.four_tally = sum(self._fours[code] for code in self.codes)
+        self.positional = int(tables.positional @ ((cells == MAX_PLAYER).astype(np.int64) - (cells == MIN_PLAYER)))
+
+    def copy(self) -> 'IncrementalEvaluator':
+        """Create an independent copy."""
+        new = IncrementalEvaluator.__new__(IncrementalEvaluator)
+        new.__dict__.update(self.__dict__)
+        new.codes = self.codes[:]
+        return new
+
+    def add(self, cell: int, player: int):
+        """Account for a piece placed on a flat cell index (row * width + col)."""
+        self._apply(self._adds[player][cell])
+        self.positional += self._positional[cell] if player == MAX_PLAYER else -self._positional[cell]
+
+    def remove(self, cell: int, player: int):
+        """Account for a piece taken off a flat cell index."""
+        self._apply(self._removes[player][cell])
+        self.positional -= self._positional[cell] if player == MAX_PLAYER else -self._positional[cell]
+
+    def _apply(self, updates):
+        codes, scores, threats, fours = self.codes, self._scores, self._threats, self._fours
+        window_score, threat_tally, four_tally = self.window_score, self.threat_tally, self.four_tally
+        for window, delta in updates:
+            old = codes[window]
+            new = old + delta
+            codes[window] = new
+            window_score += scores[new] - scores[old]
+            threat_tally += threats[new] - threats[old]
+            four_tally += fours[new] - fours[old]
+        self.window_score, self.threat_tally, self.four_tally = window_score, threat_tally, four_tally
+
+    def value(self, is_full: bool) -> int:
+        """Current eval() score; the caller says whether the board is full."""
+        if is_full:
+            max_fours, min_fours = self.four_tally % MIN_THREAT, self.four_tally // MIN_THREAT
+            if max_fours > min_fours:
+                return 10000
+            if min_fours > max_fours:
+                return -10000
+            return 0
+        max_threats, min_threats = self.threat_tally % MIN_THREAT, self.threat_tally // MIN_THREAT
+        return self.window_score + self.positional + threat_bonus(max_threats, min_threats)
+
+@lru_cache(maxsize=None)
+def _cell_updates(width: int, height: int) -> tuple:
+    """
+    Window code deltas for placing and removing each player's piece.
+
+    Returns:
+        (adds, removes) where adds[player][cell] lists (window, delta) pairs
+        with delta = player * 3**slot, and removes holds the negated deltas
+    """
+    tables = window_tables(width, height)
+    adds, removes = [()], [()]
+    for player in (1, 2):
+        player_adds = []
+        for cell in range(width * height):
+            player_adds.append(tuple((window, player * 3 ** tables.windows[window].tolist().index(cell))
+                                     for window in tables.through[cell]))
+        adds.append(tuple(player_adds))
+        removes.append(tuple(tuple((window, -delta) for window, delta in cell_adds)
+                             for cell_adds in player_adds))
+    return tuple(adds), tuple(removes)
@@ -1,8 +1,18 @@
+import time
+import numpy as np
+from functools import lru_cache
 from src.models.board import ConnectFourBoard
+from src.models.bitboard import BitBoard
 from src.models.node import TreeNode
-
-MAX_PLAYER = 2 # Ai player
-MIN_PLAYER = 1 # Opponent player
+from src.models.tree_store import TreeStore
+from src.algorithms.search_context import SearchContext, SearchTimeout
+from src.algorithms.move_ordering import HeuristicOrdering
+from src.algorithms.transposition import (TranspositionTable, EXACT, LOWER, UPPER,
+                                          position_key, canonical_move, bound_flag)
+from src.algorithms import evaluation
+from src.algorithms.evaluation import MAX_PLAYER, MIN_PLAYER, IncrementalEvaluator, evaluate_cells
+from src.algorithms import tracing
+from src.algorithms.tracing import LEAF, ORDER, MOVE, DECISION
 
 def eval(board: ConnectFourBoard) -> int:
     """
@@ -11,216 +21,282 @@ def eval(board: ConnectFourBoard) -> int:
     2. Three-in-a-row threats
     3. Two-in-a-row potential
     4. Positional advantages
-    """
-    if board.is_full():
-        if board.check_winner() == MAX_PLAYER:
-            return 10000
-        elif board.check_winner() == MIN_PLAYER:
-            return -10000
-        else:
-            return 0
-    
-    score = 0
-    max_threats = 0
-    min_threats = 0
-
-    # Count connected fours
-    max_player_fours = board.count_fours(MAX_PLAYER)
-    min_player_fours = board.count_fours(MIN_PLAYER)
-    score = (max_player_fours - min_player_fours) * 1000
-
-    # Check horizontal patterns
-    for row in range(board.height):
-        for col in range(board.width - 3):
-            window = board.board[row, col:col+4]
-            
-            # Three in a row threats
-            if sum(window == MAX_PLAYER) == 3 and sum(window == 0) == 1:
-                max_threats += 1
-                score += 600 + (row * 50)  # More points for lower rows
-            if sum(window == MIN_PLAYER) == 3 and sum(window == 0) == 1:
-                min_threats += 1
-                score -= 600 + (row * 50)
-                
-            # Two in a row potential
-            if sum(window == MAX_PLAYER) == 2 and sum(window == 0) == 2:
-                if any(window[i:i+2].all() == MAX_PLAYER for i in range(3)):
-                    score += 300
-                else:
-                    score += 200
-                # score += 200 + (row * 25)
-            if sum(window == MIN_PLAYER) == 2 and sum(window == 0) == 2:
-                if any(window[i:i+2].all() == MIN_PLAYER for i in range(3)):
-                    score += 300
-                else:
-                    score += 200
-                # score -= 200 + (row * 25)
-
-    # Check vertical patterns
-    for row in range(board.height - 3):
-        for col in range(board.width):
-            window = board.board[row:row+4, col]
-            
-            # Three in a row threats
-            if sum(window == MAX_PLAYER) == 3 and sum(window == 0) == 1:
-                max_threats += 1
-                score += 800
-            if sum(window == MIN_PLAYER) == 3 and sum(window == 0) == 1:
-                min_threats += 1
-                score -= 800
-
-    # Check diagonal patterns (positive slope)
-    for row in range(board.height - 3):
-        for col in range(board.width - 3):
-            window = [board.board[row+i, col+i] for i in range(4)]
-            
-            # Three in a row threats
-            if sum(x == MAX_PLAYER for x in window) == 3 and sum(x == 0 for x in window) == 1:
-                max_threats += 1
-                score += 700
-            if sum(x == MIN_PLAYER for x in window) == 3 and sum(x == 0 for x in window) == 1:
-                min_threats += 1
-                score -= 700
-                
-    # Check diagonal patterns (negative slope)
-    for row in range(3, board.height):
-        for col in range(board.width - 3):
-            window = [board.board[row-i, col+i] for i in range(4)]
-            
-            # Three in a row threats
-            if sum(x == MAX_PLAYER for x in window) == 3 and sum(x == 0 for x in window) == 1:
-                max_threats += 1
-                score += 700
-            if sum(x == MIN_PLAYER for x in window) == 3 and sum(x == 0 for x in window) == 1:
-                min_threats += 1
-                score -= 700
-
-    # Center column control bonus
-    center = board.width // 2
-    for row in range(board.height):
-        if board.board[row][center] == MAX_PLAYER:
-            score += 50 + (row * 10)  # More value for center pieces in lower rows
-        elif board.board[row][center] == MIN_PLAYER:
-            score -= 50 + (row * 10)
-
-    # Bonus for multiple threats
-    if max_threats >= 2:
-        score += 1000  # Bonus for having multiple threats
-    if min_threats >= 2:
-        score -= 1500  # Penalty for allowing multiple threats
-
-    for row in range(board.height):
-        if board.board[row][center-1] == MAX_PLAYER:
-            score += 30 + (row * 5)
-        if board.board[row][center+1] == MAX_PLAYER:
-            score += 30 + (row * 5)
-        if board.board[row][center-1] == MIN_PLAYER:
-            score -= 30 + (row * 5)
-        if board.board[row][center+1] == MIN_PLAYER:
-            score -= 30 + (row * 5)
 
+    Each of the board's four-cell windows is looked up in precomputed
+    tables (see src.algorithms.evaluation) instead of being sliced and
+    counted one by one. Boards carrying an IncrementalEvaluator answer in
+    O(1) from its running totals.
+    """
+    evaluator = getattr(board, 'evaluator', None)
+    if evaluator is None:
+        return evaluate_cells(np.asarray(board.board).ravel(), board.width, board.height, board.is_full())
+
+    score = evaluator.value(board.is_full())
+    if evaluation.CHECK_INCREMENTAL:
+        expected = evaluate_cells(np.asarray(board.board).ravel(), board.width, board.height, board.is_full())
+        assert score == expected, f"Incremental eval {score} != full eval {expected} for\n{board}"
     return score
 
+def principal_variation(state: ConnectFourBoard, move: int, score: float, line: tuple,
+                        store: TreeStore = None) -> TreeNode:
+    """
+    Tree holding only the principal variation: the root and, under each
+    node, the child the search picked as best.
+
+    Args:
+        state: Position at the root
+        move, score: Best move and value of the root
+        line: One (move label, column played, score) triple per ply below the root
+        store: Store to create the nodes in
+    """
+    root = TreeNode(move=move, score=score, player=state.current_player,
+                    depth=0, board=state, store=store)
+    node = root
+    for depth, (label, col, child_score) in enumerate(line, 1):
+        state.play(col)
+        child = TreeNode(move=label, score=child_score, player=state.current_player,
+                         depth=depth, board=state, store=store)
+        node.add_child(child)
+        node.set_best_child(child)
+        node = child
+    for _ in line:
+        state.undo()
+    return root
+
 def maximize(state: ConnectFourBoard, k: int, current_depth: int = 0
-             , use_alpha_beta: bool = False, 
-             alpha: float = float('-inf'), 
-             beta: float = float('inf')):
-    
+             , use_alpha_beta: bool = False,
+             alpha: float = float('-inf'),
+             beta: float = float('inf'),
+             context: SearchContext = None):
+    """
+    Returns:
+        (best_move, node, score); node is None for plies the context's
+        capture level leaves out
+    """
+    if context is not None:
+        context.nodes += 1
+        if context.deadline is not None and not context.nodes & context.CHECK_INTERVAL:
+            context.check_deadline()
     is_terminal = state.is_full()
-    board_str = str(state)  
+    if context is not None and (current_depth == 0 or context.tree is None):
+        context.tree = TreeStore(state.width, state.height)  # Each search from the root gets a new tree
+    tree = context.tree if context is not None else None
+    capture = context is None or current_depth <= context.capture_depth
+    pv = context.pv if context is not None else None
+    trace = context.trace if tracing.TRACING and context is not None else None
 
     if current_depth == k or is_terminal:
         score = eval(state)
-        print(f"Leaf node at depth {current_depth}, score: {score}")
-        return None, TreeNode(move=None, score=score, player=state.current_player, depth=current_depth, board_str=board_str)
-    
-    best_move, best_child, max_utility = None, None, float('-inf')
-    
-    root_node = TreeNode(move=None, 
-                         score=None, 
-                         player=state.current_player, 
-                         depth=current_depth, 
-                         board_str=board_str)
-    
+        if context is not None:
+            context.count_leaf(current_depth)
+            if trace is not None:
+                trace(LEAF, current_depth, None, score)
+        if pv is not None:
+            pv[current_depth] = ()
+        node = TreeNode(move=None, score=score, player=state.current_player, depth=current_depth, board=state, store=tree) if capture else None
+        return None, node, score
+
+    table = context.table if context is not None else None
+    if table is not None:
+        key = position_key(state, True)
+        # The root is always searched: its entry may come from the reflected
+        # position, whose best move reflected back need not be the leftmost of
+        # equal moves here. The entry still orders the root's moves.
+        entry = table.probe(key, k - current_depth) if current_depth > 0 else None
+        if entry is not None:
+            _, _, score, flag, move, _ = entry
+            move = canonical_move(state, move)
+            if flag == EXACT or (flag == LOWER and score >= beta) or (flag == UPPER and score <= alpha):
+                if pv is not None:
+                    pv[current_depth] = ()
+                node = TreeNode(move=move, score=score, player=state.current_player, depth=current_depth, board=state, store=tree) if capture else None
+                return move, node, score
+        alpha_orig = alpha
+
+    best_move, best_child, best_line, max_utility = None, None, (), float('-inf')
+
+    root_node = TreeNode(move=None,
+                         score=None,
+                         player=state.current_player,
+                         depth=current_depth,
+                         board=state, store=tree) if capture else None
+
     valid_moves = state.get_valid_moves()
-    print(f"Depth {current_depth}, considering moves: {valid_moves}")
-    
-    for move in valid_moves:
-        new_board = state.copy()
-        new_board.drop_piece(move) # child state 
-        
-        _, child_node = minimize(new_board, k, current_depth + 1, use_alpha_beta, alpha, beta)
-        root_node.add_child(child_node)
-        child_node.move = move
+    reordered = use_alpha_beta and context is not None
+    if reordered:
+        valid_moves = context.order_moves(state, valid_moves, current_depth,
+                                          key if table is not None else None)
+    # A root equal to its reflection has mirrored pairs of moves with equal
+    # values; searching the left one of each still finds the leftmost best move
+    symmetric_root = current_depth == 0 and state.is_symmetric()
+    if symmetric_root:
+        valid_moves = [move for move in valid_moves if move <= state.mirror_move(move)]
+    if trace is not None:
+        trace(ORDER, current_depth, valid_moves, None)
+
+    for index, move in enumerate(valid_moves):
+        # Ties at the root still go to the leftmost column: a column left of the
+        # current best is searched one point wider so an equal score comes back exact
+        tie_break = reordered and current_depth == 0 and best_move is not None and move < best_move
+        low = alpha - 1 if tie_break else alpha
+        state.play(move) # child state, taken back with undo()
+        if reordered and context.scout and index > 0:
+            # PVS: prove the move cannot beat alpha with a null window, and only
+            # search it again with the full window if that fails
+            _, child_node, score = minimize(state, k, current_depth + 1, True, low, low + 1, context)
+            if low < score < beta:
+                context.researches += 1
+                _, child_node, score = minimize(state, k, current_depth + 1, True, low, beta, context)
+        else:
+            _, child_node, score = minimize(state, k, current_depth + 1, use_alpha_beta, low, beta, context)
+        state.undo()
+        if child_node is not None:
+            root_node.add_child(child_node)
+            child_node.move = move
 
-        print(f"Depth {current_depth}, Move {move}, Utility: {child_node.score}")
-        
-        if child_node.score > max_utility:
-            max_utility = child_node.score
+        if trace is not None:
+            trace(MOVE, current_depth, move, score)
+
+        if score > max_utility or (tie_break and score == max_utility):
+            max_utility = score
             best_move = move
             best_child = child_node
+            if pv is not None:
+                best_line = ((move, move, score),) + pv[current_depth + 1]
 
         if use_alpha_beta:
             if max_utility >= beta:
+                if context is not None:
+                    context.record_cutoff(state, move, current_depth, k - current_depth, index)
                 break
             if max_utility > alpha:
                 alpha = max_utility
 
-    root_node.move = best_move
-    root_node.score = max_utility
-    root_node.set_best_child(best_child)
+    if root_node is not None:
+        root_node.move = best_move
+        root_node.score = max_utility
+        root_node.set_best_child(best_child)
+        if symmetric_root:
+            # List each skipped move with its mirror move's subtree, reflected
+            for child in reversed(root_node.children):
+                if child.move != state.mirror_move(child.move):
+                    root_node.store.attach(root_node.index, root_node.store.mirror(child.index))
+
+    if table is not None:
+        table.store(key, k - current_depth, max_utility, bound_flag(max_utility, alpha_orig, beta),
+                    canonical_move(state, best_move))
+
+    if pv is not None:
+        pv[current_depth] = best_line
+        if current_depth == 0:
+            root_node = principal_variation(state, best_move, max_utility, best_line, tree)
 
-    return best_move, root_node
+    return best_move, root_node, max_utility
 
 def minimize(state: ConnectFourBoard, k: int, current_depth: int = 0,
              use_alpha_beta: bool = False,
              alpha: float = float('-inf'),
-             beta: float = float('inf')):
-    
+             beta: float = float('inf'),
+             context: SearchContext = None):
+
+    if context is not None:
+        context.nodes += 1
+        if context.deadline is not None and not context.nodes & context.CHECK_INTERVAL:
+            context.check_deadline()
     is_terminal = state.is_full()
-    board_str = str(state)
+    if context is not None and (current_depth == 0 or context.tree is None):
+        context.tree = TreeStore(state.width, state.height)  # Each search from the root gets a new tree
+    tree = context.tree if context is not None else None
+    capture = context is None or current_depth <= context.capture_depth
+    pv = context.pv if context is not None else None
+    trace = context.trace if tracing.TRACING and context is not None else None
 
     if current_depth == k or is_terminal:
         score = eval(state)
-        print(f"Leaf node at depth {current_depth}, score: {score}")
-        return None, TreeNode(move=None, score=score, player=state.current_player, depth=current_depth, board_str=board_str)
-
-    best_move, best_child, min_utility = None, None, float('inf')    
-    root_node = TreeNode(move=None, 
-                         score=None, 
-                         player=state.current_player, 
-                         depth=current_depth, 
-                         board_str=board_str)
-    
-    valid_moves = state.get_valid_moves()
-    print(f"Depth {current_depth}, considering moves: {valid_moves}")
-    
-    for move in valid_moves:
-        new_board = state.copy()
-        new_board.drop_piece(move)  # child state
+        if context is not None:
+            context.count_leaf(current_depth)
+            if trace is not None:
+                trace(LEAF, current_depth, None, score)
+        if pv is not None:
+            pv[current_depth] = ()
+        node = TreeNode(move=None, score=score, player=state.current_player, depth=current_depth, board=state, store=tree) if capture else None
+        return None, node, score
+
+    table = context.table if context is not None else None
+    if table is not None:
+        key = position_key(state, False)
+        entry = table.probe(key, k - current_depth)
+        if entry is not None:
+            _, _, score, flag, move, _ = entry
+            move = canonical_move(state, move)
+            if flag == EXACT or (flag == LOWER and score >= beta) or (flag == UPPER and score <= alpha):
+                if pv is not None:
+                    pv[current_depth] = ()
+                node = TreeNode(move=move, score=score, player=state.current_player, depth=current_depth, board=state, store=tree) if capture else None
+                return move, node, score
+        beta_orig = beta
+
+    best_move, best_child, best_line, min_utility = None, None, (), float('inf')
+    root_node = TreeNode(move=None,
+                         score=None,
+                         player=state.current_player,
+                         depth=current_depth,
+                         board=state, store=tree) if capture else None
 
-        _, child_node = maximize(new_board, k, current_depth + 1, use_alpha_beta, alpha, beta)
-        root_node.add_child(child_node)
-        child_node.move = move
+    valid_moves = state.get_valid_moves()
+    if use_alpha_beta and context is not None:
+        valid_moves = context.order_moves(state, valid_moves, current_depth,
+                                          key if table is not None else None)
+    if trace is not None:
+        trace(ORDER, current_depth, valid_moves, None)
+
+    for index, move in enumerate(valid_moves):
+        state.play(move)  # child state, taken back with undo()
+        if use_alpha_beta and context is not None and context.scout and index > 0:
+            _, child_node, score = maximize(state, k, current_depth + 1, True, beta - 1, beta, context)
+            if alpha < score < beta:
+                context.researches += 1
+                _, child_node, score = maximize(state, k, current_depth + 1, True, alpha, beta, context)
+        else:
+            _, child_node, score = maximize(state, k, current_depth + 1, use_alpha_beta, alpha, beta, context)
+        state.undo()
+        if child_node is not None:
+            root_node.add_child(child_node)
+            child_node.move = move
 
-        print(f"Depth {current_depth}, Move {move}, Utility: {child_node.score}")
+        if trace is not None:
+            trace(MOVE, current_depth, move, score)
 
-        if child_node.score < min_utility:
-            min_utility = child_node.score
+        if score < min_utility:
+            min_utility = score
             best_move = move
             best_child = child_node
+            if pv is not None:
+                best_line = ((move, move, score),) + pv[current_depth + 1]
 
         if use_alpha_beta:
             if min_utility <= alpha:
+                if context is not None:
+                    context.record_cutoff(state, move, current_depth, k - current_depth, index)
                 break
             if min_utility < beta:
                 beta = min_utility
 
-    root_node.move = best_move
-    root_node.score = min_utility
-    root_node.set_best_child(best_child)
+    if root_node is not None:
+        root_node.move = best_move
+        root_node.score = min_utility
+        root_node.set_best_child(best_child)
+
+    if table is not None:
+        table.store(key, k - current_depth, min_utility, bound_flag(min_utility, alpha, beta_orig),
+                    canonical_move(state, best_move))
+
+    if pv is not None:
+        pv[current_depth] = best_line
+        if current_depth == 0:
+            root_node = principal_variation(state, best_move, min_utility, best_line, tree)
 
-    return best_move, root_node
+    return best_move, root_node, min_utility
 
 # def decision(state: ConnectFourBoard, k: int, 
 #              use_alpha_beta: bool = False, 
@@ -395,30 +471,22 @@ def minimize(state: ConnectFourBoard, k: int, current_depth: int = 0,
 #     # If still no move found, return first valid move
 #     return valid_moves[0] if valid_moves else -1
 
-def expected_max(state: ConnectFourBoard, k: int, current_depth: int = 0):
-    is_terminal = state.is_full()
-    board_str = str(state)
-
-    if current_depth == k or is_terminal:
-        score = eval(state)
-        return None, TreeNode(move=None, score=score, player=state.current_player, depth=current_depth, board_str=board_str)
-
-
-    best_move, best_child, best_expected_utility = None, None, float('-inf')
-    root_node = TreeNode(move=None,
-                         score=None, 
-                         player=state.current_player, 
-                         depth=current_depth, 
-                         board_str=board_str)
-    
+@lru_cache(maxsize=None)
+def slip_outcomes(valid_moves: tuple) -> tuple:
+    """
+    Where a piece can land for each intended move, given the free columns.
 
-    for move in state.get_valid_moves():
-        expected_utility = 0.0
+    The piece lands in the intended column with probability 0.6 and slips
+    to each free neighbour with 0.2 (0.4 if only one neighbour is free).
 
+    Returns:
+        One (move, columns, probabilities) triple per valid move
+    """
+    outcomes = []
+    for move in valid_moves:
         neighbors = [move]
         probs = [0.6]
 
-        valid_moves = state.get_valid_moves()
         left = move - 1 if move - 1 in valid_moves else None
         right = move + 1 if move + 1 in valid_moves else None
 
@@ -432,105 +500,418 @@ def expected_max(state: ConnectFourBoard, k: int, current_depth: int = 0):
             neighbors.append(right)
             probs.append(0.4)
 
-        # Evaluate each possible outcome and accumulate expected utility
-        for col, prob in zip(neighbors, probs):
-            new_state = state.copy()
-            new_state.drop_piece(col)
+        outcomes.append((move, tuple(neighbors), tuple(probs)))
+    return tuple(outcomes)
 
-            _, child_node = expected_min(new_state, k, current_depth + 1)
-            child_node.move = move
-            root_node.add_child(child_node)
+def chance_node(state: ConnectFourBoard, k: int, current_depth: int, move: int,
+                neighbors: tuple, probs: tuple, search, root_node: TreeNode, results: dict,
+                context: SearchContext = None):
+    """
+    Expected utility of intending to play ``move``.
 
-            expected_utility += prob * child_node.score
+    Neighbouring intended moves share landing columns, so each landing
+    column is searched once per node: ``results`` maps it to its outcome,
+    which every chance node of the node combines with its own probability.
 
-        if expected_utility > best_expected_utility:
-            best_expected_utility = expected_utility
-            best_move = move
-            best_child = child_node
+    The chance nodes are not pruned. Star1 windows would differ from one
+    intended move to the next, so a shared outcome would have to be searched
+    again for each; on test positions that cost far more than Star1 saved.
+
+    Args:
+        neighbors, probs: Landing columns and their probabilities (see slip_outcomes())
+        search: expected_min() or expected_max(), for the side to move next
+        root_node: Parent tree node the outcome nodes are added to, or None
+        results: Outcomes searched so far at this node, shared by its chance nodes
+
+    Returns:
+        (expected_utility, last outcome node, its principal variation); the
+        line is None unless the context records principal variations
+    """
+    pv = context.pv if context is not None else None
+    expected_utility = 0.0
+
+    # Evaluate each possible outcome and accumulate expected utility
+    for col, prob in zip(neighbors, probs):
+        cached = results.get(col)
+        if cached is None:
+            state.play(col)
+            _, child_node, score = search(state, k, current_depth + 1, context)
+            state.undo()
+            line = pv[current_depth + 1] if pv is not None else None
+            results[col] = (child_node, score, line)
+            if child_node is not None:
+                child_node.move = move
+        else:
+            child_node, score, line = cached
+            if child_node is not None:
+                # Each intended move lists the shared outcome under its own label
+                child_node = child_node.relabel(move)
+        if child_node is not None:
+            root_node.add_child(child_node)
 
-    root_node.move = best_move
-    root_node.score = best_expected_utility
-    root_node.set_best_child(best_child)
+        expected_utility += prob * score
 
-    return best_move, root_node
+    if pv is not None:
+        line = ((move, col, score),) + line
+    return expected_utility, child_node, line
 
-def expected_min(state: ConnectFourBoard, k: int, current_depth: int = 0):
+def expected_max(state: ConnectFourBoard, k: int, current_depth: int = 0,
+                 context: SearchContext = None):
+    if context is not None:
+        context.nodes += 1
+        if context.deadline is not None and not context.nodes & context.CHECK_INTERVAL:
+            context.check_deadline()
     is_terminal = state.is_full()
-    board_str = str(state)
+    if context is not None and (current_depth == 0 or context.tree is None):
+        context.tree = TreeStore(state.width, state.height)  # Each search from the root gets a new tree
+    tree = context.tree if context is not None else None
+    capture = context is None or current_depth <= context.capture_depth
+    pv = context.pv if context is not None else None
+    trace = context.trace if tracing.TRACING and context is not None else None
 
     if current_depth == k or is_terminal:
         score = eval(state)
-         
-        return None, TreeNode(move=None, score=score, player=state.current_player, depth=current_depth, board_str=board_str) 
+        if context is not None:
+            context.count_leaf(current_depth)
+            if trace is not None:
+                trace(LEAF, current_depth, None, score)
+        if pv is not None:
+            pv[current_depth] = ()
+        node = TreeNode(move=None, score=score, player=state.current_player, depth=current_depth, board=state, store=tree) if capture else None
+        return None, node, score
 
-    best_move, best_child, best_expected_utility = None, None, float('inf')
+
+    best_move, best_child, best_line, best_expected_utility = None, None, (), float('-inf')
     root_node = TreeNode(move=None,
-                         score=None, 
-                         player=state.current_player, 
-                         depth=current_depth, 
-                         board_str=board_str)
+                         score=None,
+                         player=state.current_player,
+                         depth=current_depth,
+                         board=state, store=tree) if capture else None
 
-    for move in state.get_valid_moves():
-        expected_utility = 0.0
+    valid_moves = state.get_valid_moves()
+    results = {}
 
-        neighbors = [move]
-        probs = [0.6]
+    for move, neighbors, probs in slip_outcomes(tuple(valid_moves)):
+        expected_utility, child_node, line = chance_node(state, k, current_depth, move, neighbors, probs,
+                                                         expected_min, root_node, results, context)
 
-        valid_moves = state.get_valid_moves()
-        left = move - 1 if move - 1 in valid_moves else None
-        right = move + 1 if move + 1 in valid_moves else None
-
-        if left is not None and right is not None:
-            neighbors += [left, right]
-            probs += [0.2, 0.2]
-        elif left is not None:
-            neighbors.append(left)
-            probs.append(0.4)
-        elif right is not None:
-            neighbors.append(right)
-            probs.append(0.4)
+        if expected_utility > best_expected_utility:
+            best_expected_utility = expected_utility
+            best_move = move
+            best_child = child_node
+            best_line = line
+
+    if root_node is not None:
+        root_node.move = best_move
+        root_node.score = best_expected_utility
+        root_node.set_best_child(best_child)
+
+    if pv is not None:
+        pv[current_depth] = best_line
+        if current_depth == 0:
+            root_node = principal_variation(state, best_move, best_expected_utility, best_line, tree)
+
+    return best_move, root_node, best_expected_utility
+
+def expected_min(state: ConnectFourBoard, k: int, current_depth: int = 0,
+                 context: SearchContext = None):
+    if context is not None:
+        context.nodes += 1
+        if context.deadline is not None and not context.nodes & context.CHECK_INTERVAL:
+            context.check_deadline()
+    is_terminal = state.is_full()
+    if context is not None and (current_depth == 0 or context.tree is None):
+        context.tree = TreeStore(state.width, state.height)  # Each search from the root gets a new tree
+    tree = context.tree if context is not None else None
+    capture = context is None or current_depth <= context.capture_depth
+    pv = context.pv if context is not None else None
+    trace = context.trace if tracing.TRACING and context is not None else None
 
-        # Evaluate each possible outcome and accumulate expected utility
-        for col, prob in zip(neighbors, probs):
-            new_state = state.copy()
-            new_state.drop_piece(col)
+    if current_depth == k or is_terminal:
+        score = eval(state)
+        if context is not None:
+            context.count_leaf(current_depth)
+            if trace is not None:
+                trace(LEAF, current_depth, None, score)
+        if pv is not None:
+            pv[current_depth] = ()
+        node = TreeNode(move=None, score=score, player=state.current_player, depth=current_depth, board=state, store=tree) if capture else None
+        return None, node, score
+
+    best_move, best_child, best_line, best_expected_utility = None, None, (), float('inf')
+    root_node = TreeNode(move=None,
+                         score=None,
+                         player=state.current_player,
+                         depth=current_depth,
+                         board=state, store=tree) if capture else None
 
-            _, child_node = expected_max(new_state, k, current_depth + 1)
-            child_node.move = move
-            root_node.add_child(child_node)
+    valid_moves = state.get_valid_moves()
+    results = {}
 
-            expected_utility += prob * child_node.score
+    for move, neighbors, probs in slip_outcomes(tuple(valid_moves)):
+        expected_utility, child_node, line = chance_node(state, k, current_depth, move, neighbors, probs,
+                                                         expected_max, root_node, results, context)
 
         if expected_utility < best_expected_utility:
             best_expected_utility = expected_utility
             best_move = move
             best_child = child_node
-    
-    root_node.move = best_move
-    root_node.score = best_expected_utility
-    root_node.set_best_child(best_child)
+            best_line = line
 
-    return best_move, root_node
+    if root_node is not None:
+        root_node.move = best_move
+        root_node.score = best_expected_utility
+        root_node.set_best_child(best_child)
 
-def decision(state: ConnectFourBoard, k: int, 
-             use_alpha_beta: bool = False, 
-             use_expected_minimax: bool = False) -> int:
-    print(f"\nMaking decision for player {state.current_player}")
-    print(f"Current board state:\n{state}")
-    if use_alpha_beta:
+    if pv is not None:
+        pv[current_depth] = best_line
+        if current_depth == 0:
+            root_node = principal_variation(state, best_move, best_expected_utility, best_line, tree)
+
+    return best_move, root_node, best_expected_utility
+
+# Half-width of the aspiration window around the previous iteration's score
+ASPIRATION_WINDOW = 200
+
+def mtdf(state: ConnectFourBoard, k: int, guess: float = 0,
+         context: SearchContext = None):
+    """
+    MTD(f): find the minimax value with null-window alpha-beta searches.
+
+    Each search tells whether the value is above or below a test bound and
+    the bounds close in on it. The transposition table in ``context`` is what
+    keeps the repeated searches cheap.
+
+    Args:
+        state: Position to search
+        k: Search depth in plies
+        guess: First estimate of the value, e.g. the previous iteration's score
+        context: Shared search state, normally with a transposition table
+
+    Returns:
+        (best_move, root, score) with the same move and score as a full-window search
+    """
+    g = guess
+    lower, upper = float('-inf'), float('inf')
+    while lower < upper:
+        beta = g + 1 if g == lower else g
+        _, _, g = maximize(state, k, 0, True, beta - 1, beta, context)
+        if g < beta:
+            upper = g
+        else:
+            lower = g
+    # One search just around the value picks the leftmost best move and
+    # returns a tree with exact scores along the principal variation
+    return maximize(state, k, 0, True, g - 1, g + 1, context)
+
+def aspiration_search(state: ConnectFourBoard, k: int, guess: float,
+                      context: SearchContext = None):
+    """
+    Alpha-beta with a window of ASPIRATION_WINDOW around ``guess``.
+
+    A result on or outside the window is only a bound, so that side is
+    opened up and the position searched again.
+    """
+    alpha, beta = guess - ASPIRATION_WINDOW, guess + ASPIRATION_WINDOW
+    while True:
+        best_move, root, score = maximize(state, k, 0, True, alpha, beta, context)
+        if score <= alpha:
+            alpha = float('-inf')
+        elif score >= beta:
+            beta = float('inf')
+        else:
+            return best_move, root, score
+        if context is not None:
+            context.researches += 1
+
+def search_to_depth(state: ConnectFourBoard, k: int,
+                    use_alpha_beta: bool = False,
+                    use_expected_minimax: bool = False,
+                    context: SearchContext = None,
+                    use_mtdf: bool = False,
+                    guess: float = None):
+    """
+    Run one search of the selected algorithm to depth k from the root.
+
+    ``guess`` is the previous iteration's score; MTD(f) starts from it and
+    PVS searches inside an aspiration window around it.
+
+    Returns:
+        (best_move, root, score); root is None when the context captures no tree
+    """
+    if use_mtdf:
+        return mtdf(state, k, guess if guess is not None else eval(state), context)
+    elif use_expected_minimax:
+        return expected_max(state, k, 0, context)
+    elif use_alpha_beta:
+        if guess is not None and context is not None and context.scout:
+            return aspiration_search(state, k, guess, context)
         alpha = float('-inf')
         beta = float('inf')
-        best_move, root = maximize(state, k, 0, True, alpha, beta)
-    elif use_expected_minimax:
-        best_move, root = expected_max(state, k, 0) 
+        return maximize(state, k, 0, True, alpha, beta, context)
     else:
          # Regular minimax without pruning
-        best_move, root = maximize(state, k, 0, False)
-    
-    utility = root.score
+        return maximize(state, k, 0, False, context=context)
+
+def decision(state: ConnectFourBoard, k: int, 
+             use_alpha_beta: bool = False, 
+             use_expected_minimax: bool = False,
+             context: SearchContext = None,
+             time_ms: float = None,
+             use_pvs: bool = False,
+             use_mtdf: bool = False,
+             workers: int = 1) -> int:
+    """
+    Choose a move for the current position.
+
+    Args:
+        state: Position to search
+        k: Search depth in plies (the maximum depth when time_ms is given)
+        use_alpha_beta: Prune with alpha-beta
+        use_expected_minimax: Use expectimax with the slip model instead,
+            which is never pruned; use_alpha_beta then has no effect
+        context: Shared search state; by default minimax and alpha-beta get a
+            fresh transposition table, and alpha-beta orders moves with killer
+            and history heuristics. Counters can be read from it afterwards,
+            including ``depth_reached``, the root ``score`` and the cutoff
+            counts. Its capture level decides how much of the tree is built.
+        time_ms: Wall-clock budget. When given, the search deepens one ply at
+            a time and answers from the deepest iteration that finished.
+            Depth 1 always completes. A context with ``on_iteration`` set
+            deepens the same way, without a budget unless one is given.
+        use_pvs: Alpha-beta with principal variation search (null-window
+            scouts after the first move, aspiration windows between iterations)
+        use_mtdf: Find the value with MTD(f) null-window searches
+        workers: Processes to search with (see src.algorithms.parallel).
+            Minimax and expectimax give each root column its own process;
+            alpha-beta runs Lazy SMP helpers and replaces context.table with
+            one they share. The move and score are the same as with one
+            process, and ``context.parallel`` reports how the work went.
+
+    With ``context.book`` set, a position the opening book holds at depth k
+    or deeper is answered from the book without searching (except by
+    expectimax, whose values the book does not hold), and
+    ``context.book_hit`` is set. The book's move has the search's score, but
+    may be another of equally good moves (see OpeningBook.lookup()).
+
+    Returns:
+        (best_move, root), with root None when the context captures no tree,
+        or -1 when there is no move
+    """
+    started = time.perf_counter()
+    use_alpha_beta = use_alpha_beta or use_pvs or use_mtdf
+    # Search on a private bitboard copy that keeps the eval() score up to date
+    state = state.copy() if isinstance(state, BitBoard) else BitBoard.from_board(state)
+    state.evaluator = IncrementalEvaluator(state)
+    if context is None:
+        context = SearchContext(table=None if use_expected_minimax else TranspositionTable(),
+                                ordering=HeuristicOrdering() if use_alpha_beta else None)
+    context.book_hit = False
+    if context.book is not None and not use_expected_minimax:
+        answer = book_decision(state, k, context)
+        if answer is not None:
+            context.elapsed = time.perf_counter() - started
+            return answer
+    root_split = workers > 1 and (use_expected_minimax or not use_alpha_beta)
+    if workers > 1:
+        from src.algorithms import parallel  # It imports this module
+        if not root_split:
+            context.table = parallel.shared_table(workers)
+    if context.table is not None:
+        context.table.new_search()
+    context.ordering.new_search()
+    context.scout = use_pvs
+
+    if root_split:
+        best_move, root, utility = parallel.root_split(state, k, use_alpha_beta, use_expected_minimax, context,
+                                                       workers, time_ms)
+    else:
+        helpers = parallel.start_helpers(state, k, context, workers, use_pvs, use_mtdf) if workers > 1 else None
+        try:
+            if context.on_iteration is None and (time_ms is None or k <= 1):
+                best_move, root, utility = search_to_depth(state, k, use_alpha_beta, use_expected_minimax, context,
+                                                           use_mtdf)
+                context.depth_reached = k
+            else:
+                best_move, root, utility = iterative_deepening(state, k, use_alpha_beta, use_expected_minimax,
+                                                               context, time_ms, use_mtdf)
+        finally:
+            if helpers is not None:
+                parallel.stop_helpers(helpers, context)
+    context.score = utility
+    context.elapsed = time.perf_counter() - started
+    if tracing.TRACING and context.trace is not None:
+        context.trace(DECISION, 0, best_move, utility)
 
     if best_move is not None:
-        print(f"Chose move {best_move} with utility {utility}")
         return best_move, root
     else:
-        return -1
\ No newline at end of file
+        return -1
+
+def book_decision(state: BitBoard, k: int, context: SearchContext):
+    """
+    decision()'s answer from context.book, if it holds the position searched
+    at least k plies deep; the tree is just the root.
+
+    Returns:
+        (best_move, root), or None to search
+    """
+    answer = context.book.lookup(state, k)
+    if answer is None:
+        return None
+    best_move, score, depth = answer
+    context.book_hit = True
+    context.score = score
+    context.depth_reached = depth
+    root = None
+    if context.capture_depth >= 0 or context.pv is not None:
+        context.tree = TreeStore(state.width, state.height)
+        root = principal_variation(state, best_move, score, (), context.tree)
+    if context.on_iteration is not None:
+        context.on_iteration(depth, best_move, score)
+    if tracing.TRACING and context.trace is not None:
+        context.trace(DECISION, 0, best_move, score)
+    return best_move, root
+
+def iterative_deepening(state: BitBoard, max_depth: int,
+                        use_alpha_beta: bool, use_expected_minimax: bool,
+                        context: SearchContext, time_ms: float = None,
+                        use_mtdf: bool = False):
+    """
+    Search depth 1, 2, ... until the time budget runs out, the search is
+    cancelled or max_depth is done. context.on_iteration, if set, hears
+    about each completed iteration.
+
+    Returns:
+        (best_move, root, score) of the deepest completed iteration
+    """
+    if time_ms is not None:
+        context.start_clock(time_ms)
+    elif context.deadline is None:
+        context.deadline = float('inf')  # No budget, but cancel() can still stop the search
+    deadline, context.deadline = context.deadline, None  # Depth 1 always completes
+    stack_size = len(state.move_stack)
+    best_move, root, score = None, None, None
+    empty_cells = state.width * state.height - state.mask.bit_count()
+
+    for depth in range(1, max_depth + 1):
+        try:
+            best_move, root, score = search_to_depth(state, depth, use_alpha_beta, use_expected_minimax, context,
+                                                     use_mtdf, score)
+        except SearchTimeout:
+            # Unwind the moves the aborted iteration left on the board
+            while len(state.move_stack) > stack_size:
+                state.undo()
+            break
+        context.depth_reached = depth
+        context.root_move_hint = best_move
+        if context.on_iteration is not None:
+            context.on_iteration(depth, best_move, score)
+        context.deadline = deadline
+        if context.cancelled:
+            break
+        # Deeper iterations cannot see anything new once every line ends on a full board
+        if depth >= empty_cells or context.time_left() <= 0:
+            break
+
+    return best_move, root, score
@@ -0,0 +1,103 @@
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+@lru_cache(maxsize=None)
+def center_ranks(width: int) -> Tuple[int, ...]:
+    """
+    Rank of each column when searching from the center outwards.
+
+    Columns equally far from the center keep left-before-right order, so on a
+    7-wide board the order is 3, 2, 4, 1, 5, 0, 6.
+    """
+    order = sorted(range(width), key=lambda col: (abs(2 * col - (width - 1)), col))
+    ranks = [0] * width
+    for rank, col in enumerate(order):
+        ranks[col] = rank
+    return tuple(ranks)
+
+class MoveOrdering:
+    """
+    Order in which alpha-beta tries the moves of a node.
+
+    The base class keeps column order and only moves the hash move (the
+    transposition table's best move, or the previous iteration's root move)
+    to the front. Subclasses override order() and cutoff() to learn from the
+    search as it runs.
+    """
+
+    def order(self, state, moves: List[int], ply: int, hash_move: Optional[int] = None) -> List[int]:
+        """
+        Args:
+            state: Position being searched, with the mover to play
+            moves: Legal columns in ascending order
+            ply: Distance from the root
+            hash_move: Move to try first, if any
+
+        Returns:
+            The moves in the order to search them
+        """
+        if hash_move in moves:
+            moves.remove(hash_move)
+            moves.insert(0, hash_move)
+        return moves
+
+    def cutoff(self, state, move: int, ply: int, depth: int):
+        """Record that ``move`` caused a beta cutoff with ``depth`` plies left."""
+
+    def new_search(self):
+        """Forget what was learned about the previous position."""
+
+class CenterOrdering(MoveOrdering):
+    """Static ordering: hash move first, then center columns outwards."""
+
+    def order(self, state, moves: List[int], ply: int, hash_move: Optional[int] = None) -> List[int]:
+        ranks = center_ranks(state.width)
+        moves.sort(key=ranks.__getitem__)
+        return super().order(state, moves, ply, hash_move)
+
+class HeuristicOrdering(MoveOrdering):
+    """
+    Hash move, then killer moves for the ply, then the remaining moves by
+    history score with center-out order breaking ties.
+
+    Killers are the last two moves that caused a cutoff at the same ply. The
+    history table credits a (player, column) pair with depth**2 per cutoff, so
+    moves that refute deep subtrees rank higher everywhere in the tree.
+    """
+
+    KILLER_SLOTS = 2
+
+    def __init__(self):
+        self.killers: List[List[Optional[int]]] = []
+        self.history: Dict[Tuple[int, int], int] = {}
+
+    def order(self, state, moves: List[int], ply: int, hash_move: Optional[int] = None) -> List[int]:
+        ranks = center_ranks(state.width)
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+        history = self.history
+        player = state.current_player
+
+        def priority(col):
+            if col == hash_move:
+                return (0, 0, 0)
+            if col in killers:
+                return (1, killers.index(col), 0)
+            return (2, -history.get((player, col), 0), ranks[col])
+
+        moves.sort(key=priority)
+        return moves
+
+    def cutoff(self, state, move: int, ply: int, depth: int):
+        while len(self.killers) <= ply:
+            self.killers.append([None] * self.KILLER_SLOTS)
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1:] = killers[:-1]
+            killers[0] = move
+        key = (state.current_player, move)
+        self.history[key] = self.history.get(key, 0) + depth * depth
+
+    def new_search(self):
+        """Drop the killers and halve the history so recent cutoffs dominate."""
+        self.killers = []
+        self.history = {key: score // 2 for key, score in self.history.items() if score > 1}
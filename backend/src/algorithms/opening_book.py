@@ -0,0 +1,180 @@
+"""
+Opening book: best moves for the first plies of a game, found offline by
+deep searches and read at search time without loading the file.
+
+The file is a header followed by fixed-size entries sorted by key. A
+position's key is its transposition table key, so a position and its
+left-right reflection share one entry, whose move is stored as played in
+the canonical orientation. A position looked up as the book searched it
+gets the search's move; its reflection gets that move reflected, which
+scores the same but, where moves tie, need not be the one a search of the
+reflection would pick.
+
+OpeningBook maps the file and binary-searches it; every process that
+opens the same book shares its pages, and opening it reads nothing but
+the header.
+
+    python -m src.algorithms.opening_book book.bin --plies 8 --depth 8
+"""
+import argparse
+import bisect
+import mmap
+import struct
+import sys
+import time
+from typing import Dict, Optional, Tuple
+from src.algorithms.transposition import position_key, canonical_move
+
+MAGIC = b"C4BOOK01"
+HEADER = struct.Struct("<8sBBBxI")  # Magic, width, height, plies, entry count
+ENTRY = struct.Struct("<QiBB2x")     # Key, score, canonical move, search depth
+KEY = struct.Struct("<Q")
+
+# Entry as held in memory while building: (score, canonical move, depth)
+BookEntry = Tuple[int, int, int]
+
+class BookKeys:
+    """The keys of a mapped book as a sequence, for bisect."""
+
+    def __init__(self, data, count: int):
+        self.data = data
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> int:
+        return KEY.unpack_from(self.data, HEADER.size + index * ENTRY.size)[0]
+
+class OpeningBook:
+    """A book file mapped read-only. decision() consults it through SearchContext.book."""
+
+    def __init__(self, path: str):
+        """
+        Raises:
+            ValueError: If the file is not an opening book
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.data) < HEADER.size:
+            raise ValueError(f"{path} is not an opening book")
+        magic, self.width, self.height, self.plies, self.count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or len(self.data) != HEADER.size + self.count * ENTRY.size:
+            raise ValueError(f"{path} is not an opening book")
+        self.keys = BookKeys(self.data, self.count)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def probe(self, key: int) -> Optional[BookEntry]:
+        """The entry stored under ``key``, or None."""
+        index = bisect.bisect_left(self.keys, key)
+        if index == self.count or self.keys[index] != key:
+            return None
+        _, score, move, depth = ENTRY.unpack_from(self.data, HEADER.size + index * ENTRY.size)
+        return score, move, depth
+
+    def lookup(self, state, depth: int) -> Optional[Tuple[int, int, int]]:
+        """
+        The book's answer for ``state``, if it was searched at least ``depth`` plies deep.
+
+        Args:
+            state: BitBoard to move from
+        Returns:
+            (move, score, depth searched), with the move as played on
+            ``state``: for a reflection of the searched position, a move
+            of the same score as the search's, not always the same move
+        """
+        entry = None
+        if state.width == self.width and state.height == self.height:
+            entry = self.probe(position_key(state, True))
+        if entry is None or entry[2] < depth:
+            self.misses += 1
+            return None
+        self.hits += 1
+        score, move, searched = entry
+        return canonical_move(state, move), score, searched
+
+    def stats(self) -> dict:
+        return {"entries": self.count, "plies": self.plies, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        self.data.close()
+
+def write_book(path: str, entries: Dict[int, BookEntry], width: int = 7, height: int = 6, plies: int = 0):
+    """Write ``entries`` (key -> (score, canonical move, depth)) as a book file."""
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, width, height, plies, len(entries)))
+        for key in sorted(entries):
+            f.write(ENTRY.pack(key, *entries[key]))
+
+def build_book(plies: int = 8, depth: int = 8, algorithm: str = "alphabeta",
+               width: int = 7, height: int = 6, progress=None) -> Dict[int, BookEntry]:
+    """
+    Search the positions of the first ``plies`` plies that the engine can face.
+
+    The engine may play either side. Where it is to move only its book move
+    is followed; every reply of the opponent is. Positions reached more than
+    once, or as a reflection, are searched once.
+
+    Args:
+        algorithm: As in an /ai/move request; its answer is the book move
+        progress: Called with the number of positions searched so far
+    Returns:
+        Entries for write_book()
+    """
+    # Imported here since the search pool imports this module
+    from src.algorithms.search_pool import request_context, run_request
+    from src.models.bitboard import BitBoard
+
+    entries: Dict[int, BookEntry] = {}
+
+    def visit(state: BitBoard, engine: int, ply: int):
+        if ply >= plies or not state.get_valid_moves():
+            return
+        if state.current_player != engine:
+            for col in state.get_valid_moves():
+                state.play(col)
+                visit(state, engine, ply + 1)
+                state.undo()
+            return
+        key = position_key(state, True)
+        entry = entries.get(key)
+        if entry is None:
+            request = {"board": state.board.tolist(), "current_player": state.current_player,
+                       "algorithm": algorithm, "depth": depth, "tree": "none"}
+            context = request_context(request)
+            context.book = None
+            move, _ = run_request(request, context)
+            entry = entries[key] = (int(context.score), canonical_move(state, move), depth)
+            if progress is not None:
+                progress(len(entries))
+        state.play(canonical_move(state, entry[1]))
+        visit(state, engine, ply + 1)
+        state.undo()
+
+    for engine in (1, 2):
+        visit(BitBoard(width, height), engine, 0)
+    return entries
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.algorithms.opening_book",
+                                     description="Build an opening book")
+    parser.add_argument("out", help="Book file to write")
+    parser.add_argument("--plies", type=int, default=8, help="Plies from the empty board to cover")
+    parser.add_argument("--depth", type=int, default=8, help="Search depth of each book move")
+    parser.add_argument("--algorithm", default="alphabeta", choices=("minimax", "alphabeta", "pvs", "mtdf"))
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    entries = build_book(args.plies, args.depth, args.algorithm,
+                         progress=lambda count: print(f"\r{count} positions", end="", file=sys.stderr))
+    write_book(args.out, entries, plies=args.plies)
+    print(f"\n{len(entries)} positions in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+"""
+Multi-core search for decision(workers=N).
+
+Minimax and expectimax split the root: every column's subtree is searched
+in its own process, and the root is put together from the results. The
+move and score are those of a single-process search, and so is the tree,
+apart from subtrees a single search cut short from its transposition
+table. Alpha-beta runs Lazy SMP: the main process searches as usual while
+helper processes search the same root, starting from different root
+moves, and all of them share one transposition table. Since the table
+is only probed at exactly the same depth, whatever the helpers store is
+a valid bound and the main search still returns the move and score it
+would return alone; only the node counts and the shape of the tree
+depend on timing.
+"""
+import ctypes
+import multiprocessing
+import time
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
+from typing import Dict, Optional, Tuple
+from src.models.bitboard import BitBoard
+from src.models.board import ConnectFourBoard
+from src.models.node import TreeNode
+from src.models.tree_store import TreeStore
+from src.algorithms import minimax
+from src.algorithms.evaluation import IncrementalEvaluator
+from src.algorithms.move_ordering import HeuristicOrdering, center_ranks
+from src.algorithms.search_context import SearchContext, SearchTimeout, CAPTURE_NONE
+from src.algorithms.transposition import (TranspositionTable, SharedTranspositionTable,
+                                          DEFAULT_TABLE_SIZE)
+
+# How often the main process checks its deadline while waiting for workers
+POLL_S = 0.05
+
+# Per worker count: (executor, shared table words, stop flag)
+_pools: Dict[int, Tuple[ProcessPoolExecutor, ctypes.Array, ctypes.c_byte]] = {}
+
+# Set in each worker process by _init_worker()
+_table_words = None
+_stop = None
+
+def _init_worker(table_words, stop):
+    global _table_words, _stop
+    _table_words = table_words
+    _stop = stop
+
+def _pool(workers: int):
+    """Worker processes for ``workers``-way searches, started on first use and then reused."""
+    if workers not in _pools:
+        mp_context = multiprocessing.get_context("spawn")
+        table_words = mp_context.RawArray('Q', 2 * DEFAULT_TABLE_SIZE)
+        stop = mp_context.RawValue('b', 0)
+        executor = ProcessPoolExecutor(workers, mp_context=mp_context, initializer=_init_worker,
+                                       initargs=(table_words, stop))
+        _pools[workers] = (executor, table_words, stop)
+    return _pools[workers]
+
+def shutdown():
+    """Stop every worker process started by this module."""
+    while _pools:
+        _, (executor, _, _) = _pools.popitem()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def _worker_board(array, player: int) -> BitBoard:
+    state = BitBoard.from_array(array, player)
+    state.evaluator = IncrementalEvaluator(state)
+    return state
+
+def _worker_context(context: SearchContext, time_ms: Optional[float]):
+    # Workers poll the shared stop flag at their clock checks, so they always get a deadline
+    context.interrupt = lambda: _stop.value
+    context.start_clock(time_ms if time_ms is not None else float('inf'))
+    return context
+
+def _search_subtree(array, player: int, move: int, k: int, use_alpha_beta: bool,
+                    use_expected_minimax: bool, capture, time_ms: Optional[float]):
+    """Worker side of root splitting: the subtree after ``move`` from the root position."""
+    state = _worker_board(array, player)
+    state.play(move)
+    context = _worker_context(SearchContext(table=None if use_expected_minimax else TranspositionTable(),
+                                            capture=capture), time_ms)
+    started = time.perf_counter()
+    if use_expected_minimax:
+        _, node, score = minimax.expected_min(state, k, 1, context)
+    else:
+        _, node, score = minimax.minimize(state, k, 1, use_alpha_beta, context=context)
+    line = context.pv[1] if context.pv is not None else None
+    counts = (context.nodes, context.leaves, context.max_depth, time.perf_counter() - started)
+    return node, score, line, counts
+
+def _helper(array, player: int, k: int, helper: int, use_pvs: bool, use_mtdf: bool, generation: int) -> int:
+    """Lazy SMP helper: search the root to depth 1..k until stopped; returns the nodes visited."""
+    state = _worker_board(array, player)
+    table = SharedTranspositionTable(_table_words)
+    table.generation = generation
+    context = _worker_context(SearchContext(table=table, ordering=HeuristicOrdering(), capture=CAPTURE_NONE), None)
+    context.scout = use_pvs
+    ranks = center_ranks(state.width)
+    root_moves = sorted(state.get_valid_moves(), key=ranks.__getitem__)
+    for depth in range(1, k + 1):
+        # Each helper starts from a different root move so they fill the table in different places
+        context.root_move_hint = root_moves[helper % len(root_moves)]
+        try:
+            minimax.search_to_depth(state, depth, True, False, context, use_mtdf)
+        except SearchTimeout:
+            break
+    return context.nodes
+
+def shared_table(workers: int) -> SharedTranspositionTable:
+    """An empty table in the memory the ``workers``-way helpers share."""
+    table = SharedTranspositionTable(_pool(workers)[1])
+    table.clear()
+    return table
+
+def start_helpers(state: BitBoard, k: int, context: SearchContext, workers: int,
+                  use_pvs: bool = False, use_mtdf: bool = False) -> list:
+    """
+    Start workers - 1 Lazy SMP helpers on the shared table in context.table.
+
+    Returns:
+        Their futures, for stop_helpers()
+    """
+    executor, _, stop = _pool(workers)
+    stop.value = 0
+    context.parallel = {"mode": "lazy_smp", "workers": workers, "started": time.perf_counter()}
+    return [executor.submit(_helper, state.board, state.current_player, k, helper, use_pvs, use_mtdf,
+                            context.table.generation)
+            for helper in range(1, workers)]
+
+def stop_helpers(helpers: list, context: SearchContext):
+    """Stop the helpers and add their counts to context.parallel."""
+    _pools[context.parallel["workers"]][2].value = 1
+    context.parallel["helper_nodes"] = sum(helper.result() for helper in helpers)
+    context.parallel["wall_s"] = time.perf_counter() - context.parallel.pop("started")
+
+def _split_depth(state: BitBoard, k: int, use_alpha_beta: bool, use_expected_minimax: bool,
+                 context: SearchContext, workers: int) -> list:
+    """
+    Search every root column's subtree to depth k in the worker processes.
+
+    Raises:
+        SearchTimeout: If the context's deadline passed or it was cancelled;
+            the workers are stopped first
+    """
+    executor, _, stop = _pool(workers)
+    stop.value = 0
+    time_ms = None if context.deadline is None else max(0.0, context.time_left() * 1000)
+    futures = [executor.submit(_search_subtree, state.board, state.current_player, move, k, use_alpha_beta,
+                               use_expected_minimax, context.capture, time_ms)
+               for move in state.get_valid_moves()]
+    try:
+        while True:
+            done, pending = wait(futures, timeout=POLL_S, return_when=FIRST_EXCEPTION)
+            if not pending or any(future.exception() is not None for future in done):
+                break
+            if context.deadline is not None:
+                context.check_deadline()
+    except SearchTimeout:
+        stop.value = 1
+        wait(futures)
+        raise
+    results = [future.result() for future in futures]
+    for _, _, _, (nodes, leaves, max_depth, seconds) in results:
+        context.nodes += nodes
+        context.leaves += leaves
+        context.max_depth = max(context.max_depth, max_depth)
+        context.parallel["work_s"] += seconds
+    context.nodes += 1  # The root
+    return results
+
+def _root(state: BitBoard, context: SearchContext, move: int, score) -> Optional[TreeNode]:
+    context.tree = TreeStore(state.width, state.height)
+    if context.capture_depth < 0:
+        return None
+    return TreeNode(move=move, score=score, player=state.current_player, depth=0, board=state, store=context.tree)
+
+def _combine_minimax(state: BitBoard, context: SearchContext, results: list):
+    """The root of maximize() from its children's results, in column order."""
+    moves = state.get_valid_moves()
+    scores = [score for _, score, _, _ in results]
+    best = scores.index(max(scores))  # Leftmost of equal scores, as maximize() picks
+    best_move, max_utility = moves[best], scores[best]
+    root_node = _root(state, context, best_move, max_utility)
+    if root_node is not None:
+        for move, (node, *_) in zip(moves, results):
+            if node is not None:
+                root_node.add_child(node)
+                node.move = move
+                if move == best_move:
+                    root_node.set_best_child(node)
+    if context.pv is not None:
+        line = ((best_move, best_move, max_utility),) + results[best][2]
+        root_node = minimax.principal_variation(state, best_move, max_utility, line, context.tree)
+    return best_move, root_node, max_utility
+
+def _combine_expectimax(state: BitBoard, k: int, context: SearchContext, results: list):
+    """The root of expected_max() from its landing columns' results, in column order."""
+    moves = state.get_valid_moves()
+    root_node = _root(state, context, None, None)
+    # Outcomes already searched, as chance_node() caches them
+    outcomes = {}
+    for move, (node, score, line, _) in zip(moves, results):
+        if node is not None:
+            node = TreeNode.at(context.tree, context.tree.graft(node.store, node.index))
+        outcomes[move] = (node, score, line)
+
+    best_move, best_child, best_line, best_expected_utility = None, None, (), float('-inf')
+    for move, neighbors, probs in minimax.slip_outcomes(tuple(moves)):
+        expected_utility, child_node, line = minimax.chance_node(state, k, 0, move, neighbors, probs,
+                                                                 minimax.expected_min, root_node, outcomes,
+                                                                 context=context)
+        if expected_utility > best_expected_utility:
+            best_expected_utility = expected_utility
+            best_move = move
+            best_child = child_node
+            best_line = line
+
+    if root_node is not None:
+        root_node.move = best_move
+        root_node.score = best_expected_utility
+        root_node.set_best_child(best_child)
+    if context.pv is not None:
+        root_node = minimax.principal_variation(state, best_move, best_expected_utility, best_line, context.tree)
+    return best_move, root_node, best_expected_utility
+
+def root_split(state: BitBoard, k: int, use_alpha_beta: bool, use_expected_minimax: bool,
+               context: SearchContext, workers: int, time_ms: Optional[float] = None):
+    """
+    Minimax or expectimax with each root column searched in its own process.
+
+    Deepens one ply at a time like iterative_deepening() when a time budget
+    or context.on_iteration is given.
+
+    Returns:
+        (best_move, root, score) as search_to_depth() or iterative_deepening()
+    """
+    context.parallel = {"mode": "root_split", "workers": workers, "work_s": 0.0}
+    started = time.perf_counter()
+    iterative = time_ms is not None or context.on_iteration is not None
+    if time_ms is not None:
+        context.start_clock(time_ms)
+    deadline = context.deadline
+    if iterative:
+        context.deadline = None  # Depth 1 always completes
+    combine = (lambda results: _combine_expectimax(state, depth, context, results)) if use_expected_minimax \
+        else (lambda results: _combine_minimax(state, context, results))
+    empty_cells = state.width * state.height - state.mask.bit_count()
+
+    best_move, root, score = None, None, None
+    for depth in range(1, k + 1) if iterative else (k,):
+        try:
+            results = _split_depth(state, depth, use_alpha_beta, use_expected_minimax, context, workers)
+        except SearchTimeout:
+            if not iterative:
+                raise
+            break
+        best_move, root, score = combine(results)
+        context.depth_reached = depth
+        if context.on_iteration is not None:
+            context.on_iteration(depth, best_move, score)
+        context.deadline = deadline
+        if context.cancelled or depth >= empty_cells or context.time_left() <= 0:
+            break
+
+    context.parallel["wall_s"] = time.perf_counter() - started
+    return best_move, root, score
+
+def measure_speedup(board: ConnectFourBoard, k: int, workers: int, **options) -> dict:
+    """
+    Time decision() on one core and on ``workers`` and compare.
+
+    Args:
+        options: Further decision() arguments, such as use_alpha_beta
+
+    Returns:
+        serial_s, parallel_s, speedup, and whether both chose the same move and score
+    """
+    timings = {}
+    answers = {}
+    for label, count in (("serial", 1), ("parallel", workers)):
+        context = SearchContext(capture=CAPTURE_NONE)
+        if not options.get("use_expected_minimax"):
+            context.table = TranspositionTable()
+        if options.get("use_alpha_beta") or options.get("use_pvs") or options.get("use_mtdf"):
+            context.ordering = HeuristicOrdering()
+        started = time.perf_counter()
+        move, _ = minimax.decision(board, k, context=context, workers=count, **options)
+        timings[label] = time.perf_counter() - started
+        answers[label] = (move, context.score)
+    return {"serial_s": timings["serial"], "parallel_s": timings["parallel"],
+            "speedup": timings["serial"] / timings["parallel"],
+            "same_result": answers["serial"] == answers["parallel"]}
@@ -0,0 +1,151 @@
+import time
+from typing import List, Optional, Union
+from src.algorithms.transposition import TranspositionTable, canonical_move
+from src.algorithms.move_ordering import MoveOrdering
+
+# Tree capture levels; an int N captures the first N plies below the root
+CAPTURE_NONE = "none"  # No tree, only the move and score
+CAPTURE_PV = "pv"      # The root and the line of best children
+CAPTURE_FULL = "full"  # Every node searched
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time budget has run out."""
+
+class SearchContext:
+    """
+    State shared by every node of a single search.
+
+    Passed down through maximize()/minimize() so optional helpers such as the
+    transposition table and move ordering can be plugged in without widening
+    every signature.
+    """
+
+    # The clock is read once every CHECK_INTERVAL + 1 nodes
+    CHECK_INTERVAL = 1023
+
+    def __init__(self, table: Optional[TranspositionTable] = None,
+                 ordering: Optional[MoveOrdering] = None,
+                 capture: Union[str, int] = CAPTURE_FULL):
+        """
+        Args:
+            table: Transposition table to use, or None to search without one
+            ordering: Move ordering for alpha-beta; by default moves are tried
+                in column order with only the hash move brought forward
+            capture: How much of the search tree to build: CAPTURE_NONE,
+                CAPTURE_PV, CAPTURE_FULL, or the number of plies below the root
+        """
+        self.table = table
+        self.ordering = ordering if ordering is not None else MoveOrdering()
+        self.nodes = 0  # Nodes visited, leaves included
+        self.leaves = 0  # Nodes scored by eval()
+        self.max_depth = 0  # Deepest ply a leaf was scored at
+        self.cutoffs = 0  # Beta cutoffs in alpha-beta
+        self.first_move_cutoffs = 0  # Cutoffs caused by the first move tried
+        self.scout = False  # Principal variation search: null-window scouts after the first move
+        self.researches = 0  # Scouts and aspiration windows that had to be searched again
+        self.deadline: Optional[float] = None  # time.perf_counter() value
+        self.started: Optional[float] = None
+        self.depth_reached = 0
+        self.root_move_hint: Optional[int] = None  # Searched first at the root
+        self.tree = None  # TreeStore the current search builds its nodes in
+        self.score = None  # Value of the root after decision()
+        # Called as on_iteration(depth, best_move, score) after each completed
+        # iterative deepening iteration; setting it makes decision() deepen
+        self.on_iteration = None
+        self.cancelled = False
+        self.interrupt = None  # Polled at each clock check; cancels the search once it returns True
+        self.parallel = None  # Mode, workers and timings of a multi-process search
+        self.trace = None  # Tracer called at search events (see src.algorithms.tracing)
+        self.elapsed = 0.0  # Seconds the last decision() took
+        self.book = None  # OpeningBook decision() answers from when it holds the position
+        self.book_hit = False  # Whether the last decision() came from the book
+        self.set_capture(capture)
+
+    def set_capture(self, capture: Union[str, int]):
+        """Choose how much of the tree later searches build (see __init__)."""
+        self.pv = None  # Ply -> best line below it, recorded in CAPTURE_PV mode
+        if capture == CAPTURE_FULL:
+            self.capture_depth = float('inf')
+        elif capture == CAPTURE_NONE:
+            self.capture_depth = -1
+        elif capture == CAPTURE_PV:
+            self.capture_depth = -1  # The line is turned into nodes once the root is done
+            self.pv = {}
+        elif isinstance(capture, int) and not isinstance(capture, bool) and capture >= 0:
+            self.capture_depth = capture  # Nodes at depth <= capture are built
+        else:
+            raise ValueError(f"Unknown tree capture level: {capture!r}")
+        self.capture = capture
+
+    def start_clock(self, time_ms: float):
+        """Start the time budget for this search."""
+        self.started = time.perf_counter()
+        self.deadline = self.started + time_ms / 1000
+
+    def time_left(self) -> float:
+        """Seconds left before the deadline (infinite without one)."""
+        if self.deadline is None:
+            return float('inf')
+        return self.deadline - time.perf_counter()
+
+    def cancel(self):
+        """
+        Stop the search at its next clock check. Iterative deepening still
+        answers from the deepest iteration that finished. Safe to call from
+        another thread.
+        """
+        self.cancelled = True
+        if self.deadline is not None:  # None while depth 1 must complete
+            self.deadline = 0.0
+
+    def check_deadline(self):
+        """Abort the search by raising SearchTimeout once the deadline has passed or it was cancelled."""
+        if self.interrupt is not None and not self.cancelled and self.interrupt():
+            self.cancel()
+        if time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+
+    def order_moves(self, state, moves: List[int], ply: int, key: Optional[int] = None) -> List[int]:
+        """
+        Order an alpha-beta node's moves.
+
+        The previous iteration's best move goes first at the root; elsewhere
+        the transposition table's best move for ``key`` does.
+        """
+        hash_move = None
+        if ply == 0 and self.root_move_hint is not None:
+            hash_move = self.root_move_hint
+        elif key is not None and self.table is not None:
+            hash_move = canonical_move(state, self.table.best_move(key))
+        return self.ordering.order(state, moves, ply, hash_move)
+
+    def record_cutoff(self, state, move: int, ply: int, depth: int, index: int):
+        """Count a cutoff by the ``index``-th move tried and let the ordering learn from it."""
+        self.cutoffs += 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+        self.ordering.cutoff(state, move, ply, depth)
+
+    def count_leaf(self, depth: int):
+        """Count a node scored by eval() at ply ``depth``."""
+        self.leaves += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def first_move_cutoff_rate(self) -> float:
+        """Fraction of cutoffs caused by the first move tried."""
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    def stats(self) -> dict:
+        """Counters collected during the search."""
+        stats = {"nodes": self.nodes, "leaves": self.leaves, "depth": self.depth_reached,
+                 "max_depth": self.max_depth, "elapsed_s": self.elapsed,
+                 "cutoffs": self.cutoffs, "first_move_cutoffs": self.first_move_cutoffs,
+                 "researches": self.researches}
+        if self.table is not None:
+            stats["table"] = self.table.stats()
+        if self.parallel is not None:
+            stats["parallel"] = self.parallel
+        if self.book is not None:
+            stats["book_hit"] = self.book_hit
+        return stats
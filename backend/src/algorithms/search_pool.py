@@ -0,0 +1,358 @@
+import asyncio
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+import numpy as np
+from src.models.board import ConnectFourBoard
+from src.algorithms.minimax import decision
+from src.algorithms.search_context import SearchContext, SearchTimeout
+from src.algorithms.transposition import TranspositionTable, SharedTranspositionTable, DEFAULT_TABLE_SIZE
+from src.algorithms.move_ordering import HeuristicOrdering
+from src.algorithms.opening_book import OpeningBook
+
+class PoolBusy(Exception):
+    """Raised when a search is submitted while max_pending searches are already waiting or running."""
+
+class SearchDeadlineExceeded(Exception):
+    """Raised when a fixed-depth search is still running at its deadline."""
+
+class WorkerCrashed(Exception):
+    """Raised when the worker process running a search died, again after one retry."""
+
+# The book named by OPENING_BOOK, mapped on first use in each process
+_book: Optional[OpeningBook] = None
+
+def opening_book() -> Optional[OpeningBook]:
+    """The opening book named by OPENING_BOOK, or None when it is unset."""
+    global _book
+    path = os.environ.get("OPENING_BOOK")
+    if not path:
+        return None
+    if _book is None or _book.path != path:
+        _book = OpeningBook(path)
+    return _book
+
+def request_context(request: dict) -> SearchContext:
+    """Search state for a request's algorithm and tree capture level."""
+    algorithm = request.get("algorithm", "minimax")
+    use_alpha_beta = algorithm in ("alphabeta", "pvs", "mtdf")
+    use_expected_minimax = algorithm == "expectimax"
+    context = SearchContext(table=None if use_expected_minimax else TranspositionTable(),
+                            ordering=HeuristicOrdering() if use_alpha_beta else None,
+                            capture=request.get("tree", "full"))
+    if not use_expected_minimax:
+        context.book = opening_book()
+    return context
+
+def run_request(request: dict, context: SearchContext):
+    """
+    Run decision() for an /ai/move request body.
+
+    Returns:
+        decision()'s (move, root), or -1 when there is no move
+    """
+    # Convert the board state to ConnectFourBoard
+    board = ConnectFourBoard()
+    # Convert list of lists to numpy array
+    board.board = np.array(request["board"], dtype=int)
+    board.current_player = request["current_player"]
+
+    # Get AI move based on selected algorithm
+    algorithm = request.get("algorithm", "minimax")
+    use_pvs = algorithm == "pvs"
+    use_mtdf = algorithm == "mtdf"  # Fewest nodes of the alpha-beta drivers
+    use_expected_minimax = algorithm == "expectimax"
+    use_alpha_beta = algorithm == "alphabeta" or use_pvs or use_mtdf
+
+    return decision(
+        state=board,
+        k=request.get("depth", 4),
+        use_alpha_beta=use_alpha_beta,
+        use_expected_minimax=use_expected_minimax,
+        context=context,
+        time_ms=request.get("time_ms"),
+        use_pvs=use_pvs,
+        use_mtdf=use_mtdf
+    )
+
+# Set in each worker process by _init_worker()
+_cancel_flags = None
+_progress = None
+_table_words = None
+
+def _init_worker(cancel_flags, progress, table_words):
+    global _cancel_flags, _progress, _table_words
+    _cancel_flags = cancel_flags
+    _progress = progress
+    _table_words = table_words
+
+def _search(slot: int, ticket: int, request: dict, deadline_s: float, stream: bool,
+            generation: Optional[int] = None) -> dict:
+    """
+    Worker side of SearchPool.run().
+
+    The search stops at its next clock check once the slot's cancel flag is
+    raised or ``deadline_s`` has passed. Given a ``generation``, it searches
+    on the shared table as of that generation instead of a fresh table.
+    """
+    context = request_context(request)
+    if generation is not None and context.table is not None:
+        context.table = SharedTranspositionTable(_table_words)
+        context.table.generation = generation
+    started = time.perf_counter()
+    context.start_clock(deadline_s * 1000)
+    context.interrupt = lambda: _cancel_flags[slot]
+    time_ms = request.get("time_ms")
+    if time_ms is not None:
+        request = dict(request, time_ms=min(time_ms, deadline_s * 1000))
+    reports = 0
+    if stream:
+        def report(depth, move, score):
+            nonlocal reports
+            elapsed = time.perf_counter() - started
+            _progress.put((ticket, {"type": "iteration", "depth": depth, "move": move, "score": score,
+                                  "nodes": context.nodes,
+                                  "nps": int(context.nodes / elapsed) if elapsed > 0 else None}))
+            reports += 1
+        context.on_iteration = report
+
+    try:
+        result = run_request(request, context)
+    except SearchTimeout:
+        if context.cancelled:
+            result = -1
+        else:
+            raise SearchDeadlineExceeded(f"No answer within {deadline_s:g}s")
+    move, root = result if result != -1 else (None, None)
+    return {"move": move, "root": root, "depth": context.depth_reached, "score": context.score,
+            "nodes": context.nodes, "cancelled": context.cancelled, "stats": context.stats(),
+            "reports": reports}
+
+class SearchPool:
+    """
+    Runs searches in worker processes, so a deep search neither blocks the
+    event loop nor waits for the GIL held by another search.
+
+    At most ``max_pending`` searches are queued or running at once; more are
+    refused with PoolBusy instead of queueing without bound. Each search has
+    a cancel flag in shared memory that its worker polls at every clock
+    check, which is how a search stops when its client goes away.
+
+    The workers also share one transposition table, which batches of
+    searches use so positions from the same games are not searched twice.
+    Each batch starts a new table generation, so entries left by earlier
+    batches give way to its own.
+
+    A worker that dies (killed, or out of memory) breaks the executor for
+    every search in it. The pool then starts a new executor, with new shared
+    memory and progress queue, and runs each of those searches once more.
+    """
+
+    # How often run() asks whether the client has disconnected
+    POLL_S = 0.1
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None,
+                 deadline_s: float = 60.0):
+        """
+        Args:
+            workers: Worker processes, by default one per core
+            max_pending: Searches queued or running at once, by default 4 per worker
+            deadline_s: Longest a search may run. Iterative deepening answers
+                from its deepest finished iteration at the deadline; a
+                fixed-depth search fails with SearchDeadlineExceeded.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or 4 * self.workers
+        self.deadline_s = deadline_s
+        self.generation = 0  # Of the shared table, advanced by each batch
+        self.free: List[int] = list(range(self.max_pending))
+        self.listeners: Dict[int, Callable[[dict], None]] = {}  # Ticket -> progress callback
+        self.tickets = itertools.count()  # Tell apart the searches that used a slot
+        self.restarts = 0  # Executors started again after a worker died
+        self._start()
+
+    def _start(self):
+        """Start the executor, with the shared memory and progress queue its workers get."""
+        # Workers are spawned rather than forked from the server, whose
+        # threads (including the progress reader) a fork would not carry over
+        mp_context = multiprocessing.get_context("spawn")
+        self.cancel_flags = mp_context.Array('b', self.max_pending, lock=False)
+        self.table_words = mp_context.RawArray('Q', 2 * DEFAULT_TABLE_SIZE)
+        self.progress = mp_context.Queue()
+        self.executor = ProcessPoolExecutor(self.workers, mp_context=mp_context, initializer=_init_worker,
+                                            initargs=(self.cancel_flags, self.progress, self.table_words))
+        self.reader = threading.Thread(target=self._read_progress, args=(self.progress,), daemon=True)
+        self.reader.start()
+
+    def _restart(self, broken: ProcessPoolExecutor):
+        """Replace ``broken`` unless another search already has."""
+        if self.executor is not broken:
+            return
+        progress = self.progress
+        broken.shutdown(wait=False, cancel_futures=True)
+        self.restarts += 1
+        self._start()
+        # Ends the old reader, unless the dead worker was holding the queue's
+        # write lock; then the message never goes out, and exit must not wait for it
+        progress.cancel_join_thread()
+        progress.put(None)
+
+    @classmethod
+    def from_env(cls) -> 'SearchPool':
+        """Pool sized by SEARCH_WORKERS, SEARCH_MAX_PENDING and SEARCH_DEADLINE_S."""
+        workers = os.environ.get("SEARCH_WORKERS")
+        max_pending = os.environ.get("SEARCH_MAX_PENDING")
+        return cls(workers=int(workers) if workers else None,
+                   max_pending=int(max_pending) if max_pending else None,
+                   deadline_s=float(os.environ.get("SEARCH_DEADLINE_S", 60.0)))
+
+    def _read_progress(self, progress):
+        # Hands progress messages from the workers to the listener of their search
+        for ticket, message in iter(progress.get, None):
+            listener = self.listeners.get(ticket)
+            if listener is not None:
+                listener(message)
+
+    def pending(self) -> int:
+        """Searches queued or running, including cancelled ones a worker has not let go of."""
+        return self.max_pending - len(self.free)
+
+    async def run(self, request: dict,
+                  on_iteration: Optional[Callable[[dict], None]] = None,
+                  disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+                  cancelled: Optional[asyncio.Event] = None,
+                  shared_table: bool = False) -> dict:
+        """
+        Search an /ai/move request body in a worker.
+
+        Args:
+            on_iteration: Called on the event loop with each iteration
+                report; setting it makes the search deepen iteratively.
+                Every report has been passed on by the time run() returns.
+            disconnected: Polled while waiting; the search is cancelled once
+                it returns True
+            cancelled: Setting this event cancels the search
+            shared_table: Search with the table the workers share instead
+                of a fresh one; the move and score are the same either way,
+                since entries are only reused at the depth they were
+                searched to and the root is always searched
+
+        Returns:
+            move, root (TreeNode or None), depth, score, nodes, cancelled
+            and stats (SearchContext.stats(), None if it never ran);
+            move is None when there was no move or the search was cancelled
+            before finishing depth 1
+
+        Raises:
+            PoolBusy: If max_pending searches are already waiting or running
+            SearchDeadlineExceeded: If a fixed-depth search hit the deadline
+            WorkerCrashed: If its worker died both times it was run; a
+                search whose worker died is run once more from the start,
+                so its iteration reports begin again at depth 1
+        """
+        for _ in range(2):
+            executor = self.executor
+            try:
+                return await self._run(request, on_iteration, disconnected, cancelled, shared_table)
+            except BrokenProcessPool:
+                self._restart(executor)
+        raise WorkerCrashed("The search's worker process died")
+
+    async def _run(self, request: dict, on_iteration, disconnected, cancelled, shared_table: bool) -> dict:
+        """One attempt at run()."""
+        if not self.free:
+            raise PoolBusy(f"{self.max_pending} searches already pending")
+        slot = self.free.pop()
+        ticket = next(self.tickets)
+        self.cancel_flags[slot] = 0
+        delivered = 0
+        sent = None  # Reports the worker put on the progress queue, once it has answered
+        caught_up = asyncio.Event()
+
+        def deliver(message):
+            nonlocal delivered
+            delivered += 1
+            on_iteration(message)
+            if delivered == sent:
+                caught_up.set()
+
+        if on_iteration is not None:
+            loop = asyncio.get_running_loop()
+            self.listeners[ticket] = lambda message: loop.call_soon_threadsafe(deliver, message)
+        job = None
+        try:
+            job = self.executor.submit(_search, slot, ticket, request, self.deadline_s, on_iteration is not None,
+                                      self.generation if shared_table else None)
+            future = asyncio.wrap_future(job)
+            while True:
+                done, _ = await asyncio.wait((future,), timeout=self.POLL_S)
+                if done:
+                    if future.cancelled():  # Cancelled before a worker picked it up
+                        return {"move": None, "root": None, "depth": 0, "score": None,
+                                "nodes": 0, "cancelled": True, "stats": None}
+                    result = future.result()
+                    sent = result.pop("reports")
+                    if delivered < sent:
+                        # The answer can overtake the last reports, which
+                        # come through the progress queue and reader thread
+                        await caught_up.wait()
+                    return result
+                if (cancelled is not None and cancelled.is_set()) or \
+                        (disconnected is not None and await disconnected()):
+                    self.cancel_flags[slot] = 1
+                    job.cancel()  # Only takes effect if the search has not started
+        except asyncio.CancelledError:
+            self.cancel_flags[slot] = 1
+            raise
+        finally:
+            self.listeners.pop(ticket, None)
+            if job is None or job.done():
+                self.free.append(slot)
+            else:
+                # The slot's flag stays raised until the worker has let go of it
+                job.add_done_callback(lambda _: self.free.append(slot))
+
+    async def run_batch(self, requests: List[dict]) -> AsyncIterator[Tuple[int, Union[dict, Exception]]]:
+        """
+        Search many request bodies on the shared table, yielding
+        ``(index, result)`` in the order the searches finish.
+
+        Enough searches are kept in flight to keep every worker busy without
+        taking all max_pending slots from other clients. A search that fails
+        with PoolBusy, SearchDeadlineExceeded or WorkerCrashed yields the
+        exception as its result instead of ending the batch. Closing the
+        generator cancels the searches still running.
+        """
+        self.generation += 1
+
+        async def search(index: int, request: dict):
+            try:
+                return index, await self.run(request, shared_table=True)
+            except (PoolBusy, SearchDeadlineExceeded, WorkerCrashed) as e:
+                return index, e
+
+        waiting = enumerate(requests)
+        running = {asyncio.create_task(search(index, request))
+                   for index, request in itertools.islice(waiting, min(2 * self.workers, self.max_pending))}
+        try:
+            while running:
+                done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    following = next(waiting, None)
+                    if following is not None:
+                        running.add(asyncio.create_task(search(*following)))
+                    yield task.result()
+        finally:
+            for task in running:
+                task.cancel()
+
+    def shutdown(self):
+        """Stop the workers once the searches in flight are done."""
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.progress.put(None)
+        self.reader.join()
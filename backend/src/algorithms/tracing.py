@@ -0,0 +1,42 @@
+"""
+Search tracing.
+
+A tracer is a callable taking ``(event, depth, move, score)``. The search
+calls SearchContext.trace, when one is set, at the events below and passes
+plain values: nothing is formatted unless the tracer does it. With no
+tracer, each call site costs one test against None, and with TRACING off
+the searches do not even read the tracer from the context.
+"""
+import logging
+from typing import Callable, List, Optional, Tuple
+
+# Set to False to take tracing out of the searches entirely. The searches
+# read it from this module at each node, so setting it at run time works.
+TRACING = True
+
+# Events, with what move and score hold
+LEAF = "leaf"          # A node scored by eval(): no move, its score
+ORDER = "order"        # An interior node's moves in search order, no score
+MOVE = "move"          # A move searched from an interior node, its score
+DECISION = "decision"  # decision()'s answer: its move and score
+
+Tracer = Callable[[str, int, Optional[object], Optional[float]], None]
+
+class TraceRecorder:
+    """Tracer that keeps every event, for tests and debugging sessions."""
+
+    def __init__(self):
+        self.events: List[Tuple[str, int, Optional[object], Optional[float]]] = []
+
+    def __call__(self, event: str, depth: int, move, score):
+        self.events.append((event, depth, move, score))
+
+    def count(self, event: str) -> int:
+        """Number of events of one kind."""
+        return sum(1 for recorded in self.events if recorded[0] == event)
+
+def log_tracer(logger: logging.Logger, level: int = logging.DEBUG) -> Tracer:
+    """Tracer that writes each event to ``logger``, formatted only if the level is enabled."""
+    def trace(event: str, depth: int, move, score):
+        logger.log(level, "%s depth=%d move=%s score=%s", event, depth, move, score)
+    return trace
@@ -0,0 +1,214 @@
+from typing import Optional, Tuple
+
+# Bound types stored with each score
+EXACT = 0  # Score is the true minimax value
+LOWER = 1  # True value is >= score (search failed high)
+UPPER = 2  # True value is <= score (search failed low)
+
+DEFAULT_TABLE_SIZE = 1 << 18
+
+SIDE_KEY = 0x5D3F1E2B9C4A7086      # Mixed in when player 2 is to move
+MIN_NODE_KEY = 0x9E3779B97F4A7C15  # Mixed in for minimizing nodes
+
+# Entry layout: (key, depth, score, flag, best_move, generation)
+Entry = Tuple[int, int, float, int, Optional[int], int]
+
+def position_key(state, maximizing: bool) -> int:
+    """
+    Key a search node by position, side to move and node type.
+
+    A position and its left-right reflection share a key, so the table
+    holds one entry for both; best moves are stored as played in the
+    canonical orientation (see canonical_move()).
+
+    Args:
+        state: Board with an incrementally maintained ``hash`` and ``mirror_hash``
+        maximizing: True for maximize() nodes, False for minimize() nodes
+
+    Returns:
+        64-bit table key
+    """
+    key = state.canonical_hash()
+    if state.current_player == 2:
+        key ^= SIDE_KEY
+    if not maximizing:
+        key ^= MIN_NODE_KEY
+    return key
+
+def canonical_move(state, move: Optional[int]) -> Optional[int]:
+    """
+    Translate a move between ``state`` and its canonical orientation.
+
+    Reflecting twice gives the move back, so the same call translates a
+    table entry's move for ``state`` and a move of ``state`` for the table.
+    """
+    if move is None or not state.is_mirrored():
+        return move
+    return state.mirror_move(move)
+
+def bound_flag(score: float, alpha: float, beta: float) -> int:
+    """Classify a fail-soft alpha-beta result against the window it was searched with."""
+    if score <= alpha:
+        return UPPER
+    if score >= beta:
+        return LOWER
+    return EXACT
+
+class TranspositionTable:
+    """
+    Fixed-size table of search results keyed by Zobrist hash.
+
+    Each slot holds one entry. A new entry replaces the old one if it is for
+    the same position, if the old one was written by an earlier search, or if
+    it was searched at least as deep (depth-preferred replacement).
+    """
+
+    def __init__(self, size: int = DEFAULT_TABLE_SIZE):
+        """
+        Args:
+            size: Number of slots
+        """
+        self.size = size
+        self.entries: list = [None] * size
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.replacements = 0
+
+    def new_search(self):
+        """Age existing entries so a new search may overwrite them freely."""
+        self.generation += 1
+
+    def probe(self, key: int, depth: int) -> Optional[Entry]:
+        """
+        Look up a position searched to exactly ``depth`` plies.
+
+        Scores from a different depth are not returned because the heuristic
+        value at the horizon changes with depth, and reusing them would change
+        what decision() answers for a given ``k``.
+
+        Returns:
+            The stored entry, or None on a miss
+        """
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[0] == key and entry[1] == depth:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def best_move(self, key: int) -> Optional[int]:
+        """Best move stored for a position at any depth (None if absent)."""
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[0] == key:
+            return entry[4]
+        return None
+
+    def store(self, key: int, depth: int, score: float, flag: int, best_move: Optional[int]):
+        """Store a search result, subject to the replacement policy."""
+        index = key % self.size
+        old = self.entries[index]
+        if old is not None and old[0] != key:
+            if old[5] == self.generation and old[1] > depth:
+                return
+            self.replacements += 1
+        self.entries[index] = (key, depth, score, flag, best_move, self.generation)
+        self.stores += 1
+
+    def clear(self):
+        """Remove every entry and reset the counters."""
+        self.entries = [None] * self.size
+        self.hits = self.misses = self.stores = self.replacements = 0
+
+    def hit_rate(self) -> float:
+        """Fraction of probes that found a usable entry."""
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0.0
+
+    def stats(self) -> dict:
+        """Counters for reporting."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "replacements": self.replacements,
+            "hit_rate": self.hit_rate(),
+        }
+
+# Packing of a shared table entry's data word (lowest bits first)
+SCORE_BITS, DEPTH_BITS, FLAG_BITS, MOVE_BITS, GENERATION_BITS = 32, 8, 2, 8, 14
+SCORE_OFFSET = 1 << (SCORE_BITS - 1)
+
+class SharedTranspositionTable(TranspositionTable):
+    """
+    TranspositionTable over a flat buffer of 64-bit words, such as a
+    multiprocessing RawArray, so processes searching in parallel can share it.
+
+    Slot i is two words: the key XORed with the data, then the data (score,
+    depth, flag, best move and generation packed together). Writers take no
+    lock; an entry torn by two processes writing the same slot no longer
+    satisfies key == word0 ^ word1 and reads as a miss. Only integer scores
+    fit, which covers minimax and alpha-beta; other scores are not stored.
+    """
+
+    def __init__(self, words):
+        """
+        Args:
+            words: Buffer of 2 * size unsigned 64-bit words, zeroed for an empty table
+        """
+        self.words = memoryview(words).cast('B').cast('Q')
+        super().__init__(len(self.words) // 2)
+        self.entries = None
+
+    @staticmethod
+    def unpack(key: int, data: int) -> Entry:
+        score = (data & ((1 << SCORE_BITS) - 1)) - SCORE_OFFSET
+        data >>= SCORE_BITS
+        depth = data & ((1 << DEPTH_BITS) - 1)
+        data >>= DEPTH_BITS
+        flag = data & ((1 << FLAG_BITS) - 1)
+        data >>= FLAG_BITS
+        move = (data & ((1 << MOVE_BITS) - 1)) - 1
+        generation = data >> MOVE_BITS
+        return (key, depth, score, flag, None if move < 0 else move, generation)
+
+    def _read(self, key: int) -> Optional[Entry]:
+        index = 2 * (key % self.size)
+        data = self.words[index + 1]
+        if self.words[index] ^ data != key or not data:
+            return None
+        return self.unpack(key, data)
+
+    def probe(self, key: int, depth: int) -> Optional[Entry]:
+        entry = self._read(key)
+        if entry is not None and entry[1] == depth:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def best_move(self, key: int) -> Optional[int]:
+        entry = self._read(key)
+        return entry[4] if entry is not None else None
+
+    def store(self, key: int, depth: int, score: float, flag: int, best_move: Optional[int]):
+        if type(score) is not int or not -SCORE_OFFSET <= score < SCORE_OFFSET:
+            return
+        index = 2 * (key % self.size)
+        generation = self.generation & ((1 << GENERATION_BITS) - 1)
+        old_data = self.words[index + 1]
+        if old_data and self.words[index] ^ old_data != key:
+            _, old_depth, _, _, _, old_generation = self.unpack(0, old_data)
+            if old_generation == generation and old_depth > depth:
+                return
+            self.replacements += 1
+        data = (((generation << MOVE_BITS | (0 if best_move is None else best_move + 1)) << FLAG_BITS | flag)
+                << DEPTH_BITS | depth) << SCORE_BITS | (score + SCORE_OFFSET)
+        self.words[index + 1] = data
+        self.words[index] = key ^ data
+        self.stores += 1
+
+    def clear(self):
+        self.words[:] = memoryview(bytes(8 * len(self.words))).cast('Q')
+        self.hits = self.misses = self.stores = self.replacements = 0
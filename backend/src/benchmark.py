@@ -0,0 +1,285 @@
+"""
+Search benchmark over a fixed corpus of opening, midgame and endgame
+positions.
+
+Every algorithm decision() offers is run at each depth on every position,
+the way /ai/move runs it, and the nodes, time, nodes per second, peak
+memory and captured tree (in memory and as streamed to clients) are
+recorded as JSON. Node counts and trees are deterministic; times are the
+best of ``repeat`` runs, and peak memory is measured in a separate run,
+since tracing allocations slows the search.
+
+tests/data/bench_baseline.json is the stored baseline. Regenerate it with
+``run --out`` when a change is meant to alter the searches.
+
+    python -m src.benchmark run --out bench.json
+    python -m src.benchmark compare baseline.json bench.json
+
+``compare`` (or ``run --baseline``) exits with status 1 when any case got
+worse than the baseline by more than the tolerances.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Optional, Sequence
+from src.models.board import ConnectFourBoard
+from src.models.tree_cache import StoredTree
+from src.algorithms.search_pool import request_context, run_request
+
+CORPUS = os.path.join(os.path.dirname(__file__), "..", "tests", "data", "bench_corpus.json")
+
+ALGORITHMS = ("minimax", "alphabeta", "pvs", "mtdf", "expectimax")
+DEPTHS = (2, 4, 6)
+
+# Largest streamed tree measured. The stream repeats subtrees shared between
+# parents, which for deep expectimax trees comes to millions of nodes.
+PAYLOAD_MAX_NODES = 250_000
+
+# Largest relative increase of each metric that is not a regression.
+# Nodes and trees do not vary between runs, so any growth counts.
+TOLERANCES = {"nodes": 0.0, "tree_bytes": 0.0, "tree_payload_bytes": 0.0, "time_s": 0.25,
+              "peak_memory_bytes": 0.10}
+
+def load_corpus(path: str = CORPUS) -> List[dict]:
+    """The corpus positions: name, phase and the columns played from the empty board."""
+    with open(path) as f:
+        return json.load(f)["positions"]
+
+def position_board(position: dict) -> ConnectFourBoard:
+    board = ConnectFourBoard()
+    for col in position["moves"]:
+        board.drop_piece(int(col))
+    return board
+
+def walk_size(tree: StoredTree) -> int:
+    """Nodes tree.walk() yields: shared subtrees count once for every parent."""
+    sizes = {}
+
+    def size(index: int) -> int:
+        source = tree.store.source(index)
+        if source not in sizes:
+            sizes[source] = 1 + sum(size(child) for child in tree.children(index))
+        return sizes[source]
+
+    return size(tree.root)
+
+def tree_payload(root) -> Optional[int]:
+    """
+    Bytes of JSON the tree under ``root`` takes when streamed node by node,
+    as with stream_tree, or None if it streams more than PAYLOAD_MAX_NODES.
+    """
+    tree = StoredTree(root.store, root.index)
+    if walk_size(tree) > PAYLOAD_MAX_NODES:
+        return None
+    return sum(len(json.dumps(node)) for node in tree.walk())
+
+def run_case(board: ConnectFourBoard, algorithm: str, depth: int, repeat: int = 3,
+             tree="full", payload: bool = True) -> dict:
+    """
+    Benchmark one search.
+
+    Args:
+        tree: Capture level, as in the /ai/move request
+        payload: Measure the streamed tree, which for a full expectimax
+            tree takes longer than the search
+    Returns:
+        move, score, nodes, time_s (best of ``repeat``), nps,
+        peak_memory_bytes, tree_nodes, tree_bytes (its store) and
+        tree_payload_bytes (None without ``payload`` or for a tree too
+        large to stream, see tree_payload())
+    """
+    request = {"board": board.board.tolist(), "current_player": board.current_player,
+               "algorithm": algorithm, "depth": depth, "tree": tree}
+    best = float('inf')
+    for _ in range(repeat):
+        context = request_context(request)
+        context.book = None  # Measure the search even when OPENING_BOOK is set
+        started = time.perf_counter()
+        move, root = run_request(request, context)
+        best = min(best, time.perf_counter() - started)
+
+    context = request_context(request)
+    context.book = None
+    tracemalloc.start()
+    run_request(request, context)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "move": move,
+        "score": context.score,
+        "nodes": context.nodes,
+        "time_s": best,
+        "nps": context.nodes / best if best > 0 else None,
+        "peak_memory_bytes": peak,
+        "tree_nodes": len(root.store) if root is not None else 0,
+        "tree_bytes": root.store.nbytes() if root is not None else 0,
+        "tree_payload_bytes": (tree_payload(root) if root is not None else 0) if payload else None,
+    }
+
+def run_suite(positions: Optional[List[dict]] = None, algorithms: Sequence[str] = ALGORITHMS,
+              depths: Sequence[int] = DEPTHS, repeat: int = 3, tree="full", payload: bool = True,
+              progress=None) -> dict:
+    """
+    Benchmark every algorithm at every depth on every position.
+
+    Args:
+        positions: Corpus entries, by default load_corpus()
+        progress: Called with each finished case
+    Returns:
+        ``{"environment", "settings", "cases"}``; each case has position,
+        phase, algorithm and depth besides run_case()'s measurements
+    """
+    positions = load_corpus() if positions is None else positions
+    cases = []
+    for position in positions:
+        board = position_board(position)
+        for algorithm in algorithms:
+            for depth in depths:
+                case = {"position": position["name"], "phase": position["phase"],
+                        "algorithm": algorithm, "depth": depth}
+                case.update(run_case(board, algorithm, depth, repeat, tree, payload))
+                cases.append(case)
+                if progress is not None:
+                    progress(case)
+    return {
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "processor": platform.processor(), "cpus": os.cpu_count()},
+        "settings": {"algorithms": list(algorithms), "depths": list(depths), "repeat": repeat, "tree": tree,
+                     "payload": payload},
+        "cases": cases,
+    }
+
+def case_key(case: dict) -> tuple:
+    return case["position"], case["algorithm"], case["depth"]
+
+def compare(baseline: dict, current: dict, tolerances: Optional[Dict[str, float]] = None) -> List[dict]:
+    """
+    Regressions of ``current`` against ``baseline``.
+
+    Returns:
+        One entry per regression: the case's key, the metric, both values
+        and their ratio. A changed move or score, or a baseline case
+        missing from ``current``, is reported with metric "move", "score"
+        or "missing".
+    """
+    tolerances = dict(TOLERANCES, **(tolerances or {}))
+    cases = {case_key(case): case for case in current["cases"]}
+    regressions = []
+    for old in baseline["cases"]:
+        key = case_key(old)
+        new = cases.get(key)
+        if new is None:
+            regressions.append({"case": key, "metric": "missing", "baseline": None, "current": None, "ratio": None})
+            continue
+        for metric in ("move", "score"):
+            if new[metric] != old[metric]:
+                regressions.append({"case": key, "metric": metric, "baseline": old[metric],
+                                    "current": new[metric], "ratio": None})
+        for metric, tolerance in tolerances.items():
+            if old.get(metric) is None or new.get(metric) is None:
+                continue
+            ratio = new[metric] / old[metric] if old[metric] else float('inf') if new[metric] else 1.0
+            if ratio > 1 + tolerance:
+                regressions.append({"case": key, "metric": metric, "baseline": old[metric],
+                                    "current": new[metric], "ratio": ratio})
+    return regressions
+
+def summary(result: dict) -> str:
+    """One line per case."""
+    lines = []
+    for case in result["cases"]:
+        lines.append(f"{case['position']:<18} {case['algorithm']:<10} d{case['depth']:<2} "
+                     f"{case['nodes']:>9} nodes {case['time_s'] * 1000:>9.1f} ms "
+                     f"{case['nps'] or 0:>9.0f} nps {case['peak_memory_bytes'] / 1024:>8.0f} KiB "
+                     f"{case['tree_nodes']:>7} tree nodes {case['tree_bytes']:>8} B")
+    return "\n".join(lines)
+
+def totals(result: dict) -> Dict[tuple, dict]:
+    """Nodes and time summed over the positions, by (algorithm, depth)."""
+    sums = {}
+    for case in result["cases"]:
+        total = sums.setdefault((case["algorithm"], case["depth"]), {"nodes": 0, "time_s": 0.0})
+        total["nodes"] += case["nodes"]
+        total["time_s"] += case["time_s"]
+    return sums
+
+def comparison(baseline: dict, current: dict) -> str:
+    """
+    Total nodes and time for each algorithm and depth, each with its ratio
+    to the baseline. Nodes do not depend on the machine, so they tell a
+    change in the search apart from a slower or busier machine.
+    """
+    old = totals(baseline)
+    lines = []
+    for (algorithm, depth), new in totals(current).items():
+        line = f"{algorithm:<10} d{depth:<2} {new['nodes']:>10} nodes"
+        before = old.get((algorithm, depth))
+        if before is not None and before["nodes"]:
+            line += f" ({new['nodes'] / before['nodes']:.2f}x)"
+        line += f" {new['time_s'] * 1000:>10.1f} ms"
+        if before is not None and before["time_s"]:
+            line += f" ({new['time_s'] / before['time_s']:.2f}x)"
+        lines.append(line)
+    return "\n".join(lines)
+
+def report(regressions: List[dict]) -> str:
+    if not regressions:
+        return "No regressions"
+    lines = [f"{len(regressions)} regression(s):"]
+    for regression in regressions:
+        position, algorithm, depth = regression["case"]
+        ratio = f" ({regression['ratio']:.2f}x)" if regression["ratio"] is not None else ""
+        lines.append(f"  {position} {algorithm} d{depth} {regression['metric']}: "
+                     f"{regression['baseline']} -> {regression['current']}{ratio}")
+    return "\n".join(lines)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.benchmark", description="Search benchmark")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="Benchmark the corpus")
+    run.add_argument("--algorithms", nargs="+", default=list(ALGORITHMS), choices=ALGORITHMS)
+    run.add_argument("--depths", nargs="+", type=int, default=list(DEPTHS))
+    run.add_argument("--repeat", type=int, default=3, help="Timed runs per case; the best counts")
+    run.add_argument("--corpus", default=CORPUS)
+    run.add_argument("--tree", default="full", help="Capture level: none, pv, full or a number of plies")
+    run.add_argument("--no-payload", dest="payload", action="store_false",
+                     help="Skip measuring the streamed tree")
+    run.add_argument("--out", help="Write the results here as JSON")
+    run.add_argument("--baseline", help="Compare the results with this earlier run")
+    check = commands.add_parser("compare", help="Compare two runs")
+    check.add_argument("baseline")
+    check.add_argument("current")
+    for command in (run, check):
+        command.add_argument("--time-tolerance", type=float, default=TOLERANCES["time_s"])
+        command.add_argument("--memory-tolerance", type=float, default=TOLERANCES["peak_memory_bytes"])
+    args = parser.parse_args(argv)
+    tolerances = {"time_s": args.time_tolerance, "peak_memory_bytes": args.memory_tolerance}
+
+    if args.command == "run":
+        tree = int(args.tree) if args.tree.isdigit() else args.tree
+        result = run_suite(load_corpus(args.corpus), args.algorithms, args.depths, args.repeat, tree, args.payload)
+        print(summary(result))
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(result, f, indent=1)
+        if not args.baseline:
+            return 0
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            result = json.load(f)
+    regressions = compare(baseline, result, tolerances)
+    print(comparison(baseline, result))
+    print(report(regressions))
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
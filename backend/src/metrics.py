@@ -0,0 +1,109 @@
+"""
+Prometheus metrics for the search service, served by GET /metrics.
+
+Everything here is recorded on the server's event loop once a search has
+finished, from the counters the search already returns, so the searches
+themselves (in the worker processes) never touch a metric. Pool, cache and
+table state is read when /metrics is scraped.
+"""
+from typing import Callable, Optional
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+REGISTRY = CollectorRegistry()
+
+SEARCH_LATENCY = Histogram(
+    "search_latency_seconds", "Time from submitting a search to its answer, queueing included",
+    ["algorithm", "depth"], registry=REGISTRY,
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60))
+SEARCH_NODES = Counter(
+    "search_nodes", "Nodes searched", ["algorithm"], registry=REGISTRY)
+SEARCH_NPS = Histogram(
+    "search_nodes_per_second", "Nodes per second of each search", ["algorithm"], registry=REGISTRY,
+    buckets=(1e3, 3e3, 1e4, 3e4, 1e5, 3e5, 1e6, 3e6))
+SEARCHES = Counter(
+    "searches", "Searches by outcome: ok, book, cancelled, no_move, busy, deadline or crashed",
+    ["algorithm", "outcome"], registry=REGISTRY)
+TABLE_PROBES = Counter(
+    "transposition_probes", "Transposition table probes by result (hit or miss)", ["result"], registry=REGISTRY)
+RESPONSE_BYTES = Histogram(
+    "response_bytes", "Size of response bodies", ["endpoint"], registry=REGISTRY,
+    buckets=(128, 512, 2048, 8192, 32768, 131072, 524288, 2097152, 8388608))
+
+# Running totals behind the table hit ratio
+_table_hits = 0
+_table_probes = 0
+
+def record_search(algorithm: str, depth: int, seconds: float, result: dict):
+    """Record a finished search: its time and a SearchPool.run() result."""
+    global _table_hits, _table_probes
+    stats = result["stats"]
+    if result["cancelled"]:
+        outcome = "cancelled"
+    elif result["move"] is None:
+        outcome = "no_move"
+    elif stats is not None and stats.get("book_hit"):
+        outcome = "book"  # Answered from the opening book
+    else:
+        outcome = "ok"
+    SEARCHES.labels(algorithm, outcome).inc()
+    SEARCH_LATENCY.labels(algorithm, str(depth)).observe(seconds)
+    if stats is None:
+        return
+    SEARCH_NODES.labels(algorithm).inc(stats["nodes"])
+    if stats["elapsed_s"] > 0:
+        SEARCH_NPS.labels(algorithm).observe(stats["nodes"] / stats["elapsed_s"])
+    table = stats.get("table")
+    if table is not None:
+        TABLE_PROBES.labels("hit").inc(table["hits"])
+        TABLE_PROBES.labels("miss").inc(table["misses"])
+        _table_hits += table["hits"]
+        _table_probes += table["hits"] + table["misses"]
+
+def record_failure(algorithm: str, outcome: str):
+    """Count a search that was refused (busy), ran out of time (deadline) or lost its worker (crashed)."""
+    SEARCHES.labels(algorithm, outcome).inc()
+
+class ServiceCollector:
+    """Pool, cache and table gauges, read at scrape time."""
+
+    def __init__(self, pool: Callable[[], Optional[object]], results, trees):
+        """
+        Args:
+            pool: Returns the SearchPool, or None before the first search started it
+            results: The ResultCache
+            trees: The TreeCache
+        """
+        self.pool = pool
+        self.results = results
+        self.trees = trees
+
+    def collect(self):
+        pool = self.pool()
+        workers = pool.workers if pool is not None else 0
+        pending = pool.pending() if pool is not None else 0
+        yield GaugeMetricFamily("search_pool_workers", "Worker processes", value=workers)
+        yield GaugeMetricFamily("searches_in_flight", "Searches queued or running", value=pending)
+        yield GaugeMetricFamily("search_pool_queue_depth", "Searches waiting for a free worker",
+                                value=max(0, pending - workers))
+
+        stats = self.results.stats()
+        yield GaugeMetricFamily("result_cache_entries", "Positions in the result cache", value=stats["entries"])
+        lookups = CounterMetricFamily("result_cache_lookups", "Result cache lookups by result", labels=["result"])
+        lookups.add_metric(["hit"], stats["hits"] - stats["mirrored_hits"])
+        lookups.add_metric(["mirrored_hit"], stats["mirrored_hits"])
+        lookups.add_metric(["miss"], stats["misses"])
+        yield lookups
+        yield GaugeMetricFamily("result_cache_hit_ratio", "Fraction of lookups answered from the result cache",
+                                value=stats["hit_rate"])
+        yield GaugeMetricFamily("transposition_hit_ratio", "Fraction of transposition table probes that hit",
+                                value=_table_hits / _table_probes if _table_probes else 0.0)
+        yield GaugeMetricFamily("tree_cache_trees", "Search trees held for browsing", value=len(self.trees))
+
+def register_service(pool: Callable[[], Optional[object]], results, trees):
+    """Export the service's pool and caches on /metrics."""
+    REGISTRY.register(ServiceCollector(pool, results, trees))
+
+def render() -> bytes:
+    """The metrics in the Prometheus text format."""
+    return generate_latest(REGISTRY)
@@ -0,0 +1,313 @@
+import numpy as np
+from functools import lru_cache
+from typing import List, Tuple, Optional
+from src.models.board import ConnectFourBoard
+from src.models.zobrist import zobrist_keys
+
+@lru_cache(maxsize=None)
+def bit_zobrist_keys(width: int, height: int) -> List[List[int]]:
+    """Zobrist keys re-indexed by bit position, so hashes match ConnectFourBoard."""
+    piece_keys = zobrist_keys(width, height)
+    stride = height + 1
+    keys = [[0] * (width * stride) for _ in range(3)]
+    for player in (1, 2):
+        for col in range(width):
+            for row in range(height):
+                keys[player][col * stride + row] = piece_keys[player][(height - 1 - row) * width + col]
+    return keys
+
+@lru_cache(maxsize=None)
+def bit_mirror_zobrist_keys(width: int, height: int) -> List[List[int]]:
+    """Keys by bit position of the reflected cell, for the mirror hash."""
+    keys = bit_zobrist_keys(width, height)
+    stride = height + 1
+    return [[player_keys[(width - 1 - index // stride) * stride + index % stride] for index in range(width * stride)]
+            for player_keys in keys]
+
+@lru_cache(maxsize=None)
+def bit_indices(width: int, height: int) -> np.ndarray:
+    """Bit position of each cell in row-major ConnectFourBoard order."""
+    stride = height + 1
+    return np.array([col * stride + height - 1 - row for row in range(height) for col in range(width)],
+                    dtype=np.uint64)
+
+class BitBoard:
+    """
+    Connect 4 board stored as two integer bitboards plus per-column heights.
+
+    Exposes the same interface as ConnectFourBoard so the search can use either
+    one. Each column takes ``height + 1`` bits (bit 0 is the bottom row); the
+    extra sentinel bit keeps the shift-and-mask line checks from wrapping into
+    the next column.
+    """
+
+    def __init__(self, width: int = 7, height: int = 6):
+        """
+        Initialize an empty bitboard
+
+        Args:
+            width: Board width (default 7)
+            height: Board height (default 6)
+        """
+        self.width = width
+        self.height = height
+        self.stride = height + 1
+        self.bitboards = [0, 0, 0]  # Indexed by player, slot 0 is unused
+        self.mask = 0               # Union of both players' pieces
+        self.heights = [0] * width  # Row index of the lowest empty cell per column
+        self.current_player = 1
+        self.last_move: Optional[Tuple[int, int]] = None
+        self.move_stack: List[Tuple[int, int, Optional[Tuple[int, int]]]] = []
+        self.hash = 0  # Zobrist hash of the pieces
+        self.mirror_hash = 0  # Zobrist hash of the left-right reflection
+        self.evaluator = None  # Optional IncrementalEvaluator kept in sync by moves
+        self._array = None
+        self._keys = bit_zobrist_keys(width, height)
+        self._mirror_keys = bit_mirror_zobrist_keys(width, height)
+
+        self._top = [1 << (col * self.stride + height - 1) for col in range(width)]
+        column = (1 << height) - 1
+        self._full = sum(column << (col * self.stride) for col in range(width))
+        # Shifts for vertical, horizontal and both diagonal directions
+        self._shifts = (1, self.stride, self.stride + 1, self.stride - 1)
+
+    @classmethod
+    def from_array(cls, array, current_player: int = 1) -> 'BitBoard':
+        """
+        Build a bitboard from a (height, width) array where row 0 is the top.
+
+        Args:
+            array: 2D array-like of 0 (empty), 1 and 2
+            current_player: Player to move
+
+        Returns:
+            A new BitBoard instance with the same position
+        """
+        array = np.asarray(array, dtype=int)
+        height, width = array.shape
+        board = cls(width, height)
+        for row in range(height):
+            for col in range(width):
+                player = int(array[row, col])
+                if player == 0:
+                    continue
+                if player not in (1, 2):
+                    raise ValueError(f"Invalid cell value {player} at ({row}, {col})")
+                index = col * board.stride + height - 1 - row
+                board.bitboards[player] |= 1 << index
+                board.mask |= 1 << index
+                board.hash ^= board._keys[player][index]
+                board.mirror_hash ^= board._mirror_keys[player][index]
+        for col in range(width):
+            board.heights[col] = board._lowest_empty(col, 0)
+        board.current_player = current_player
+        return board
+
+    @classmethod
+    def from_board(cls, board: ConnectFourBoard) -> 'BitBoard':
+        """Build a bitboard holding the same position as a ConnectFourBoard."""
+        bitboard = cls.from_array(board.board, board.current_player)
+        bitboard.last_move = board.last_move
+        return bitboard
+
+    def to_board(self) -> ConnectFourBoard:
+        """Convert back to a NumPy-backed ConnectFourBoard."""
+        board = ConnectFourBoard(self.width, self.height)
+        board.board = self.get_board_state()
+        board.current_player = self.current_player
+        board.last_move = self.last_move
+        return board
+
+    def _lowest_empty(self, column: int, row: int) -> int:
+        """Return the first empty row at or above ``row`` (height if none)."""
+        base = column * self.stride
+        while row < self.height and self.mask >> (base + row) & 1:
+            row += 1
+        return row
+
+    def reset(self):
+        """Reset the board to initial state"""
+        self.bitboards = [0, 0, 0]
+        self.mask = 0
+        self.heights = [0] * self.width
+        self.current_player = 1
+        self.last_move = None
+        self.move_stack = []
+        self.hash = 0
+        self.mirror_hash = 0
+        self.evaluator = None
+        self._array = None
+
+    def mirror_move(self, column: int) -> int:
+        """The column reflected left-right."""
+        return self.width - 1 - column
+
+    def canonical_hash(self) -> int:
+        """The same hash for a position and its left-right reflection."""
+        return min(self.hash, self.mirror_hash)
+
+    def is_mirrored(self) -> bool:
+        """True when the reflection is the canonical orientation, so moves must be reflected to match it."""
+        return self.mirror_hash < self.hash
+
+    def is_symmetric(self) -> bool:
+        """True when the position equals its own reflection."""
+        return self.hash == self.mirror_hash
+
+    def is_valid_move(self, column: int) -> bool:
+        """Check if a piece can be dropped in the given column."""
+        return 0 <= column < self.width and not self.mask & self._top[column]
+
+    def get_valid_moves(self) -> List[int]:
+        """Get list of columns where a piece can be dropped."""
+        mask, top = self.mask, self._top
+        return [col for col in range(self.width) if not mask & top[col]]
+
+    def drop_piece(self, column: int) -> bool:
+        """
+        Drop a piece for the current player in the given column.
+
+        Returns:
+            True if the move was successful, False otherwise.
+        """
+        if not self.is_valid_move(column):
+            return False
+
+        row = self.heights[column]
+        index = column * self.stride + row
+        self.bitboards[self.current_player] |= 1 << index
+        self.mask |= 1 << index
+        self.hash ^= self._keys[self.current_player][index]
+        self.mirror_hash ^= self._mirror_keys[self.current_player][index]
+        if self.evaluator is not None:
+            self.evaluator.add((self.height - 1 - row) * self.width + column, self.current_player)
+        self.heights[column] = self._lowest_empty(column, row + 1)
+        self.last_move = (self.height - 1 - row, column)
+        self.current_player = 3 - self.current_player
+        self._array = None
+        return True
+
+    def play(self, column: int) -> None:
+        """
+        Drop a piece in place and push it on the move stack for undo().
+
+        Raises:
+            ValueError: If the column is full or out of range.
+        """
+        if not self.is_valid_move(column):
+            raise ValueError(f"Invalid move: column {column}")
+
+        row = self.heights[column]
+        index = column * self.stride + row
+        self.bitboards[self.current_player] |= 1 << index
+        self.mask |= 1 << index
+        self.hash ^= self._keys[self.current_player][index]
+        self.mirror_hash ^= self._mirror_keys[self.current_player][index]
+        if self.evaluator is not None:
+            self.evaluator.add((self.height - 1 - row) * self.width + column, self.current_player)
+        self.move_stack.append((column, row, self.last_move))
+        self.heights[column] = self._lowest_empty(column, row + 1)
+        self.last_move = (self.height - 1 - row, column)
+        self.current_player = 3 - self.current_player
+        self._array = None
+
+    def undo(self) -> None:
+        """Take back the most recent move made with play()."""
+        column, row, previous_move = self.move_stack.pop()
+        index = column * self.stride + row
+        self.current_player = 3 - self.current_player
+        self.bitboards[self.current_player] ^= 1 << index
+        self.mask ^= 1 << index
+        self.hash ^= self._keys[self.current_player][index]
+        self.mirror_hash ^= self._mirror_keys[self.current_player][index]
+        if self.evaluator is not None:
+            self.evaluator.remove((self.height - 1 - row) * self.width + column, self.current_player)
+        self.heights[column] = row
+        self.last_move = previous_move
+        self._array = None
+
+    def is_full(self) -> bool:
+        """Check if every cell is occupied."""
+        return self.mask == self._full
+
+    @property
+    def board(self) -> np.ndarray:
+        """
+        Read-only NumPy view of the position in ConnectFourBoard layout.
+
+        Built on first access and cached until the position changes.
+        """
+        if self._array is None:
+            if self.width * self.stride <= 64:
+                # Shift every cell's bit into place at once
+                bit_index = bit_indices(self.width, self.height)
+                p1 = (np.uint64(self.bitboards[1]) >> bit_index) & np.uint64(1)
+                p2 = (np.uint64(self.bitboards[2]) >> bit_index) & np.uint64(1)
+                array = (p1 + p2 * np.uint64(2)).astype(int).reshape(self.height, self.width)
+            else:
+                array = np.zeros((self.height, self.width), dtype=int)
+                for player in (1, 2):
+                    bits = self.bitboards[player]
+                    for col in range(self.width):
+                        column = bits >> (col * self.stride)
+                        for row in range(self.height):
+                            if column >> row & 1:
+                                array[self.height - 1 - row, col] = player
+            array.setflags(write=False)
+            self._array = array
+        return self._array
+
+    def get_board_state(self) -> np.ndarray:
+        """Get a writable copy of the board as a NumPy array."""
+        return self.board.copy()
+
+    def copy(self) -> 'BitBoard':
+        """Create an independent copy of the board."""
+        new_board = BitBoard.__new__(BitBoard)
+        new_board.__dict__.update(self.__dict__)
+        new_board.bitboards = self.bitboards[:]
+        new_board.heights = self.heights[:]
+        new_board.move_stack = self.move_stack[:]
+        if self.evaluator is not None:
+            new_board.evaluator = self.evaluator.copy()
+        return new_board
+
+    def __str__(self) -> str:
+        """Returns the same string representation as ConnectFourBoard."""
+        symbols = ('.', 'X', 'O')
+        p1, p2 = self.bitboards[1], self.bitboards[2]
+        lines = []
+        for row in range(self.height - 1, -1, -1):
+            cells = []
+            for col in range(self.width):
+                bit = 1 << (col * self.stride + row)
+                cells.append(symbols[1 if p1 & bit else 2 if p2 & bit else 0])
+            lines.append(' '.join(cells))
+        return '\n'.join(lines) + "\n" + " ".join(map(str, range(self.width)))
+
+    def check_winner(self) -> Optional[int]:
+        """
+        Determines the player with more connected-four sequences.
+
+        Returns:
+            1 or 2 for the player with more fours, None on a tie.
+        """
+        player_1_fours = self.count_fours(1)
+        player_2_fours = self.count_fours(2)
+
+        if player_1_fours > player_2_fours:
+            return 1
+        if player_2_fours > player_1_fours:
+            return 2
+        return None
+
+    def count_fours(self, player: int) -> int:
+        """Count all connected-four sequences for a given player."""
+        if player not in (1, 2):
+            return 0
+        bits = self.bitboards[player]
+        count = 0
+        for shift in self._shifts:
+            pairs = bits & (bits >> shift)
+            count += (pairs & (pairs >> (2 * shift))).bit_count()
+        return count
@@ -1,5 +1,6 @@
 import numpy as np
 from typing import List, Tuple, Optional
+from src.models.zobrist import zobrist_keys, hash_array, mirror_cell
 
 class ConnectFourBoard:
     def __init__(self, width: int = 7, height: int = 6):
@@ -15,12 +16,57 @@ class ConnectFourBoard:
         self.board = np.zeros((height, width), dtype=int)
         self.current_player = 1
         self.last_move: Optional[Tuple[int, int]] = None
+        self.move_stack: List[Tuple[Tuple[int, int], Optional[Tuple[int, int]]]] = []
+        self.hash = 0  # Zobrist hash of the pieces, kept up to date by moves
+        self.mirror_hash = 0  # Hash of the left-right reflection, kept up to date the same way
     
     def reset(self):
         """Reset the board to initial state"""
         self.board = np.zeros((self.height, self.width), dtype=int)
         self.current_player = 1
         self.last_move = None
+        self.move_stack = []
+        self.hash = 0
+        self.mirror_hash = 0
+
+    def rehash(self) -> int:
+        """
+        Recompute the Zobrist hash (and the mirror hash) from scratch.
+
+        Needed after editing ``board`` directly instead of through moves.
+
+        Returns:
+            The new hash value
+        """
+        self.hash = hash_array(self.board)
+        self.mirror_hash = hash_array(np.fliplr(self.board))
+        return self.hash
+
+    def mirror_move(self, column: int) -> int:
+        """The column reflected left-right."""
+        return self.width - 1 - column
+
+    def canonical_hash(self) -> int:
+        """The same hash for a position and its left-right reflection."""
+        return min(self.hash, self.mirror_hash)
+
+    def is_mirrored(self) -> bool:
+        """True when the reflection is the canonical orientation, so moves must be reflected to match it."""
+        return self.mirror_hash < self.hash
+
+    def is_symmetric(self) -> bool:
+        """True when the position equals its own reflection."""
+        return np.array_equal(self.board, self.board[:, ::-1])
+
+    def mirror(self) -> 'ConnectFourBoard':
+        """A copy of the position reflected left-right, without move history."""
+        mirrored = ConnectFourBoard(self.width, self.height)
+        mirrored.board = np.fliplr(self.board).copy()
+        mirrored.current_player = self.current_player
+        if self.last_move is not None:
+            mirrored.last_move = (self.last_move[0], self.mirror_move(self.last_move[1]))
+        mirrored.hash, mirrored.mirror_hash = self.mirror_hash, self.hash
+        return mirrored
         
     def is_valid_move(self, column: int) -> bool:
         """
@@ -60,10 +106,40 @@ class ConnectFourBoard:
         for row in range(self.height - 1, -1, -1):
             if self.board[row, column] == 0:
                 self.board[row, column] = self.current_player
+                cell = row * self.width + column
+                keys = zobrist_keys(self.width, self.height)[self.current_player]
+                self.hash ^= keys[cell]
+                self.mirror_hash ^= keys[mirror_cell(cell, self.width)]
                 self.last_move = (row, column)
                 self.current_player = 3 - self.current_player 
                 return True
         return False
+
+    def play(self, column: int) -> None:
+        """
+        Drop a piece in place and remember it so undo() can take it back.
+
+        Args:
+            column: Column index (0-based).
+
+        Raises:
+            ValueError: If the column is full or out of range.
+        """
+        previous_move = self.last_move
+        if not self.drop_piece(column):
+            raise ValueError(f"Invalid move: column {column}")
+        self.move_stack.append((self.last_move, previous_move))
+
+    def undo(self) -> None:
+        """Take back the most recent move made with play()."""
+        (row, column), previous_move = self.move_stack.pop()
+        self.board[row, column] = 0
+        self.current_player = 3 - self.current_player
+        cell = row * self.width + column
+        keys = zobrist_keys(self.width, self.height)[self.current_player]
+        self.hash ^= keys[cell]
+        self.mirror_hash ^= keys[mirror_cell(cell, self.width)]
+        self.last_move = previous_move
     
     def is_full(self) -> bool:
         """
@@ -94,6 +170,9 @@ class ConnectFourBoard:
         new_board.board = self.board.copy()
         new_board.current_player = self.current_player
         new_board.last_move = self.last_move
+        new_board.move_stack = self.move_stack.copy()
+        new_board.hash = self.hash
+        new_board.mirror_hash = self.mirror_hash
         return new_board
     
     def __str__(self) -> str:
@@ -145,6 +224,7 @@ class ConnectFourBoard:
         # Determine current player by counting pieces
         total_pieces = np.sum(board.board > 0)
         board.current_player = 1 if total_pieces % 2 == 0 else 2
+        board.rehash()
         
         return board
     
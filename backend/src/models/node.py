@@ -1,38 +1,108 @@
-import json
+from src.models.board import ConnectFourBoard
+from src.models.tree_store import TreeStore, NONE
 
 class TreeNode:
-    def __init__(self, move=None, score=None, player=None, depth=0, board_str=None):
-        self.move = move              # Column index (0-6)
-        self.score = score            # Evaluation score
-        self.player = player          # 1 or 2
-        self.depth = depth            # Depth in tree
-        self.board_str = board_str    # Board string representation (compact)
-        self.children = []            # Child nodes
-        self.best_child = None        # Best child node (for minimax)
+    """
+    Handle to one row of a TreeStore.
+
+    Reads and writes go straight to the store's columns, so a search keeps
+    no per-node Python objects once a child has been added to its parent.
+    Nodes created without a store get a private one; add_child() copies such
+    a node's subtree into the parent's store.
+    """
+
+    __slots__ = ('store', 'index')
+
+    def __init__(self, move=None, score=None, player=None, depth=0, board_str=None,
+                 board=None, store: TreeStore = None):
+        """
+        Args:
+            board_str: Position as text (output of ConnectFourBoard.__str__)
+            board: Position as a BitBoard or ConnectFourBoard, preferred over
+                board_str because nothing has to be formatted
+            store: Store to create the node in
+        """
+        if board is None and board_str is not None:
+            board = ConnectFourBoard.board_from_string(board_str)
+        if store is None:
+            store = TreeStore(board.width, board.height) if board is not None else TreeStore()
+        self.store = store
+        self.index = store.add(move, score, player, depth, board)
+
+    @classmethod
+    def at(cls, store: TreeStore, index: int) -> 'TreeNode':
+        """Handle for an existing row."""
+        node = cls.__new__(cls)
+        node.store = store
+        node.index = index
+        return node
+
+    @property
+    def move(self):
+        return self.store.get_move(self.index)         # Column index (0-6)
+
+    @move.setter
+    def move(self, move):
+        self.store.move[self.index] = NONE if move is None else move
+
+    @property
+    def score(self):
+        return self.store.get_score(self.index)        # Evaluation score
+
+    @score.setter
+    def score(self, score):
+        self.store.set_score(self.index, score)
+
+    @property
+    def player(self):
+        return self.store.get_player(self.index)       # 1 or 2
+
+    @property
+    def depth(self):
+        return self.store.depth[self.index]            # Depth in tree
+
+    @property
+    def board_str(self):
+        return self.store.board_str(self.index)        # Board string representation
+
+    @property
+    def children(self):
+        """Child nodes in the order they were added."""
+        return [TreeNode.at(self.store, index) for index in self.store.children(self.index)]
+
+    @property
+    def best_child(self):
+        # Index of the best child in children
+        return self.store.best_rank(self.index, self.store.children(self.index))
 
     def to_dict(self):
-        return {
-            "move": self.move,
-            "score": self.score,
-            "player": self.player,
-            "depth": self.depth,
-            "board": self.board_str,
-            "children": [child.to_dict() if isinstance(child, TreeNode) else child for child in self.children],
-            "best_child": self.best_child.to_dict() if isinstance(self.best_child, TreeNode) else self.best_child
-        }
-
-    
+        """Serialize the subtree; each node is visited once."""
+        return self.store.to_dict(self.index)
+
     def add_child(self, child_node):
-        # self.children.append(child_node)
-        self.children.append(child_node.to_dict())
+        if child_node.store is not self.store:
+            child_node.index = self.store.graft(child_node.store, child_node.index)
+            child_node.store = self.store
+        self.store.attach(self.index, child_node.index)
 
     def set_best_child(self, best_child_node):
-        self.best_child = best_child_node.to_dict()
+        """Point best_child at a node already added with add_child()."""
+        store = self.store
+        if best_child_node is not None and store.parent[best_child_node.index] == self.index:
+            store.best[self.index] = best_child_node.index
+        else:
+            store.best[self.index] = NONE
+
+    def get_best_child(self):
+        """The best child node, or None."""
+        best = self.best_child
+        return self.children[best] if best is not None else None
+
+    def relabel(self, move):
+        """Node listing this node's subtree under another move, without copying it."""
+        return TreeNode.at(self.store, self.store.alias(self.index, move))
 
     def print_tree(self, indent=0):
         print("=" * indent + f"Move: {self.move}, Score: {self.score}, Player: {self.player}, Depth: {self.depth}")
         for child in self.children:
-            if isinstance(child, TreeNode):
-                child.print_tree(indent + 2)
-            else:
-                print("=" * (indent + 2) + f"(Serialized Child): {child}")
+            child.print_tree(indent + 2)
@@ -0,0 +1,129 @@
+import os
+from collections import OrderedDict
+from typing import Optional, Tuple, Union
+import numpy as np
+from src.models.zobrist import hash_array
+from src.models.tree_cache import TreeCache
+
+class ResultCache:
+    """
+    Answers to /ai/move kept by position, so a position asked for again is
+    answered without searching.
+
+    Results are keyed by the position's Zobrist hash, the player to move and
+    the algorithm. Only the deepest result for a key is kept, and it also
+    answers requests for a shallower depth. With ``mirror`` a position is
+    also looked up as its left-right reflection and answered with the
+    reflected move. That move scores the same as the one a search would
+    pick, but where moves tie it need not be the same move, so mirrored
+    lookups are off by default. The least recently used key is dropped
+    once more than ``max_entries`` are held.
+    """
+
+    def __init__(self, max_entries: int = 4096, mirror: bool = False,
+                 trees: Optional[TreeCache] = None):
+        """
+        Args:
+            max_entries: Most positions held at once; 0 disables the cache
+            mirror: Also look positions up by their reflection
+            trees: Where the results' tree ids point, so a request for a
+                tree is only answered while its tree is still there
+        """
+        self.max_entries = max_entries
+        self.mirror = mirror
+        self.trees = trees
+        self.entries: OrderedDict = OrderedDict()  # Key -> result, least recent first
+        self.hits = 0
+        self.mirrored_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls, trees: Optional[TreeCache] = None) -> 'ResultCache':
+        """Cache sized by RESULT_CACHE_SIZE, with mirrored lookups if RESULT_CACHE_MIRROR is 1."""
+        return cls(max_entries=int(os.environ.get("RESULT_CACHE_SIZE", 4096)),
+                   mirror=os.environ.get("RESULT_CACHE_MIRROR", "0") == "1", trees=trees)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @staticmethod
+    def key(board: np.ndarray, player: int, algorithm: str) -> Tuple[int, int, str]:
+        return hash_array(board), player, algorithm
+
+    def get(self, board: np.ndarray, player: int, algorithm: str, depth: int,
+            tree: Union[str, int] = "none") -> Optional[dict]:
+        """
+        A cached result searched at least ``depth`` plies deep, or None.
+
+        Args:
+            board: (height, width) board array
+            tree: Capture level of the request; unless it is "none", only a
+                result with a tree of that level and exactly this depth,
+                still held in ``trees``, answers
+        Returns:
+            move, depth, score, stats (the search's, as put()) and tree_id
+            (None for a tree-less request); ``mirrored`` tells whether the
+            reflection answered
+        """
+        if self.max_entries:
+            entry = self._lookup(self.key(board, player, algorithm), depth, tree)
+            if entry is not None:
+                self.hits += 1
+                return dict(entry, tree_id=entry["tree_id"] if tree != "none" else None, mirrored=False)
+            if self.mirror and tree == "none":
+                mirrored = np.fliplr(board)
+                entry = self._lookup(self.key(mirrored, player, algorithm), depth, tree)
+                if entry is not None:
+                    self.hits += 1
+                    self.mirrored_hits += 1
+                    return dict(entry, move=board.shape[1] - 1 - entry["move"], tree_id=None, mirrored=True)
+        self.misses += 1
+        return None
+
+    def _lookup(self, key, depth: int, tree) -> Optional[dict]:
+        entry = self.entries.get(key)
+        if entry is None or entry["depth"] < depth:
+            return None
+        if tree != "none":
+            if entry["tree"] != tree or entry["depth"] != depth or entry["tree_id"] is None:
+                return None
+            if self.trees is not None and self.trees.get(entry["tree_id"]) is None:
+                return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, board: np.ndarray, player: int, algorithm: str, move: int, depth: int, score,
+            tree: Union[str, int] = "none", tree_id: Optional[str] = None, stats: Optional[dict] = None):
+        """
+        Keep a search result, unless a deeper one for the position is already held.
+
+        Args:
+            stats: The search's SearchContext.stats(), returned with the result
+        """
+        if not self.max_entries:
+            return
+        key = self.key(board, player, algorithm)
+        old = self.entries.get(key)
+        if old is not None and old["depth"] > depth:
+            return
+        self.entries[key] = {"move": move, "depth": depth, "score": score, "tree": tree, "tree_id": tree_id,
+                             "stats": stats}
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def hit_rate(self) -> float:
+        """Fraction of lookups answered from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        """Counters for reporting."""
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "mirrored_hits": self.mirrored_hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate(),
+        }
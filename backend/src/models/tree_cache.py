@@ -0,0 +1,133 @@
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Iterator, List, Optional
+from src.models.node import TreeNode
+from src.models.tree_store import TreeStore
+
+class StoredTree:
+    """
+    A finished search tree that can be browsed one node at a time.
+
+    The child index is built on the first lookup, so a tree that is never
+    browsed costs nothing beyond its store.
+    """
+
+    def __init__(self, store: TreeStore, root: int):
+        self.store = store
+        self.root = root
+        self.starts = None
+        self.rows = None
+
+    def children(self, index: int) -> List[int]:
+        """Children of ``index`` in the order they were added."""
+        if self.starts is None:
+            self.starts, self.rows = self.store.child_index()
+        index = self.store.source(index)
+        return self.rows[self.starts[index]:self.starts[index + 1]].tolist()
+
+    def node(self, path: List[int]) -> dict:
+        """
+        One node and its immediate children, without grandchildren.
+
+        Args:
+            path: Position of the child to follow at each level, from the root
+
+        Raises:
+            KeyError: If the path leaves the tree
+        """
+        store = self.store
+        index = self.root
+        board = store.board_of(index)
+        for rank in path:
+            kids = self.children(index)
+            if not 0 <= rank < len(kids):
+                raise KeyError(f"No child {rank} at depth {store.depth[index]}")
+            board = store.child_board(board, index, kids[rank])
+            index = kids[rank]
+
+        kids = self.children(index)
+        view = self.summary(index, board, path)
+        view["children"] = [self.summary(child, store.child_board(board, index, child), path + [rank])
+                            for rank, child in enumerate(kids)]
+        view["best_child"] = store.best_rank(index, kids)
+        return view
+
+    def walk(self) -> Iterator[dict]:
+        """Every node breadth-first as a summary() with its best_child, root first."""
+        store = self.store
+        pending = deque([(self.root, store.board_of(self.root), [])])
+        while pending:
+            index, board, path = pending.popleft()
+            kids = self.children(index)
+            view = self.summary(index, board, path)
+            view["best_child"] = store.best_rank(index, kids)
+            yield view
+            pending.extend((child, store.child_board(board, index, child), path + [rank])
+                           for rank, child in enumerate(kids))
+
+    def summary(self, index: int, board, path: List[int]) -> dict:
+        """A node's own fields in the TreeNode JSON shape, with a child count instead of children."""
+        store = self.store
+        return {
+            "path": path,
+            "move": store.get_move(index),
+            "score": store.get_score(index),
+            "player": store.get_player(index),
+            "depth": store.depth[index],
+            "board": store.format_board(board),
+            "child_count": len(self.children(index))
+        }
+
+class TreeCache:
+    """
+    Search trees kept after /ai/move has answered, so clients can fetch
+    them node by node instead of receiving them whole.
+
+    A tree is dropped once it has not been looked at for ``ttl`` seconds,
+    and the least recently used tree goes first when more than ``max_trees``
+    are held.
+    """
+
+    def __init__(self, ttl: float = 600.0, max_trees: int = 32, clock=time.monotonic):
+        """
+        Args:
+            ttl: Seconds a tree is kept after it was stored or last read
+            max_trees: Most trees held at once
+            clock: Time source in seconds, replaceable for tests
+        """
+        self.ttl = ttl
+        self.max_trees = max_trees
+        self.clock = clock
+        self.trees: OrderedDict = OrderedDict()  # Id -> (last use, StoredTree), least recent first
+
+    def __len__(self) -> int:
+        return len(self.trees)
+
+    def put(self, root: TreeNode) -> str:
+        """Keep the tree under ``root`` and return its id."""
+        self.evict()
+        tree_id = uuid.uuid4().hex
+        self.trees[tree_id] = (self.clock(), StoredTree(root.store, root.index))
+        while len(self.trees) > self.max_trees:
+            self.trees.popitem(last=False)
+        return tree_id
+
+    def get(self, tree_id: str) -> Optional[StoredTree]:
+        """The tree stored under ``tree_id``, or None if it expired or never existed."""
+        self.evict()
+        entry = self.trees.get(tree_id)
+        if entry is None:
+            return None
+        self.trees[tree_id] = (self.clock(), entry[1])
+        self.trees.move_to_end(tree_id)
+        return entry[1]
+
+    def evict(self):
+        """Drop the trees whose time to live has run out."""
+        expiry = self.clock() - self.ttl
+        while self.trees:
+            tree_id, (used, _) = next(iter(self.trees.items()))
+            if used > expiry:
+                break
+            del self.trees[tree_id]
@@ -0,0 +1,313 @@
+import math
+import numpy as np
+from array import array
+from typing import Dict, List, Optional, Tuple
+from src.models.bitboard import bit_indices
+
+# Sentinel for a missing move, parent or best child
+NONE = -1
+
+# Bits of the flags column above the two bits holding the player
+HAS_BOARD = 4
+INTEGRAL = 8   # The score was an int
+
+class TreeStore:
+    """
+    Search tree kept column-wise: node i is row i of parallel typed arrays.
+
+    Positions are not stored per node. Each node records the column that was
+    played to reach it, and boards are rebuilt from the move path when the
+    tree is serialized; only nodes without a path (search roots) keep their
+    pieces, as one bitboard per player in the BitBoard bit layout.
+
+    A node is linked to its parent when add_child() is called, so subtrees
+    that are searched but never added (such as PVS scouts) stay unreachable.
+    An alias row stands for another row's subtree under a different move
+    label, which is how expectimax lists one outcome under several intended
+    moves without copying it.
+    """
+
+    def __init__(self, width: int = 7, height: int = 6):
+        """
+        Args:
+            width: Board width of the positions stored
+            height: Board height of the positions stored
+        """
+        self.width = width
+        self.height = height
+        self.stride = height + 1
+        self.parent = array('i')   # Row of the parent, NONE until added
+        self.move = array('b')     # Move label, NONE for no move
+        self.played = array('b')   # Column played from the parent position, NONE if unknown
+        self.score = array('d')    # NaN for no score
+        self.flags = array('B')    # Player | HAS_BOARD | INTEGRAL
+        self.depth = array('b')
+        self.best = array('i')     # Row of the best child, or NONE
+        self.first = array('i')    # Row of the first child added, or NONE
+        self.next = array('i')     # Row of the next sibling, or NONE
+        self.boards: Dict[int, Tuple[int, int]] = {}  # Row -> pieces of player 1 and 2
+        self.sources: Dict[int, int] = {}             # Alias row -> row whose subtree it shows
+
+    def __len__(self) -> int:
+        return len(self.parent)
+
+    def encode(self, state) -> Tuple[int, int]:
+        """Bitboards of both players for a BitBoard or ConnectFourBoard."""
+        bitboards = getattr(state, 'bitboards', None)
+        if bitboards is not None:
+            return bitboards[1], bitboards[2]
+        cells = np.asarray(state.board).ravel()
+        indices = bit_indices(self.width, self.height)
+        return tuple(sum(1 << int(index) for index in indices[cells == player]) for player in (1, 2))
+
+    def add(self, move: Optional[int] = None, score: Optional[float] = None, player: Optional[int] = None,
+            depth: int = 0, board=None) -> int:
+        """
+        Append a detached node.
+
+        Args:
+            board: Position at the node (BitBoard or ConnectFourBoard), or
+                None. Below the root only its last move is kept.
+
+        Returns:
+            Row of the new node
+        """
+        row = len(self.parent)
+        played = NONE
+        flags = player or 0
+        if board is not None:
+            flags |= HAS_BOARD
+            if depth == 0 or board.last_move is None:
+                self.boards[row] = self.encode(board)
+            else:
+                played = board.last_move[1]
+        self.parent.append(NONE)
+        self.move.append(NONE if move is None else move)
+        self.played.append(played)
+        self.score.append(math.nan)
+        self.flags.append(flags)
+        self.depth.append(depth)
+        self.best.append(NONE)
+        self.first.append(NONE)
+        self.next.append(NONE)
+        self.set_score(row, score)
+        return row
+
+    def alias(self, index: int, move: Optional[int]) -> int:
+        """Append a detached row showing ``index``'s finished subtree under ``move``."""
+        source = self.source(index)
+        row = self.add(None, None, None, self.depth[index])
+        self.move[row] = NONE if move is None else move
+        self.played[row] = self.played[source]
+        self.score[row] = self.score[source]
+        self.flags[row] = self.flags[source]
+        self.best[row] = self.best[source]
+        self.sources[row] = source
+        if source in self.boards:
+            self.boards[row] = self.boards[source]
+        return row
+
+    def source(self, index: int) -> int:
+        """Row whose children ``index`` has (itself unless it is an alias)."""
+        return self.sources.get(index, index)
+
+    def attach(self, parent: int, child: int):
+        """Make ``child`` the next child of ``parent``."""
+        self.parent[child] = parent
+        row = self.first[parent]
+        if row == NONE:
+            self.first[parent] = child
+            return
+        # Siblings are few (one per column), so walking to the last one is cheap
+        while self.next[row] != NONE:
+            row = self.next[row]
+        self.next[row] = child
+
+    def graft(self, other: 'TreeStore', index: int) -> int:
+        """Copy ``index`` and its subtree from another store; returns the new detached row."""
+        board = other.board_of(index)
+        row = self._graft(other, index, other.children_lists())
+        if board is not None:
+            self.boards[row] = board
+        return row
+
+    def _graft(self, other: 'TreeStore', index: int, children: List[List[int]]) -> int:
+        row = self.add(other.get_move(index), None, None, other.depth[index])
+        self.played[row] = other.played[index]
+        self.score[row] = other.score[index]
+        self.flags[row] = other.flags[index]
+        best = other.best[other.source(index)]
+        for child in children[other.source(index)]:
+            grafted = self._graft(other, child, children)
+            self.attach(row, grafted)
+            if child == best:
+                self.best[row] = grafted
+        return row
+
+    def mirror(self, index: int) -> int:
+        """Copy ``index``'s subtree reflected left-right; returns the new detached row."""
+        return self._mirror(index, self.children_lists())
+
+    def _mirror(self, index: int, children: List[List[int]]) -> int:
+        move = self.get_move(index)
+        row = self.add(None if move is None else self.width - 1 - move, None, None, self.depth[index])
+        played = self.played[index]
+        self.played[row] = played if played == NONE else self.width - 1 - played
+        self.score[row] = self.score[index]
+        self.flags[row] = self.flags[index]
+        if index in self.boards:
+            self.boards[row] = tuple(self.mirror_pieces(pieces) for pieces in self.boards[index])
+        source = self.source(index)
+        best = self.best[source]
+        # Reversed, so the children still come in the order their columns were searched
+        for child in reversed(children[source]):
+            mirrored = self._mirror(child, children)
+            self.attach(row, mirrored)
+            if child == best:
+                self.best[row] = mirrored
+        return row
+
+    def mirror_pieces(self, pieces: int) -> int:
+        """One player's bitboard reflected left-right."""
+        column = (1 << self.stride) - 1
+        return sum(((pieces >> (col * self.stride)) & column) << ((self.width - 1 - col) * self.stride)
+                   for col in range(self.width))
+
+    def get_move(self, index: int) -> Optional[int]:
+        move = self.move[index]
+        return None if move == NONE else move
+
+    def get_score(self, index: int) -> Optional[float]:
+        score = self.score[index]
+        if math.isnan(score):
+            return None
+        return int(score) if self.flags[index] & INTEGRAL else score
+
+    def set_score(self, index: int, score: Optional[float]):
+        self.score[index] = math.nan if score is None else score
+        if isinstance(score, int):
+            self.flags[index] |= INTEGRAL
+        else:
+            self.flags[index] &= ~INTEGRAL
+
+    def get_player(self, index: int) -> Optional[int]:
+        return self.flags[index] & 3 or None
+
+    def children_lists(self) -> List[List[int]]:
+        """Children of every row in the order they were added (one pass)."""
+        children = [[] for _ in range(len(self.parent))]
+        for row, parent in enumerate(self.parent):
+            if parent != NONE:
+                children[parent].append(row)
+        return children
+
+    def children(self, index: int) -> List[int]:
+        """Children of one row in the order they were added, following the sibling links."""
+        children = []
+        row = self.first[self.source(index)]
+        while row != NONE:
+            children.append(row)
+            row = self.next[row]
+        return children
+
+    def child_index(self) -> Tuple[array, array]:
+        """
+        Children of every row as two flat arrays, built in one pass: the
+        children of row i are ``rows[starts[i]:starts[i + 1]]`` in the order
+        they were added. Unlike children_lists() this holds no Python objects
+        per row, so it suits trees that are kept around.
+        """
+        count = len(self.parent)
+        starts = array('i', bytes(4 * (count + 1)))
+        for parent in self.parent:
+            if parent != NONE:
+                starts[parent + 1] += 1
+        for row in range(count):
+            starts[row + 1] += starts[row]
+        rows = array('i', bytes(4 * starts[count]))
+        fill = starts[:-1]
+        for row, parent in enumerate(self.parent):
+            if parent != NONE:
+                rows[fill[parent]] = row
+                fill[parent] += 1
+        return starts, rows
+
+    def best_rank(self, index: int, children: List[int]) -> Optional[int]:
+        """Position of the best child among ``children``, or None."""
+        best = self.best[self.source(index)]
+        return children.index(best) if best != NONE else None
+
+    def drop(self, board: Tuple[int, int], column: int, player: int) -> Tuple[int, int]:
+        """Pieces after ``player`` drops a piece in ``column``."""
+        base = column * self.stride
+        filled = ((board[0] | board[1]) >> base) & ((1 << self.height) - 1)
+        bit = ((filled + 1) & ~filled) << base
+        return (board[0] | bit, board[1]) if player == 1 else (board[0], board[1] | bit)
+
+    def board_of(self, index: int) -> Optional[Tuple[int, int]]:
+        """Pieces at a node, replayed from the nearest stored board above it."""
+        if not self.flags[index] & HAS_BOARD:
+            return None
+        path = []
+        while index not in self.boards:
+            parent = self.parent[index]
+            if parent == NONE or self.played[index] == NONE:
+                return None
+            path.append(index)
+            index = parent
+        board = self.boards[index]
+        for row in reversed(path):
+            board = self.drop(board, self.played[row], self.get_player(self.parent[row]))
+        return board
+
+    def format_board(self, board: Optional[Tuple[int, int]]) -> Optional[str]:
+        """Pieces in ConnectFourBoard's text format."""
+        if board is None:
+            return None
+        p1, p2 = board
+        symbols = ('.', 'X', 'O')
+        lines = []
+        for row in range(self.height - 1, -1, -1):
+            cells = []
+            for col in range(self.width):
+                bit = 1 << (col * self.stride + row)
+                cells.append(symbols[1 if p1 & bit else 2 if p2 & bit else 0])
+            lines.append(' '.join(cells))
+        return '\n'.join(lines) + "\n" + " ".join(map(str, range(self.width)))
+
+    def child_board(self, board: Optional[Tuple[int, int]], parent: int, child: int) -> Optional[Tuple[int, int]]:
+        """Pieces at ``child`` given the pieces at its parent (None if not known)."""
+        if not self.flags[child] & HAS_BOARD:
+            return None
+        if child in self.boards:
+            return self.boards[child]
+        if board is None or self.played[child] == NONE:
+            return None
+        return self.drop(board, self.played[child], self.get_player(parent))
+
+    def board_str(self, index: int) -> Optional[str]:
+        """The node's position in ConnectFourBoard's text format, or None."""
+        return self.format_board(self.board_of(index))
+
+    def to_dict(self, index: int) -> dict:
+        """Serialize the subtree at ``index`` in the TreeNode JSON shape."""
+        return self._to_dict(index, self.children_lists(), self.board_of(index))
+
+    def _to_dict(self, index: int, children: List[List[int]], board: Optional[Tuple[int, int]]) -> dict:
+        kids = children[self.source(index)]
+        nodes = [self._to_dict(child, children, self.child_board(board, index, child)) for child in kids]
+        return {
+            "move": self.get_move(index),
+            "score": self.get_score(index),
+            "player": self.get_player(index),
+            "depth": self.depth[index],
+            "board": self.format_board(board),
+            "children": nodes,
+            "best_child": self.best_rank(index, kids)
+        }
+
+    def nbytes(self) -> int:
+        """Bytes held by the columns (excluding over-allocation and the sparse maps)."""
+        columns = (self.parent, self.move, self.played, self.score, self.flags, self.depth, self.best,
+                   self.first, self.next)
+        return sum(column.itemsize * len(column) for column in columns)
@@ -0,0 +1,41 @@
+import random
+from functools import lru_cache
+from typing import List
+
+# Fixed seed so hashes agree between processes and across restarts
+ZOBRIST_SEED = 0xC0FFEE
+
+@lru_cache(maxsize=None)
+def zobrist_keys(width: int, height: int) -> List[List[int]]:
+    """
+    Get the Zobrist keys for a board size.
+
+    Args:
+        width: Board width
+        height: Board height
+
+    Returns:
+        piece_keys, where piece_keys[player][row * width + col] is the
+        64-bit key of a piece (row 0 is the top, slot 0 is unused). The side
+        to move is keyed by the transposition table (SIDE_KEY).
+    """
+    rng = random.Random(f"{ZOBRIST_SEED}:{width}x{height}")
+    cells = width * height
+    return [[0] * cells] + [[rng.getrandbits(64) for _ in range(cells)] for _ in (1, 2)]
+
+def mirror_cell(cell: int, width: int) -> int:
+    """Row-major index of the cell reflected left-right."""
+    row, col = divmod(cell, width)
+    return row * width + width - 1 - col
+
+def hash_array(array) -> int:
+    """Compute the Zobrist hash of a (height, width) board array from scratch."""
+    height, width = array.shape
+    piece_keys = zobrist_keys(width, height)
+    key = 0
+    for row in range(height):
+        for col in range(width):
+            player = int(array[row, col])
+            if player:
+                key ^= piece_keys[player][row * width + col]
+    return key
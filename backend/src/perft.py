@@ -0,0 +1,149 @@
+"""
+Perft: exact counts of the positions reached at each ply, to check a board
+implementation's move generation and measure its speed.
+
+Every sequence of legal moves is played out with get_valid_moves() and
+play()/undo(), and the positions at each ply are counted, along with how
+many of them end the game. Terminal positions are not expanded. The rules
+decide which positions are terminal: "full" is the game this app plays,
+which only ends when the board is full and is then scored by fours, and
+"four" is classic Connect 4, which ends at the first four and has
+published perft numbers.
+
+perft_table() gives the same counts much faster by counting each distinct
+position once per remaining depth. It recognises a position by its
+Zobrist hash, or by its canonical hash with ``mirror``, since reflected
+positions have the same counts.
+
+    python -m src.perft 8 --rules four --table
+"""
+import argparse
+import sys
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+from src.models.board import ConnectFourBoard
+from src.models.bitboard import BitBoard
+
+BACKENDS = {"array": ConnectFourBoard, "bitboard": BitBoard}
+RULES = ("full", "four")
+
+class PerftResult(NamedTuple):
+    """Positions and terminal positions at plies 1..depth (index 0 is ply 1)."""
+    nodes: List[int]
+    terminal: List[int]
+
+    @property
+    def leaves(self) -> int:
+        """Positions at the last ply: the classic perft number."""
+        return self.nodes[-1] if self.nodes else 1
+
+def terminal_test(rules: str) -> Callable:
+    """Whether a position ends the game under ``rules``, given the move that led to it was just played."""
+    if rules == "full":
+        return lambda board: board.is_full()
+    if rules == "four":
+        # No four existed before the last move, so only its player can have one
+        return lambda board: board.is_full() or board.count_fours(3 - board.current_player) > 0
+    raise ValueError(f"Unknown rules: {rules}")
+
+def start_position(backend: str = "bitboard", moves: str = "", width: int = 7, height: int = 6):
+    """A board of the given backend after the columns in ``moves`` were played."""
+    board = BACKENDS[backend](width, height)
+    for col in moves:
+        if not board.drop_piece(int(col)):
+            raise ValueError(f"Invalid move: column {col}")
+    return board
+
+def perft(board, depth: int, rules: str = "full") -> PerftResult:
+    """Count every move sequence of up to ``depth`` plies from ``board``, which is left as it was."""
+    result = PerftResult([0] * depth, [0] * depth)
+    if depth > 0:
+        _perft(board, depth, 0, result, terminal_test(rules))
+    return result
+
+def _perft(board, depth: int, ply: int, result: PerftResult, is_terminal):
+    for col in board.get_valid_moves():
+        board.play(col)
+        result.nodes[ply] += 1
+        if is_terminal(board):
+            result.terminal[ply] += 1
+        elif ply + 1 < depth:
+            _perft(board, depth, ply + 1, result, is_terminal)
+        board.undo()
+
+def perft_table(board, depth: int, rules: str = "full", mirror: bool = True,
+                table: Optional[Dict] = None) -> PerftResult:
+    """
+    perft() counting each position once per remaining depth.
+
+    Args:
+        mirror: Count a position and its reflection once
+        table: Counts by (position hash, plies left), kept between calls
+            with the same rules when given
+    """
+    if depth <= 0:
+        return PerftResult([], [])
+    table = {} if table is None else table
+    key = (lambda board: board.canonical_hash()) if mirror else (lambda board: board.hash)
+    nodes, terminal = _perft_table(board, depth, terminal_test(rules), table, key)
+    return PerftResult(list(nodes), list(terminal))
+
+def _perft_table(board, remaining: int, is_terminal, table: Dict, key):
+    entry = table.get((key(board), remaining))
+    if entry is not None:
+        return entry
+    nodes = [0] * remaining
+    terminal = [0] * remaining
+    for col in board.get_valid_moves():
+        board.play(col)
+        nodes[0] += 1
+        if is_terminal(board):
+            terminal[0] += 1
+        elif remaining > 1:
+            below_nodes, below_terminal = _perft_table(board, remaining - 1, is_terminal, table, key)
+            for ply in range(remaining - 1):
+                nodes[ply + 1] += below_nodes[ply]
+                terminal[ply + 1] += below_terminal[ply]
+        board.undo()
+    entry = table[(key(board), remaining)] = (tuple(nodes), tuple(terminal))
+    return entry
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.perft",
+                                     description="Count positions per ply with every board backend")
+    parser.add_argument("depth", type=int)
+    parser.add_argument("--board", choices=("all",) + tuple(BACKENDS), default="all")
+    parser.add_argument("--rules", choices=RULES, default="full")
+    parser.add_argument("--table", action="store_true", help="Count each distinct position once")
+    parser.add_argument("--no-mirror", dest="mirror", action="store_false",
+                        help="With --table, count reflected positions separately")
+    parser.add_argument("--moves", default="", help="Columns played before counting, e.g. 3324")
+    parser.add_argument("--width", type=int, default=7)
+    parser.add_argument("--height", type=int, default=6)
+    args = parser.parse_args(argv)
+
+    results = {}
+    for backend in BACKENDS if args.board == "all" else (args.board,):
+        board = start_position(backend, args.moves, args.width, args.height)
+        started = time.perf_counter()
+        if args.table:
+            result = perft_table(board, args.depth, args.rules, args.mirror)
+        else:
+            result = perft(board, args.depth, args.rules)
+        seconds = time.perf_counter() - started
+        results[backend] = result
+        print(f"{backend}: {sum(result.nodes)} nodes in {seconds:.3f}s "
+              f"({sum(result.nodes) / seconds if seconds > 0 else 0:.0f} nodes/s)")
+
+    first = next(iter(results.values()))
+    print(f"{'ply':>3} {'nodes':>14} {'terminal':>14}")
+    for ply, (nodes, terminal) in enumerate(zip(first.nodes, first.terminal), 1):
+        print(f"{ply:>3} {nodes:>14} {terminal:>14}")
+    mismatched = [backend for backend, result in results.items() if result != first]
+    if mismatched:
+        print(f"Counts differ: {', '.join(mismatched)} against {next(iter(results))}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
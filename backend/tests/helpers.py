@@ -0,0 +1,33 @@
+import random
+import time
+from src.models.board import ConnectFourBoard
+from src.algorithms.minimax import minimize
+from src.algorithms.search_context import SearchContext, CAPTURE_NONE
+from src.algorithms.transposition import TranspositionTable
+
+def position(moves: str) -> ConnectFourBoard:
+    """Board after playing the columns in ``moves``, e.g. "33" for two center moves."""
+    board = ConnectFourBoard()
+    for col in moves:
+        board.drop_piece(int(col))
+    return board
+
+def random_position(seed: int, plies: int) -> ConnectFourBoard:
+    rng = random.Random(seed)
+    board = ConnectFourBoard()
+    for _ in range(plies):
+        board.drop_piece(rng.choice(board.get_valid_moves()))
+    return board
+
+def move_value(board: ConnectFourBoard, move: int, k: int):
+    """Exact value of playing ``move``, searched k plies deep from a fresh table."""
+    child = board.copy()
+    child.drop_piece(move)
+    return minimize(child, k, 1, True, context=SearchContext(table=TranspositionTable(), capture=CAPTURE_NONE))[2]
+
+class SlowListeners(dict):
+    """Listeners the progress reader finds only after a delay, as on a loaded server."""
+
+    def get(self, ticket, default=None):
+        time.sleep(0.05)
+        return super().get(ticket, default)
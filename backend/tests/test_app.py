@@ -0,0 +1,49 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+import app
+from src.algorithms.search_pool import SearchPool
+from helpers import position, SlowListeners
+
+@pytest.fixture(scope="module")
+def client():
+    app.pool = SearchPool(workers=1, max_pending=2, deadline_s=5)
+    with TestClient(app.app) as client:
+        yield client
+    app.pool = None  # Shut down with the app
+
+def body(moves: str, **fields) -> dict:
+    board = position(moves)
+    request = {"board": board.board.tolist(), "current_player": board.current_player,
+               "algorithm": "alphabeta", "depth": 4, "tree": "none"}
+    request.update(fields)
+    return request
+
+def test_stream_sends_every_depth_before_the_move(client, monkeypatch):
+    monkeypatch.setattr(app.pool, "listeners", SlowListeners())
+    with client.websocket_connect("/ai/move/stream") as websocket:
+        websocket.send_json(body("32"))
+        messages = [websocket.receive_json()]
+        while messages[-1]["type"] == "iteration":
+            messages.append(websocket.receive_json())
+    assert [message["depth"] for message in messages[:-1]] == [1, 2, 3, 4]
+    assert messages[-1]["type"] == "move" and messages[-1]["depth"] == 4
+
+def test_cached_answer_has_the_keys_of_a_searched_one(client):
+    searched = client.post("/ai/move", json=body("44")).json()
+    cached = client.post("/ai/move", json=body("44", depth=3)).json()
+    assert not searched["cached"] and cached["cached"]
+    assert cached.keys() == searched.keys()
+    assert (cached["move"], cached["depth"], cached["score"]) == (searched["move"], 4, searched["score"])
+    assert cached["stats"] == searched["stats"]
+
+def test_batch_streams_a_line_per_position(client):
+    response = client.post("/ai/moves/batch", json={"positions": [body("1"), body("15", depth=2)]})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["index"] for line in lines) == [0, 1]
+    assert all(line["move"] is not None for line in lines)
+
+@pytest.mark.parametrize("time_ms", [0, -1])
+def test_time_budget_must_be_positive(client, time_ms):
+    response = client.post("/ai/move", json=body("3", time_ms=time_ms))
+    assert response.status_code == 422
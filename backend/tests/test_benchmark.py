@@ -0,0 +1,59 @@
+import copy
+import json
+import os
+from src import benchmark
+from src.algorithms.minimax import decision
+from src.models.tree_cache import StoredTree
+
+BASELINE = os.path.join(os.path.dirname(__file__), "data", "bench_baseline.json")
+
+def test_searches_match_the_stored_baseline():
+    # Nodes, moves, scores and trees are exact; time and memory depend on the machine
+    with open(BASELINE) as f:
+        baseline = json.load(f)
+    baseline["cases"] = [case for case in baseline["cases"] if case["depth"] == 2]
+    current = benchmark.run_suite(depths=(2,), repeat=1, payload=False)
+    regressions = benchmark.compare(baseline, current, {"time_s": float('inf'),
+                                                       "peak_memory_bytes": float('inf')})
+    assert regressions == [], benchmark.report(regressions)
+
+def test_case_records_every_measurement():
+    board = benchmark.position_board(benchmark.load_corpus()[1])
+    case = benchmark.run_case(board, "alphabeta", 3, repeat=1)
+    assert case["nodes"] > 0 and case["nps"] > 0 and case["peak_memory_bytes"] > 0
+    assert case["tree_nodes"] > 1 and case["tree_bytes"] > 0 and case["tree_payload_bytes"] > 0
+    assert benchmark.run_case(board, "alphabeta", 3, repeat=1, tree="none")["tree_nodes"] == 0
+
+def test_payload_is_skipped_for_trees_too_large_to_stream(monkeypatch):
+    board = benchmark.position_board(benchmark.load_corpus()[1])
+    _, root = decision(board, 2, use_expected_minimax=True)
+    tree = StoredTree(root.store, root.index)
+    size = benchmark.walk_size(tree)
+    assert size == sum(1 for _ in tree.walk()) > len(root.store)  # Expectimax shares outcomes
+    assert benchmark.tree_payload(root) > 0
+    monkeypatch.setattr(benchmark, "PAYLOAD_MAX_NODES", size - 1)
+    assert benchmark.tree_payload(root) is None
+
+def test_compare_flags_regressions_beyond_tolerance():
+    baseline = {"cases": [{"position": "p", "algorithm": "pvs", "depth": 4, "move": 3, "score": 10,
+                           "nodes": 100, "time_s": 1.0, "peak_memory_bytes": 1000, "tree_bytes": 50,
+                           "tree_payload_bytes": None}]}
+    current = copy.deepcopy(baseline)
+    current["cases"][0].update(time_s=1.2, peak_memory_bytes=900)
+    assert benchmark.compare(baseline, current) == []
+
+    current["cases"][0].update(nodes=101, time_s=1.5, move=2)
+    assert {regression["metric"] for regression in benchmark.compare(baseline, current)} == \
+        {"nodes", "time_s", "move"}
+    assert benchmark.compare(baseline, {"cases": []})[0]["metric"] == "missing"
+
+def test_cli_exits_nonzero_on_regression(tmp_path, capsys):
+    case = {"position": "p", "algorithm": "mtdf", "depth": 2, "move": 3, "score": 0,
+            "nodes": 10, "time_s": 0.1}
+    (tmp_path / "baseline.json").write_text(json.dumps({"cases": [case]}))
+    (tmp_path / "current.json").write_text(json.dumps({"cases": [dict(case, nodes=12)]}))
+    assert benchmark.main(["compare", str(tmp_path / "baseline.json"), str(tmp_path / "baseline.json")]) == 0
+    assert benchmark.main(["compare", str(tmp_path / "baseline.json"), str(tmp_path / "current.json")]) == 1
+    out = capsys.readouterr().out
+    assert "mtdf       d2          12 nodes (1.20x)" in out
+    assert "nodes: 10 -> 12" in out
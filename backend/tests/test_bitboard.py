@@ -0,0 +1,112 @@
+import random
+import unittest
+import numpy as np
+from src.models.board import ConnectFourBoard
+from src.models.bitboard import BitBoard
+from src.algorithms.minimax import maximize
+
+class TestBitBoard(unittest.TestCase):
+    def play_random_game(self, seed):
+        """Play the same random game on both backends, yielding after each move."""
+        rng = random.Random(seed)
+        board = ConnectFourBoard()
+        bitboard = BitBoard()
+        while board.get_valid_moves():
+            yield board, bitboard
+            move = rng.choice(board.get_valid_moves())
+            self.assertTrue(board.drop_piece(move))
+            self.assertTrue(bitboard.drop_piece(move))
+        yield board, bitboard
+
+    def assert_same_position(self, board, bitboard):
+        self.assertTrue(np.array_equal(board.board, bitboard.board))
+        self.assertEqual(board.current_player, bitboard.current_player)
+        self.assertEqual(board.last_move, bitboard.last_move)
+        self.assertEqual(board.get_valid_moves(), bitboard.get_valid_moves())
+        self.assertEqual(board.is_full(), bitboard.is_full())
+        self.assertEqual(board.count_fours(1), bitboard.count_fours(1))
+        self.assertEqual(board.count_fours(2), bitboard.count_fours(2))
+        self.assertEqual(board.check_winner(), bitboard.check_winner())
+        self.assertEqual(str(board), str(bitboard))
+
+    def test_matches_numpy_board_over_random_games(self):
+        """Every query agrees with ConnectFourBoard throughout random games"""
+        for seed in range(20):
+            for board, bitboard in self.play_random_game(seed):
+                self.assert_same_position(board, bitboard)
+
+    def test_mirror_hash_matches_numpy_board(self):
+        for board, bitboard in self.play_random_game(4):
+            self.assertEqual(bitboard.mirror_hash, board.mirror_hash)
+            self.assertEqual(bitboard.is_symmetric(), board.is_symmetric())
+        self.assertEqual(BitBoard.from_board(board).mirror_hash, board.mirror_hash)
+
+    def test_from_board_round_trip(self):
+        """Converting to a bitboard and back preserves the position"""
+        for board, _ in self.play_random_game(42):
+            bitboard = BitBoard.from_board(board)
+            self.assert_same_position(board, bitboard)
+            self.assertTrue(np.array_equal(bitboard.to_board().board, board.board))
+
+    def test_floating_pieces(self):
+        """Hand-made positions with gaps drop into the lowest empty cell"""
+        board = ConnectFourBoard()
+        board.board[2, 3] = 1
+        board.board[3, 2] = 1
+        bitboard = BitBoard.from_board(board)
+        for move in (3, 3, 3, 3, 2):
+            self.assertEqual(board.drop_piece(move), bitboard.drop_piece(move))
+            self.assert_same_position(board, bitboard)
+
+    def test_invalid_moves(self):
+        """Out of range and full columns are rejected"""
+        bitboard = BitBoard()
+        self.assertFalse(bitboard.drop_piece(-1))
+        self.assertFalse(bitboard.drop_piece(7))
+        for _ in range(6):
+            self.assertTrue(bitboard.drop_piece(0))
+        self.assertFalse(bitboard.drop_piece(0))
+        self.assertNotIn(0, bitboard.get_valid_moves())
+
+    def test_copy_is_independent(self):
+        """Moves on a copy do not affect the original"""
+        bitboard = BitBoard()
+        bitboard.drop_piece(3)
+        board_copy = bitboard.copy()
+        board_copy.drop_piece(3)
+        self.assertEqual(bitboard.heights[3], 1)
+        self.assertEqual(board_copy.heights[3], 2)
+        self.assertNotEqual(bitboard.current_player, board_copy.current_player)
+
+    def test_play_undo_restores_position(self):
+        """play() followed by undo() restores every piece of state"""
+        for board, _ in self.play_random_game(7):
+            bitboard = BitBoard.from_board(board)
+            before = (bitboard.bitboards[:], bitboard.mask, bitboard.heights[:],
+                      bitboard.current_player, bitboard.last_move, str(bitboard))
+            for move in bitboard.get_valid_moves():
+                bitboard.play(move)
+                board_copy = board.copy()
+                board_copy.drop_piece(move)
+                self.assert_same_position(board_copy, bitboard)
+                bitboard.undo()
+                after = (bitboard.bitboards[:], bitboard.mask, bitboard.heights[:],
+                         bitboard.current_player, bitboard.last_move, str(bitboard))
+                self.assertEqual(before, after)
+        with self.assertRaises(ValueError):
+            BitBoard().play(-1)
+
+    def test_search_chooses_same_moves(self):
+        """Minimax picks the same move and score on both backends"""
+        for seed in range(3):
+            for ply, (board, bitboard) in enumerate(self.play_random_game(seed)):
+                if ply % 9 != 4:
+                    continue
+                for use_alpha_beta in (False, True):
+                    move, root, _ = maximize(board.copy(), 2, use_alpha_beta=use_alpha_beta)
+                    bit_move, bit_root, _ = maximize(bitboard.copy(), 2, use_alpha_beta=use_alpha_beta)
+                    self.assertEqual(move, bit_move)
+                    self.assertEqual(root.score, bit_root.score)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -119,5 +119,41 @@ class TestConnectFourBoard(unittest.TestCase):
         board_copy.drop_piece(2)
         self.assertNotEqual(self.board.current_player, board_copy.current_player)
 
+    def test_play_undo(self):
+        """Test that undo restores the position before each play"""
+        snapshots = []
+        for move in [3, 3, 2, 4, 0, 6, 3]:
+            snapshots.append((self.board.board.copy(), self.board.current_player, self.board.last_move))
+            self.board.play(move)
+
+        for board_state, player, last_move in reversed(snapshots):
+            self.board.undo()
+            self.assertTrue(np.array_equal(self.board.board, board_state))
+            self.assertEqual(self.board.current_player, player)
+            self.assertEqual(self.board.last_move, last_move)
+        self.assertEqual(self.board.move_stack, [])
+
+        # Invalid moves are rejected instead of silently ignored
+        with self.assertRaises(ValueError):
+            self.board.play(7)
+
+    def test_mirror_hash(self):
+        """The mirror hash is the hash of the reflected board, kept up to date by moves"""
+        from src.models.zobrist import hash_array
+        for move in [3, 2, 2, 6, 0, 5]:
+            self.board.play(move)
+            self.assertEqual(self.board.mirror_hash, hash_array(np.fliplr(self.board.board)))
+        mirrored = self.board.mirror()
+        self.assertTrue(np.array_equal(mirrored.board, np.fliplr(self.board.board)))
+        self.assertEqual(mirrored.canonical_hash(), self.board.canonical_hash())
+        self.assertNotEqual(mirrored.is_mirrored(), self.board.is_mirrored())
+        self.assertEqual(mirrored.last_move, (self.board.last_move[0], 1))
+        self.assertFalse(self.board.is_symmetric())
+        while self.board.move_stack:
+            self.board.undo()
+        self.assertEqual(self.board.mirror_hash, 0)
+        self.board.play(3)
+        self.assertTrue(self.board.is_symmetric())
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,81 @@
+import json
+import os
+import random
+import numpy as np
+import pytest
+from src.models.board import ConnectFourBoard
+from src.models.bitboard import BitBoard
+from src.algorithms import evaluation
+from src.algorithms.minimax import eval, decision
+from src.algorithms.evaluation import IncrementalEvaluator, window_tables
+
+CORPUS = os.path.join(os.path.dirname(__file__), "data", "eval_corpus.json")
+
+def load_corpus():
+    """Positions scored by the original slicing implementation of eval()."""
+    with open(CORPUS) as f:
+        corpus = json.load(f)
+    width, height = corpus["width"], corpus["height"]
+    for entry in corpus["positions"]:
+        board = ConnectFourBoard(width, height)
+        board.board = np.array([int(c) for c in entry["board"]]).reshape(height, width)
+        yield board, entry["score"]
+
+def test_window_tables_cover_all_windows():
+    """There are 69 four-cell windows on a 7x6 board: 24 + 21 + 12 + 12."""
+    tables = window_tables(7, 6)
+    assert tables.windows.shape == (69, 4)
+    assert np.bincount(tables.kinds).tolist() == [24, 21, 12, 12]
+    assert len({tuple(sorted(w)) for w in tables.windows.tolist()}) == 69
+    assert sum(len(indices) for indices in tables.through) == 69 * 4
+
+def test_eval_matches_regression_corpus():
+    """The table-driven eval() reproduces the original scores exactly."""
+    count = 0
+    for board, expected in load_corpus():
+        score = eval(board)
+        assert score == expected, f"\n{board}\nexpected {expected}, got {score}"
+        assert type(score) is int
+        count += 1
+    assert count > 1000
+
+def test_eval_matches_on_bitboard():
+    """Gravity-consistent corpus positions score the same on the bitboard backend."""
+    for board, expected in load_corpus():
+        assert eval(BitBoard.from_board(board)) == expected
+
+def test_incremental_eval_tracks_play_and_undo(monkeypatch):
+    """The running score equals a full rescan after every play and undo."""
+    monkeypatch.setattr(evaluation, "CHECK_INCREMENTAL", True)
+    rng = random.Random(11)
+    for _ in range(5):
+        board = BitBoard()
+        board.evaluator = IncrementalEvaluator(board)
+        while not board.is_full():
+            board.play(rng.choice(board.get_valid_moves()))
+            eval(board)
+        while board.move_stack:
+            board.undo()
+            eval(board)
+        assert board.evaluator.value(False) == 0
+
+def test_incremental_eval_cross_check_catches_drift(monkeypatch):
+    """Debug mode raises when the running score disagrees with a rescan."""
+    board = BitBoard()
+    board.play(3)
+    board.evaluator = IncrementalEvaluator(board)
+    board.evaluator.window_score += 1
+    eval(board)  # Not checked unless debug mode is on
+    monkeypatch.setattr(evaluation, "CHECK_INCREMENTAL", True)
+    with pytest.raises(AssertionError):
+        eval(board)
+
+def test_search_with_incremental_eval_cross_checked(monkeypatch):
+    """decision() attaches an incremental evaluator that never drifts."""
+    monkeypatch.setattr(evaluation, "CHECK_INCREMENTAL", True)
+    board = ConnectFourBoard()
+    for move in (3, 3, 2, 4, 4, 1):
+        board.drop_piece(move)
+    for use_alpha_beta, use_expected_minimax in ((False, False), (True, False), (False, True)):
+        move, _ = decision(board, 3, use_alpha_beta=use_alpha_beta, use_expected_minimax=use_expected_minimax)
+        assert move in board.get_valid_moves()
@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+import pytest
+from pydantic import ValidationError
+from src import metrics
+from src.models.board import ConnectFourBoard
+from src.models.result_cache import ResultCache
+from src.models.tree_cache import TreeCache
+from src.algorithms.search_pool import request_context, run_request
+
+def sample(name: str, **labels) -> float:
+    return metrics.REGISTRY.get_sample_value(name, labels) or 0.0
+
+def search(algorithm: str, depth: int) -> dict:
+    request = {"board": ConnectFourBoard().board.tolist(), "current_player": 2, "algorithm": algorithm,
+               "depth": depth, "tree": "none"}
+    context = request_context(request)
+    move, root = run_request(request, context)
+    return {"move": move, "root": root, "cancelled": False, "stats": context.stats()}
+
+def test_search_is_recorded_from_its_stats():
+    result = search("alphabeta", 3)
+    nodes = sample("search_nodes_total", algorithm="alphabeta")
+    latencies = sample("search_latency_seconds_count", algorithm="alphabeta", depth="3")
+    hits = sample("transposition_probes_total", result="hit")
+    metrics.record_search("alphabeta", 3, 0.25, result)
+    assert sample("search_nodes_total", algorithm="alphabeta") == nodes + result["stats"]["nodes"]
+    assert sample("search_latency_seconds_count", algorithm="alphabeta", depth="3") == latencies + 1
+    assert sample("transposition_probes_total", result="hit") == hits + result["stats"]["table"]["hits"]
+    assert sample("search_nodes_per_second_count", algorithm="alphabeta") >= 1
+
+def test_outcomes_are_counted():
+    cancelled = sample("searches_total", algorithm="pvs", outcome="cancelled")
+    busy = sample("searches_total", algorithm="pvs", outcome="busy")
+    metrics.record_search("pvs", 4, 0.1, {"move": None, "root": None, "cancelled": True, "stats": None})
+    metrics.record_failure("pvs", "busy")
+    assert sample("searches_total", algorithm="pvs", outcome="cancelled") == cancelled + 1
+    assert sample("searches_total", algorithm="pvs", outcome="busy") == busy + 1
+
+def test_service_gauges_are_read_at_scrape_time():
+    results = ResultCache()
+    board = ConnectFourBoard().board
+    results.put(board, 2, "minimax", 3, 4, 0)
+    results.get(board, 2, "minimax", 4)
+    results.get(board, 1, "minimax", 4)
+    pool = SimpleNamespace(workers=2, pending=lambda: 5)
+    collector = metrics.ServiceCollector(lambda: pool, results, TreeCache())
+    values = {sample.name: sample.value for family in collector.collect() for sample in family.samples
+              if not sample.labels}
+    assert values["searches_in_flight"] == 5
+    assert values["search_pool_queue_depth"] == 3
+    assert values["result_cache_hit_ratio"] == 0.5
+    assert values["tree_cache_trees"] == 0
+
+def test_scrape_before_the_pool_starts():
+    collector = metrics.ServiceCollector(lambda: None, ResultCache(), TreeCache())
+    values = {sample.name: sample.value for family in collector.collect() for sample in family.samples}
+    assert values["search_pool_workers"] == 0 and values["searches_in_flight"] == 0
+    assert b"search_latency_seconds" in metrics.render()
+
+@pytest.mark.parametrize("fields", [{"algorithm": "negamax"}, {"depth": 0}, {"depth": -1}, {"depth": 43}])
+def test_requests_outside_the_label_sets_are_refused(fields):
+    from app import GameState
+    body = {"board": ConnectFourBoard().board.tolist(), "current_player": 1}
+    assert GameState.model_validate(body).depth == 4
+    with pytest.raises(ValidationError):
+        GameState.model_validate(dict(body, **fields))
@@ -1,4 +1,10 @@
+import random
+import pytest
 from src.algorithms.minimax import eval, maximize, minimize, decision
+from src.algorithms.search_context import SearchContext
+from src.algorithms.transposition import TranspositionTable
+from src.algorithms import tracing
+from src.algorithms.tracing import TraceRecorder, LEAF, MOVE, DECISION
 from src.models.board import ConnectFourBoard
 
 # Helper to create a board state quickly for testing eval
@@ -265,4 +271,274 @@ def test_minimax_depth_makes_difference(): # Renamed from test_minimax_depth
     # assert move_depth2 != move_depth4 # This might be too strict
 
 # (Keep test_center_control as it was already passing and correctly set up)
-# It was duplicated, ensure only one version exists. Let's use test_eval_center_control above.
\ No newline at end of file
+# It was duplicated, ensure only one version exists. Let's use test_eval_center_control above.
+
+# --- Iterative deepening with a time budget ---
+
+def test_time_budget_reaches_requested_depth():
+    """With a generous budget, iterative deepening matches a fixed-depth search."""
+    board = ConnectFourBoard()
+    for move in (3, 3, 2, 4, 4, 1):
+        board.drop_piece(move)
+    for use_alpha_beta in (False, True):
+        fixed_move, fixed_root = decision(board, 4, use_alpha_beta=use_alpha_beta)
+        context = SearchContext(table=TranspositionTable())
+        move, root = decision(board, 4, use_alpha_beta=use_alpha_beta, context=context, time_ms=60000)
+        assert context.depth_reached == 4
+        assert (move, root.score) == (fixed_move, fixed_root.score)
+
+def test_time_budget_stops_early():
+    """A tiny budget still returns a legal move from a completed iteration."""
+    board = ConnectFourBoard()
+    context = SearchContext(table=TranspositionTable())
+    move, root = decision(board, 20, use_alpha_beta=True, context=context, time_ms=1)
+    assert move in board.get_valid_moves()
+    assert 1 <= context.depth_reached < 20
+    assert root.score is not None
+
+def test_time_budget_stops_when_board_fills():
+    """No iteration goes deeper than the number of empty cells."""
+    board = ConnectFourBoard()
+    for r in range(1, board.height):
+        for c in range(board.width):
+            board.board[r, c] = 1 if (r + c) % 2 == 0 else 2
+    board.current_player = 2
+    context = SearchContext(table=TranspositionTable())
+    move, _ = decision(board, 42, use_alpha_beta=True, context=context, time_ms=60000)
+    assert move in board.get_valid_moves()
+    assert context.depth_reached == board.width
+
+def test_root_move_hint_keeps_leftmost_tie():
+    """Searching a hinted root move first does not change the chosen move."""
+    for seed, plies in ((1, 4), (4, 9), (8, 16)):
+        rng = random.Random(seed)
+        board = ConnectFourBoard()
+        for _ in range(plies):
+            board.drop_piece(rng.choice(board.get_valid_moves()))
+        expected_move, expected_root = decision(board, 3, use_alpha_beta=True)
+        for hint in board.get_valid_moves():
+            context = SearchContext(table=TranspositionTable())
+            context.root_move_hint = hint
+            move, root = decision(board, 3, use_alpha_beta=True, context=context)
+            assert (move, root.score) == (expected_move, expected_root.score)
+
+# --- PVS and MTD(f) drivers ---
+
+def test_drivers_match_alpha_beta():
+    """PVS and MTD(f) answer the same move and score as full-window alpha-beta."""
+    for seed, plies in ((3, 5), (6, 10), (10, 17)):
+        rng = random.Random(seed)
+        board = ConnectFourBoard()
+        for _ in range(plies):
+            board.drop_piece(rng.choice(board.get_valid_moves()))
+        expected_move, expected_root = decision(board, 5, use_alpha_beta=True)
+        for driver in ({"use_pvs": True}, {"use_mtdf": True}):
+            for time_ms in (None, 60000):
+                context = SearchContext(table=TranspositionTable())
+                move, root = decision(board, 5, context=context, time_ms=time_ms, **driver)
+                assert (move, root.score) == (expected_move, expected_root.score)
+
+def test_mtdf_searches_fewer_nodes():
+    """On a fixed set of positions MTD(f) visits fewer nodes than alpha-beta."""
+    totals = {}
+    for driver in ("use_alpha_beta", "use_mtdf"):
+        totals[driver] = 0
+        for seed in range(4):
+            rng = random.Random(seed)
+            board = ConnectFourBoard()
+            for _ in range(4 + 2 * seed):
+                board.drop_piece(rng.choice(board.get_valid_moves()))
+            context = SearchContext(table=TranspositionTable())
+            decision(board, 6, context=context, **{driver: True})
+            totals[driver] += context.nodes
+    assert totals["use_mtdf"] < totals["use_alpha_beta"]
+
+# --- Expectimax ---
+
+def test_expectimax_is_never_pruned():
+    """use_alpha_beta leaves expectimax's move, value and node count alone."""
+    for seed, plies in ((0, 2), (4, 9), (12, 16)):
+        rng = random.Random(seed)
+        board = ConnectFourBoard()
+        for _ in range(plies):
+            board.drop_piece(rng.choice(board.get_valid_moves()))
+        plain = SearchContext()
+        asked = SearchContext()
+        expected_move, expected_root = decision(board, 3, use_expected_minimax=True, context=plain)
+        move, root = decision(board, 3, use_alpha_beta=True, use_expected_minimax=True, context=asked)
+        assert (move, root.score, asked.nodes) == (expected_move, expected_root.score, plain.nodes)
+
+def reference_expectimax(board: ConnectFourBoard, depth: int, maximizing: bool) -> float:
+    """Expected value with every outcome searched again for each intended move."""
+    if depth == 0 or board.is_full():
+        return eval(board)
+    valid_moves = board.get_valid_moves()
+    values = []
+    for move in valid_moves:
+        outcomes = [(move, 0.6)]
+        left, right = move - 1 in valid_moves, move + 1 in valid_moves
+        if left and right:
+            outcomes += [(move - 1, 0.2), (move + 1, 0.2)]
+        elif left or right:
+            outcomes.append((move - 1 if left else move + 1, 0.4))
+        expected = 0.0
+        for col, prob in outcomes:
+            board.play(col)
+            expected += prob * reference_expectimax(board, depth - 1, not maximizing)
+            board.undo()
+        values.append(expected)
+    return max(values) if maximizing else min(values)
+
+def test_expectimax_searches_each_outcome_once():
+    """Outcomes shared by neighbouring intended moves are searched once per node."""
+    board = ConnectFourBoard()
+    context = SearchContext()
+    decision(board, 1, use_expected_minimax=True, context=context)
+    assert context.nodes == 1 + board.width
+
+    for seed, plies in ((1, 3), (7, 12)):
+        rng = random.Random(seed)
+        board = ConnectFourBoard()
+        for _ in range(plies):
+            board.drop_piece(rng.choice(board.get_valid_moves()))
+        _, root = decision(board, 2, use_expected_minimax=True)
+        assert root.score == reference_expectimax(board, 2, True)
+
+# --- Tree capture levels ---
+
+def principal_line(node_dict: dict) -> list:
+    """(move, score, depth) along best_child links from a serialized node."""
+    line = []
+    while True:
+        line.append((node_dict["move"], node_dict["score"], node_dict["depth"]))
+        if node_dict["best_child"] is None:
+            return line
+        node_dict = node_dict["children"][node_dict["best_child"]]
+
+def test_tree_capture_levels():
+    """Each capture level keeps the move and holds its slice of the full tree."""
+    rng = random.Random(5)
+    board = ConnectFourBoard()
+    for _ in range(6):
+        board.drop_piece(rng.choice(board.get_valid_moves()))
+    for driver in ({}, {"use_pvs": True}, {"use_expected_minimax": True}):
+        move, full = decision(board, 3, context=SearchContext(), **driver)
+        full = full.to_dict()
+
+        none = SearchContext(capture="none")
+        assert decision(board, 3, context=none, **driver) == (move, None)
+        assert none.score == full["score"]
+        assert len(none.tree) == 0
+
+        pv_move, pv = decision(board, 3, context=SearchContext(capture="pv"), **driver)
+        pv = pv.to_dict()
+        assert pv_move == move
+        assert principal_line(pv) == principal_line(full)
+        assert len(pv["children"]) == 1
+
+        _, top = decision(board, 3, context=SearchContext(capture=1), **driver)
+        top = top.to_dict()
+        assert [child["score"] for child in top["children"]] == [child["score"] for child in full["children"]]
+        assert all(child["children"] == [] for child in top["children"])
+
+def test_tree_capture_rejects_unknown_level():
+    for level in ("all", -1, True):
+        with pytest.raises(ValueError):
+            SearchContext(capture=level)
+
+def test_symmetric_root_searches_mirrored_moves_once():
+    board = ConnectFourBoard()
+    board.drop_piece(3)
+    context = SearchContext()
+    move, root = decision(board, 3, context=context)
+    assert context.nodes == 1 + 4 * (1 + 7 + 49)
+    children = root.children
+    assert [child.move for child in children] == list(range(7))
+    for child in children:
+        twin = children[6 - child.move]
+        assert child.score == twin.score
+        assert child.board_str == ConnectFourBoard.board_from_string(twin.board_str).mirror().__str__()
+    # A lopsided position is searched in full
+    board.drop_piece(0)
+    context = SearchContext()
+    decision(board, 3, context=context)
+    assert context.nodes == 1 + 7 * (1 + 7 + 49)
+
+@pytest.mark.parametrize("options", [{}, {"use_alpha_beta": True}, {"use_pvs": True}, {"use_mtdf": True}])
+def test_mirror_searched_on_a_shared_table_picks_the_fresh_move(options):
+    # The root's table entry may come from its reflection, whose tied best
+    # move reflected back is not the leftmost one
+    for seed in range(40):
+        rng = random.Random(seed)
+        board = ConnectFourBoard()
+        for _ in range(rng.randrange(2, 14)):
+            board.drop_piece(rng.choice(board.get_valid_moves()))
+        mirror = board.mirror()
+        fresh = SearchContext(table=TranspositionTable())
+        expected = decision(mirror, 4, context=fresh, **options)[0]
+        table = TranspositionTable()
+        decision(board, 4, context=SearchContext(table=table), **options)
+        shared = SearchContext(table=table)
+        assert decision(mirror, 4, context=shared, **options)[0] == expected, seed
+        assert shared.score == fresh.score
+
+# --- Tracing and counters ---
+
+def test_search_is_silent_and_counts_leaves(capsys):
+    board = ConnectFourBoard()
+    board.drop_piece(2)
+    context = SearchContext(table=TranspositionTable())
+    decision(board, 4, use_alpha_beta=True, context=context)
+    assert capsys.readouterr().out == ""
+    stats = context.stats()
+    assert 0 < stats["leaves"] < stats["nodes"]
+    assert stats["max_depth"] == 4 and stats["elapsed_s"] > 0
+    assert stats["table"]["hits"] == context.table.hits
+
+def test_tracer_hears_every_leaf_and_the_decision():
+    board = ConnectFourBoard()
+    board.drop_piece(2)
+    recorder = TraceRecorder()
+    context = SearchContext()
+    context.trace = recorder
+    move, root = decision(board, 2, context=context)
+    assert recorder.count(LEAF) == context.leaves == 49
+    assert recorder.count(MOVE) == 7 + 49
+    assert recorder.events[-1] == (DECISION, 0, move, root.score)
+
+def test_tracing_can_be_switched_off_at_run_time(monkeypatch):
+    monkeypatch.setattr(tracing, "TRACING", False)
+    recorder = TraceRecorder()
+    context = SearchContext()
+    context.trace = recorder
+    decision(ConnectFourBoard(), 2, use_alpha_beta=True, context=context)
+    assert recorder.events == [] and context.leaves > 0
+
+# --- Progress reports and cancellation ---
+
+def test_on_iteration_reports_each_depth():
+    """A progress callback makes decision() deepen and hears about every iteration."""
+    board = ConnectFourBoard()
+    board.drop_piece(3)
+    reports = []
+    context = SearchContext(table=TranspositionTable())
+    context.on_iteration = lambda depth, move, score: reports.append((depth, move, score))
+    move, root = decision(board, 4, use_alpha_beta=True, context=context)
+    assert [depth for depth, _, _ in reports] == [1, 2, 3, 4]
+    assert reports[-1] == (4, move, root.score)
+    assert decision(board, 4, use_alpha_beta=True)[0] == move
+
+def test_cancel_keeps_deepest_finished_iteration():
+    board = ConnectFourBoard()
+    reports = []
+    context = SearchContext()
+
+    def report(depth, move, score):
+        reports.append((depth, move, score))
+        if depth == 2:
+            context.cancel()
+
+    context.on_iteration = report
+    move, root = decision(board, 8, context=context)
+    assert context.cancelled and context.depth_reached == 2
+    assert reports[-1] == (2, move, root.score)
@@ -0,0 +1,53 @@
+from src.models.bitboard import BitBoard
+from src.algorithms.minimax import decision
+from src.algorithms.search_context import SearchContext
+from src.algorithms.transposition import TranspositionTable
+from src.algorithms.move_ordering import (MoveOrdering, CenterOrdering, HeuristicOrdering,
+                                          center_ranks)
+from helpers import random_position
+
+def test_center_out_order():
+    """Columns are ranked from the center outwards, left before right."""
+    ranks = center_ranks(7)
+    assert sorted(range(7), key=ranks.__getitem__) == [3, 2, 4, 1, 5, 0, 6]
+    board = BitBoard()
+    assert CenterOrdering().order(board, board.get_valid_moves(), 0, hash_move=6) == [6, 3, 2, 4, 1, 5, 0]
+    assert MoveOrdering().order(board, board.get_valid_moves(), 0, hash_move=6) == [6, 0, 1, 2, 3, 4, 5]
+
+def test_killers_and_history():
+    """Hash move, then killers for the ply, then history with center-out ties."""
+    board = BitBoard()
+    ordering = HeuristicOrdering()
+    ordering.cutoff(board, 0, 2, 3)
+    ordering.cutoff(board, 6, 2, 1)
+    ordering.cutoff(board, 5, 4, 2)
+    assert ordering.killers[2] == [6, 0]
+    assert ordering.order(board, board.get_valid_moves(), 2, hash_move=1) == [1, 6, 0, 5, 3, 2, 4]
+    # Other plies only see the history table
+    assert ordering.order(board, board.get_valid_moves(), 3) == [0, 5, 6, 3, 2, 4, 1]
+
+    ordering.new_search()
+    assert ordering.killers == []
+    assert ordering.history == {(1, 0): 4, (1, 5): 2}
+
+def test_ordering_keeps_decision():
+    """Ordered alpha-beta answers the same move and score as plain minimax."""
+    for seed, plies in ((2, 3), (5, 8), (9, 14), (11, 20)):
+        board = random_position(seed, plies)
+        expected_move, expected_root = decision(board, 4)
+        for ordering in (MoveOrdering(), CenterOrdering(), HeuristicOrdering()):
+            context = SearchContext(table=TranspositionTable(), ordering=ordering)
+            move, root = decision(board, 4, use_alpha_beta=True, context=context)
+            assert (move, root.score) == (expected_move, expected_root.score)
+
+def test_ordering_reduces_nodes():
+    """Killer/history ordering searches fewer nodes and reports first-move cutoffs."""
+    board = random_position(7, 6)
+    plain = SearchContext(table=TranspositionTable(), ordering=MoveOrdering())
+    ordered = SearchContext(table=TranspositionTable(), ordering=HeuristicOrdering())
+    decision(board, 6, use_alpha_beta=True, context=plain)
+    decision(board, 6, use_alpha_beta=True, context=ordered)
+    assert ordered.nodes < plain.nodes
+    assert 0 < ordered.first_move_cutoffs <= ordered.cutoffs
+    assert ordered.first_move_cutoff_rate() >= plain.first_move_cutoff_rate()
+    assert ordered.stats()["first_move_cutoffs"] == ordered.first_move_cutoffs
@@ -0,0 +1,39 @@
+from src.models.board import ConnectFourBoard
+from src.models.node import TreeNode
+from src.algorithms.minimax import decision
+from src.algorithms.search_context import SearchContext
+
+def count_nodes(tree: dict) -> int:
+    return 1 + sum(count_nodes(child) for child in tree["children"])
+
+def test_best_child_is_an_index():
+    """best_child points into children instead of embedding a copy."""
+    root = TreeNode(score=5, player=2)
+    left, right = TreeNode(score=1, player=1, depth=1), TreeNode(score=5, player=1, depth=1)
+    root.add_child(left)
+    root.add_child(right)
+    root.set_best_child(right)
+    left.move, right.move = 0, 1
+    tree = root.to_dict()
+    assert tree["best_child"] == 1
+    assert root.get_best_child().index == right.index
+    # Labels set after add_child() show up because serialization happens at the end
+    assert [child["move"] for child in tree["children"]] == [0, 1]
+
+def test_relabel_shares_the_subtree():
+    node = TreeNode(move=2, score=3, player=1, depth=1)
+    node.add_child(TreeNode(score=3, player=2, depth=2))
+    copy = node.relabel(4)
+    assert (node.move, copy.move) == (2, 4)
+    assert [child.index for child in copy.children] == [child.index for child in node.children]
+    assert copy.to_dict()["children"] == node.to_dict()["children"]
+
+def test_search_tree_best_child_follows_the_move():
+    board = ConnectFourBoard()
+    # Without a table, so no transposition (mirrored ones included) cuts the tree short
+    move, root = decision(board, 3, context=SearchContext())
+    tree = root.to_dict()
+    best = tree["children"][tree["best_child"]]
+    assert best["move"] == move
+    assert best["score"] == tree["score"]
+    assert count_nodes(tree) == 1 + 7 + 49 + 343
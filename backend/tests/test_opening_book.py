@@ -0,0 +1,73 @@
+import pytest
+from src.algorithms import search_pool
+from src.algorithms.minimax import decision
+from src.algorithms.opening_book import OpeningBook, build_book, write_book
+from src.algorithms.search_context import SearchContext, CAPTURE_NONE, CAPTURE_PV
+from src.algorithms.transposition import TranspositionTable
+from src.algorithms.move_ordering import HeuristicOrdering
+from helpers import position, move_value
+
+@pytest.fixture(scope="module")
+def book(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("book") / "book.bin")
+    write_book(path, build_book(plies=3, depth=3), plies=3)
+    book = OpeningBook(path)
+    yield book
+    book.close()
+
+def search(board, k, book=None, capture=CAPTURE_NONE, **options):
+    context = SearchContext(table=TranspositionTable(), ordering=HeuristicOrdering(), capture=capture)
+    context.book = book
+    result = decision(board, k, use_alpha_beta=True, context=context, **options)
+    return result, context
+
+# Positions as the book searched them: the engine opens in column 3 at depth 3,
+# and the opponent's replies are visited from the left
+@pytest.mark.parametrize("moves", ["", "0", "1", "3", "30", "33"])
+def test_book_answers_as_the_search_would(book, moves):
+    board = position(moves)
+    (move, _), context = search(board, 3, book)
+    (expected, _), searched = search(board, 3)
+    assert context.book_hit and context.nodes == 0
+    assert (move, context.score, context.depth_reached) == (expected, searched.score, 3)
+
+@pytest.mark.parametrize("moves", ["4", "5", "6", "34", "35", "36"])
+def test_reflections_get_a_move_as_good_as_the_search(book, moves):
+    board = position(moves)
+    (move, _), context = search(board, 3, book)
+    (left, _), left_context = search(position("".join(str(6 - int(col)) for col in moves)), 3, book)
+    assert context.book_hit and left_context.book_hit and move == 6 - left
+    _, searched = search(board, 3)
+    assert context.score == searched.score == move_value(board, move, 3)
+
+def test_deeper_requests_and_unknown_positions_are_searched(book):
+    _, context = search(position("0"), 4, book)
+    assert not context.book_hit and context.nodes > 0
+    _, context = search(position("0123"), 2, book)
+    assert not context.book_hit and context.stats()["book_hit"] is False
+
+def test_book_answer_has_a_root_only_tree(book):
+    (move, root), context = search(position(""), 2, book, capture=CAPTURE_PV)
+    assert context.book_hit and root.move == move and root.children == []
+
+def test_expectimax_does_not_use_the_book(book):
+    context = SearchContext(capture=CAPTURE_NONE)
+    context.book = book
+    decision(position(""), 2, use_expected_minimax=True, context=context)
+    assert not context.book_hit and context.nodes > 0
+
+def test_requests_use_the_book_named_by_the_environment(book, monkeypatch):
+    monkeypatch.setenv("OPENING_BOOK", book.path)
+    monkeypatch.setattr(search_pool, "_book", None)
+    request = {"board": position("").board.tolist(), "current_player": 1, "algorithm": "pvs", "depth": 3}
+    context = search_pool.request_context(request)
+    assert context.book.path == book.path
+    move, _ = search_pool.run_request(request, context)
+    assert context.book_hit and context.stats()["book_hit"]
+    assert search_pool.request_context(dict(request, algorithm="expectimax")).book is None
+
+def test_other_files_are_refused(tmp_path):
+    path = tmp_path / "not_a_book.bin"
+    path.write_bytes(b"not a book at all")
+    with pytest.raises(ValueError):
+        OpeningBook(str(path))
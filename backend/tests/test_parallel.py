@@ -0,0 +1,51 @@
+import json
+import pytest
+from src.models.board import ConnectFourBoard
+from src.algorithms import parallel
+from src.algorithms.minimax import decision
+from src.algorithms.search_context import SearchContext, CAPTURE_PV
+from src.algorithms.transposition import TranspositionTable
+from src.algorithms.move_ordering import HeuristicOrdering
+
+@pytest.fixture(scope="module")
+def board():
+    board = ConnectFourBoard()
+    for col in (3, 3, 2, 4):
+        board.drop_piece(col)
+    yield board
+    parallel.shutdown()
+
+def tree(result) -> str:
+    return json.dumps(result[1].to_dict())
+
+@pytest.mark.parametrize("options", [{}, {"use_expected_minimax": True}])
+def test_root_split_builds_the_same_tree(board, options):
+    serial, split = SearchContext(), SearchContext()
+    expected = decision(board, 3, context=serial, **options)
+    result = decision(board, 3, context=split, workers=2, **options)
+    assert result[0] == expected[0] and split.score == serial.score
+    assert tree(result) == tree(expected)
+    assert split.stats()["parallel"]["mode"] == "root_split"
+
+def test_root_split_principal_variation(board):
+    serial, split = SearchContext(capture=CAPTURE_PV), SearchContext(capture=CAPTURE_PV)
+    assert tree(decision(board, 4, context=split, workers=2)) == tree(decision(board, 4, context=serial))
+
+@pytest.mark.parametrize("options", [{"use_alpha_beta": True}, {"use_pvs": True}, {"use_mtdf": True}])
+def test_lazy_smp_answers_like_one_process(board, options):
+    serial = SearchContext(table=TranspositionTable(), ordering=HeuristicOrdering())
+    shared = SearchContext(table=TranspositionTable(), ordering=HeuristicOrdering())
+    move, _ = decision(board, 5, context=serial, **options)
+    assert decision(board, 5, context=shared, workers=2, **options)[0] == move
+    assert shared.score == serial.score
+    assert shared.parallel["mode"] == "lazy_smp" and shared.parallel["workers"] == 2
+
+def test_root_split_deepens_within_budget(board):
+    context = SearchContext()
+    move, _ = decision(board, 42, context=context, workers=2, time_ms=300)
+    assert 1 <= context.depth_reached < 42
+    assert move in board.get_valid_moves()
+
+def test_measure_speedup_compares_results(board):
+    report = parallel.measure_speedup(board, 4, 2, use_alpha_beta=True)
+    assert report["same_result"] and report["speedup"] > 0
@@ -0,0 +1,36 @@
+import math
+import pytest
+from src.perft import BACKENDS, perft, perft_table, start_position, main
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_every_sequence_is_legal_until_a_column_fills(backend):
+    board = start_position(backend)
+    result = perft(board, 4)
+    assert result.nodes == [7, 49, 343, 2401] and result.terminal == [0] * 4
+    assert board.get_valid_moves() == list(range(7)) and board.hash == 0
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_published_counts(backend):
+    # Classic rules: the first four can come at ply 7
+    result = perft_table(start_position(backend), 7, "four")
+    assert result.nodes == [7, 49, 343, 2401, 16807, 117649, 823536]
+    assert result.terminal[-1] == 13032
+
+def test_table_matches_plain_count():
+    for rules in ("full", "four"):
+        for backend in BACKENDS:
+            board = start_position(backend, "1", width=5, height=4)
+            expected = perft(board, 6, rules)
+            assert perft_table(board, 6, rules) == expected
+            assert perft_table(board, 6, rules, mirror=False) == expected
+
+def test_whole_game_on_a_small_board():
+    # Every way to fill a 4x4 board: 16! / (4!)^4 move orders, all ending at ply 16
+    result = perft_table(start_position("bitboard", width=4, height=4), 16)
+    assert result.leaves == result.terminal[-1] == math.factorial(16) // math.factorial(4) ** 4
+    assert sum(result.terminal[:-1]) == 0
+
+def test_cli_checks_backends_against_each_other(capsys):
+    assert main(["3", "--moves", "3324"]) == 0
+    rows = [line.split() for line in capsys.readouterr().out.splitlines()]
+    assert ["3", "343", "0"] in rows
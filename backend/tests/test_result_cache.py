@@ -0,0 +1,67 @@
+import numpy as np
+from src.models.result_cache import ResultCache
+from src.models.tree_cache import TreeCache
+from src.algorithms.minimax import decision
+from src.algorithms.search_context import SearchContext
+from helpers import position, move_value
+
+def test_deeper_result_answers_shallower_depth():
+    cache = ResultCache()
+    board = position("33")
+    cache.put(board.board, 1, "alphabeta", 2, 5, 40, stats={"nodes": 123, "depth": 5})
+    hit = cache.get(board.board, 1, "alphabeta", 4)
+    assert (hit["move"], hit["stats"]) == (2, {"nodes": 123, "depth": 5})
+    assert cache.get(board.board, 1, "alphabeta", 6) is None
+    assert cache.get(board.board, 2, "alphabeta", 4) is None
+    assert cache.get(board.board, 1, "minimax", 4) is None
+    # A shallower result does not replace a deeper one
+    cache.put(board.board, 1, "alphabeta", 4, 3, 10)
+    assert cache.get(board.board, 1, "alphabeta", 5)["depth"] == 5
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 3
+
+def test_least_recently_used_position_is_dropped():
+    cache = ResultCache(max_entries=2)
+    boards = [position(col).board for col in "012"]
+    cache.put(boards[0], 2, "minimax", 0, 4, 0)
+    cache.put(boards[1], 2, "minimax", 1, 4, 0)
+    assert cache.get(boards[0], 2, "minimax", 4) is not None
+    cache.put(boards[2], 2, "minimax", 2, 4, 0)
+    assert len(cache) == 2
+    assert cache.get(boards[1], 2, "minimax", 4) is None
+    assert cache.get(boards[0], 2, "minimax", 4) is not None
+
+def test_mirrored_lookup_reflects_the_move():
+    board = position("131")
+    reflection = position("535")
+    context = SearchContext()
+    move, _ = decision(board, 4, context=context)
+    cache = ResultCache(mirror=True)
+    cache.put(board.board, board.current_player, "minimax", move, 4, context.score)
+    hit = cache.get(reflection.board, reflection.current_player, "minimax", 4)
+    assert hit["mirrored"] and hit["move"] == 6 - move
+    # The reflected move is as good as the one a search of the reflection picks
+    reflected = SearchContext()
+    decision(reflection, 4, context=reflected)
+    assert hit["score"] == reflected.score
+    assert move_value(reflection, hit["move"], 4) == reflected.score
+    assert ResultCache().get(reflection.board, reflection.current_player, "minimax", 4) is None
+
+def test_tree_requests_need_their_tree():
+    trees = TreeCache()
+    cache = ResultCache(mirror=True, trees=trees)
+    board = position("3")
+    _, root = decision(board, 2)
+    tree_id = trees.put(root)
+    cache.put(board.board, 2, "minimax", root.move, 2, root.score, "full", tree_id)
+    assert cache.get(board.board, 2, "minimax", 2, "full")["tree_id"] == tree_id
+    assert cache.get(board.board, 2, "minimax", 1, "full") is None
+    assert cache.get(board.board, 2, "minimax", 2, "pv") is None
+    assert cache.get(board.board, 2, "minimax", 1)["tree_id"] is None
+    trees.trees.clear()
+    assert cache.get(board.board, 2, "minimax", 2, "full") is None
+
+def test_disabled_cache_keeps_nothing():
+    cache = ResultCache(max_entries=0)
+    board = np.zeros((6, 7), dtype=int)
+    cache.put(board, 1, "minimax", 3, 4, 0)
+    assert len(cache) == 0 and cache.get(board, 1, "minimax", 4) is None
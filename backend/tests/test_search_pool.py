@@ -0,0 +1,163 @@
+import asyncio
+import random
+import time
+import pytest
+from src.algorithms.minimax import decision
+from src.algorithms.search_pool import (SearchPool, PoolBusy, SearchDeadlineExceeded, WorkerCrashed,
+                                        request_context, run_request)
+from src.models.board import ConnectFourBoard
+from helpers import SlowListeners
+
+def request(**fields) -> dict:
+    body = {"board": ConnectFourBoard().board.tolist(), "current_player": 1,
+            "algorithm": "alphabeta", "depth": 4, "tree": "pv"}
+    body.update(fields)
+    return body
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = SearchPool(workers=1, max_pending=2, deadline_s=5)
+    yield pool
+    pool.shutdown()
+
+def test_run_request_matches_decision():
+    context = request_context(request(algorithm="pvs"))
+    move, root = run_request(request(algorithm="pvs"), context)
+    expected_move, expected_root = decision(ConnectFourBoard(), 4, use_pvs=True)
+    assert (move, root.score) == (expected_move, expected_root.score)
+
+def test_pool_answers_like_decision(pool):
+    result = asyncio.run(pool.run(request()))
+    move, root = decision(ConnectFourBoard(), 4, use_alpha_beta=True)
+    assert (result["move"], result["score"]) == (move, root.score)
+    assert result["root"].to_dict()["score"] == root.score
+    assert not result["cancelled"]
+    assert result["stats"]["nodes"] == result["nodes"] and result["stats"]["leaves"] > 0
+
+def test_progress_and_cancellation(pool):
+    async def search():
+        reports = []
+        cancelled = asyncio.Event()
+
+        def on_iteration(report):
+            reports.append(report)
+            cancelled.set()
+
+        result = await pool.run(request(algorithm="minimax", depth=12, tree="none"),
+                                on_iteration=on_iteration, cancelled=cancelled)
+        return reports, result
+
+    reports, result = asyncio.run(search())
+    assert result["cancelled"] and result["move"] is not None
+    assert reports[0]["depth"] == 1
+    assert result["depth"] < 12
+
+def test_every_iteration_report_arrives_before_the_answer(pool, monkeypatch):
+    monkeypatch.setattr(pool, "listeners", SlowListeners())
+
+    async def search():
+        reports = []
+        result = await pool.run(request(depth=5, tree="none"), on_iteration=reports.append)
+        return [report["depth"] for report in reports], result
+
+    # The answer overtakes the reports, which come through the progress queue
+    for _ in range(3):
+        depths, result = asyncio.run(search())
+        assert depths == [1, 2, 3, 4, 5] and result["depth"] == 5
+
+def test_batch_answers_every_position_on_the_shared_table(pool):
+    openings = [[], [3], [3, 3], [2, 4], [3, 3, 3]]
+    bodies = []
+    for moves in openings:
+        board = ConnectFourBoard()
+        for col in moves:
+            board.drop_piece(col)
+        bodies.append(request(board=board.board.tolist(), current_player=board.current_player, tree="none"))
+
+    async def collect():
+        return [item async for item in pool.run_batch(bodies)]
+
+    results = dict(asyncio.run(collect()))
+    assert sorted(results) == list(range(len(openings)))
+    for index, moves in enumerate(openings):
+        board = ConnectFourBoard()
+        for col in moves:
+            board.drop_piece(col)
+        context = request_context(bodies[index])
+        move, _ = decision(board, 4, use_alpha_beta=True, context=context)
+        assert (results[index]["move"], results[index]["score"]) == (move, context.score)
+
+def test_batches_answer_as_single_requests_on_mirrored_and_tied_positions(pool):
+    # Each position is followed by its reflection, which meets the position's
+    # entries in the table; where moves tie, the leftmost must still win
+    bodies = []
+    for seed in range(12):
+        rng = random.Random(seed)
+        board = ConnectFourBoard()
+        for _ in range(rng.randrange(2, 14)):
+            board.drop_piece(rng.choice(board.get_valid_moves()))
+        for position in (board, board.mirror()):
+            bodies.append(request(board=position.board.tolist(), current_player=position.current_player,
+                                  algorithm=("alphabeta", "pvs", "mtdf")[seed % 3], tree="none"))
+
+    async def compare():
+        singles = [await pool.run(body) for body in bodies]
+        # The second batch also meets the first one's entries
+        for _ in range(2):
+            async for index, result in pool.run_batch(bodies):
+                assert (result["move"], result["score"]) == (singles[index]["move"], singles[index]["score"]), index
+
+    asyncio.run(compare())
+
+def test_pool_refuses_work_beyond_max_pending(pool):
+    async def flood():
+        return await asyncio.gather(*[pool.run(request(depth=1)) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(flood())
+    assert sum(isinstance(result, PoolBusy) for result in results) == 1
+
+def test_fixed_depth_search_fails_at_deadline():
+    pool = SearchPool(workers=1, deadline_s=0.2)
+    try:
+        with pytest.raises(SearchDeadlineExceeded):
+            asyncio.run(pool.run(request(algorithm="minimax", depth=12, tree="none")))
+    finally:
+        pool.shutdown()
+
+def search_killing_workers(pool: SearchPool, kills: int):
+    """Search, killing the pool's workers each time the search reports depth 1, up to ``kills`` times."""
+    reports = []
+
+    def on_iteration(report):
+        nonlocal kills
+        reports.append(report["depth"])
+        if report["depth"] == 1 and kills:
+            kills -= 1
+            for process in list(pool.executor._processes.values()):
+                process.kill()
+
+    return reports, pool.run(request(depth=12, time_ms=500, tree="none"), on_iteration=on_iteration)
+
+def test_search_whose_worker_died_runs_again_on_a_new_executor():
+    pool = SearchPool(workers=1, max_pending=2, deadline_s=5)
+    try:
+        reports, search = search_killing_workers(pool, 1)
+        result = asyncio.run(search)
+        assert result["move"] is not None and not result["cancelled"]
+        assert pool.restarts == 1 and reports.count(1) == 2
+        assert pool.pending() == 0
+    finally:
+        pool.shutdown()
+
+def test_search_whose_worker_dies_twice_fails_alone():
+    pool = SearchPool(workers=1, max_pending=2, deadline_s=5)
+    try:
+        _, search = search_killing_workers(pool, 2)
+        with pytest.raises(WorkerCrashed):
+            asyncio.run(search)
+        assert pool.restarts == 2 and pool.pending() == 0
+        # The pool goes on answering
+        result = asyncio.run(pool.run(request(depth=2)))
+        assert result["move"] is not None
+    finally:
+        pool.shutdown()
@@ -0,0 +1,104 @@
+import random
+from src.models.board import ConnectFourBoard
+from src.models.bitboard import BitBoard
+from src.models.zobrist import hash_array
+from src.algorithms.minimax import decision
+from src.algorithms.search_context import SearchContext
+from src.algorithms.transposition import TranspositionTable, EXACT, LOWER
+from helpers import random_position
+
+def test_incremental_hash_matches_recomputed():
+    """Hashes kept up to date by moves equal a from-scratch hash on both backends."""
+    rng = random.Random(3)
+    board = ConnectFourBoard()
+    bitboard = BitBoard()
+    while board.get_valid_moves():
+        move = rng.choice(board.get_valid_moves())
+        board.play(move)
+        bitboard.play(move)
+        assert board.hash == hash_array(board.board)
+        assert bitboard.hash == board.hash
+    while board.move_stack:
+        board.undo()
+        bitboard.undo()
+        assert board.hash == bitboard.hash == hash_array(board.board)
+    assert board.hash == 0
+
+def test_transposed_move_orders_share_a_hash():
+    """Different move orders reaching the same position hash the same."""
+    first, second = BitBoard(), BitBoard()
+    for move in (3, 2, 4, 5):
+        first.play(move)
+    for move in (4, 5, 3, 2):
+        second.play(move)
+    assert first.hash == second.hash
+
+def test_table_probe_and_replacement():
+    """Probes only match the same key and depth; deeper entries are kept."""
+    table = TranspositionTable(size=8)
+    table.store(5, 3, 120, EXACT, 2)
+    assert table.probe(5, 3)[2] == 120
+    assert table.probe(5, 2) is None
+    assert table.best_move(5) == 2
+
+    # Key 13 maps to the same slot; a shallower entry must not evict the deeper one
+    table.store(13, 1, -40, LOWER, 4)
+    assert table.probe(5, 3) is not None
+    assert table.probe(13, 1) is None
+
+    # After a new search, older entries are replaced regardless of depth
+    table.new_search()
+    table.store(13, 1, -40, LOWER, 4)
+    assert table.probe(13, 1)[3] == LOWER
+    assert table.hits == 3
+    assert table.misses == 2
+    assert table.replacements == 1
+
+def test_decision_matches_search_without_table():
+    """The table changes how many nodes are visited, not the move or score."""
+    # Depth 4 is the shallowest search where interior nodes transpose
+    for seed, plies in ((2, 11), (5, 18)):
+        board = random_position(seed, plies)
+        for use_alpha_beta in (False, True):
+            plain = SearchContext()
+            cached = SearchContext(table=TranspositionTable())
+            move, root = decision(board, 4, use_alpha_beta=use_alpha_beta, context=plain)
+            cached_move, cached_root = decision(board, 4, use_alpha_beta=use_alpha_beta, context=cached)
+            assert cached_move == move
+            assert cached_root.score == root.score
+            assert cached.nodes < plain.nodes
+            assert cached.table.hits > 0
+
+def test_reflected_positions_share_entries():
+    from src.algorithms.transposition import position_key, canonical_move
+    board, reflection = BitBoard(), BitBoard()
+    for col in (1, 3, 1):
+        board.play(col)
+        reflection.play(6 - col)
+    assert position_key(board, True) == position_key(reflection, True)
+    assert position_key(board, True) != position_key(board, False)
+    # A move stored for one orientation comes back reflected for the other
+    for move in range(7):
+        stored = canonical_move(board, move)
+        assert canonical_move(reflection, stored) == 6 - move
+        assert canonical_move(board, stored) == move
+
+def test_shared_table_round_trips_entries():
+    from multiprocessing.sharedctypes import RawArray
+    from src.algorithms.transposition import SharedTranspositionTable, UPPER
+    words = RawArray('Q', 16)
+    table = SharedTranspositionTable(words)
+    assert table.size == 8
+    table.store(5, 3, -120, LOWER, 2)
+    table.store(6, 4, 7, UPPER, None)
+    table.store(7, 1, 0.5, EXACT, 1)  # Not an integer score: left out
+    assert table.probe(5, 3) == (5, 3, -120, LOWER, 2, 0)
+    assert table.probe(6, 4) == (6, 4, 7, UPPER, None, 0)
+    assert table.probe(5, 2) is None and table.probe(7, 1) is None
+    # A second table over the same memory sees the entries, and a torn slot reads as a miss
+    other = SharedTranspositionTable(words)
+    assert other.best_move(5) == 2
+    words[2 * 5] ^= 1
+    assert other.probe(5, 3) is None
+    table.clear()
+    assert table.probe(6, 4) is None
@@ -0,0 +1,69 @@
+import random
+import pytest
+from src.models.board import ConnectFourBoard
+from src.models.tree_cache import TreeCache
+from src.algorithms.minimax import decision
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def searched_root(seed: int = 0, **driver):
+    rng = random.Random(seed)
+    board = ConnectFourBoard()
+    for _ in range(5):
+        board.drop_piece(rng.choice(board.get_valid_moves()))
+    _, root = decision(board, 3, **driver)
+    return root
+
+def test_node_views_match_full_tree():
+    """Walking the stored tree node by node gives the same nodes as to_dict()."""
+    for driver in ({}, {"use_pvs": True}, {"use_expected_minimax": True}):
+        root = searched_root(**driver)
+        cache = TreeCache()
+        stored = cache.get(cache.put(root))
+
+        pending = [([], root.to_dict())]
+        while pending:
+            path, expected = pending.pop()
+            view = stored.node(path)
+            assert view["path"] == path
+            assert view["best_child"] == expected["best_child"]
+            for key in ("move", "score", "player", "depth", "board"):
+                assert view[key] == expected[key]
+            assert len(view["children"]) == len(expected["children"])
+            for rank, (child, full) in enumerate(zip(view["children"], expected["children"])):
+                assert child["board"] == full["board"]
+                assert child["child_count"] == len(full["children"])
+                pending.append((path + [rank], full))
+
+def test_bad_path_raises_key_error():
+    cache = TreeCache()
+    stored = cache.get(cache.put(searched_root()))
+    for path in ([99], [0, -1]):
+        with pytest.raises(KeyError):
+            stored.node(path)
+
+def test_trees_expire_after_ttl():
+    clock = FakeClock()
+    cache = TreeCache(ttl=10, clock=clock)
+    tree_id = cache.put(searched_root())
+    clock.now = 9
+    assert cache.get(tree_id) is not None  # Reading keeps the tree alive
+    clock.now = 18
+    assert cache.get(tree_id) is not None
+    clock.now = 28.5
+    assert cache.get(tree_id) is None
+    assert len(cache) == 0
+
+def test_least_recently_used_tree_goes_first():
+    cache = TreeCache(max_trees=2)
+    root = searched_root()
+    first, second = cache.put(root), cache.put(root)
+    cache.get(first)
+    third = cache.put(root)
+    assert cache.get(second) is None
+    assert cache.get(first) is not None and cache.get(third) is not None
@@ -0,0 +1,71 @@
+import random
+from src.models.board import ConnectFourBoard
+from src.models.bitboard import BitBoard
+from src.models.node import TreeNode
+from src.models.tree_store import TreeStore
+from src.algorithms.minimax import decision, maximize
+from src.algorithms.search_context import SearchContext
+
+def boards_along_best_path(tree: dict) -> list:
+    boards = [tree["board"]]
+    while tree["best_child"] is not None:
+        tree = tree["children"][tree["best_child"]]
+        boards.append(tree["board"])
+    return boards
+
+def test_boards_rebuilt_from_move_path():
+    """Serialized boards match the positions the search actually visited."""
+    rng = random.Random(5)
+    board = ConnectFourBoard()
+    for _ in range(9):
+        board.drop_piece(rng.choice(board.get_valid_moves()))
+    move, root = decision(board, 3, use_alpha_beta=True)
+    tree = root.to_dict()
+    assert tree["board"] == str(board)
+
+    replay = BitBoard.from_board(board)
+    node = tree
+    for board_str in boards_along_best_path(tree)[1:]:
+        replay.play(node["children"][node["best_child"]]["move"])
+        node = node["children"][node["best_child"]]
+        assert board_str == str(replay)
+
+def test_store_without_shared_context_is_grafted():
+    """Nodes from private stores are copied into the parent's store on add_child()."""
+    board = ConnectFourBoard()
+    board.drop_piece(3)
+    _, private, _ = maximize(board, 2)
+    context = SearchContext()
+    _, shared, _ = maximize(board, 2, context=context)
+    assert private.to_dict() == shared.to_dict()
+    assert shared.store is context.tree
+
+def test_columns_are_compact():
+    """A depth 4 tree costs a few dozen bytes per node in the store."""
+    _, root = decision(ConnectFourBoard(), 4)
+    store = root.store
+    assert len(store) > 1000
+    assert store.nbytes() / len(store) <= 28
+    # Only the search root keeps a full board
+    assert list(store.boards) == [root.index]
+
+def test_scores_keep_their_type():
+    store = TreeStore()
+    node = TreeNode(score=3, store=store)
+    other = TreeNode(score=2.5, store=store)
+    assert type(node.score) is int and other.score == 2.5
+    node.score = None
+    assert node.score is None
+
+def test_child_index_matches_children():
+    _, root = decision(ConnectFourBoard(), 3, use_expected_minimax=True)
+    store = root.store
+    starts, rows = store.child_index()
+    lists = store.children_lists()
+    assert all(rows[starts[row]:starts[row + 1]].tolist() == lists[row] for row in range(len(store)))
+
+def test_children_follow_sibling_links():
+    _, root = decision(ConnectFourBoard(), 3, use_expected_minimax=True)
+    store = root.store
+    lists = store.children_lists()
+    assert all(store.children(row) == lists[store.source(row)] for row in range(len(store)))
@@ -33,6 +33,18 @@ const Settings = ({ onStart }) => {
                     >
                         Minimax with Pruning
                     </button>
+                    <button 
+                        className={algorithm === 'pvs' ? 'active' : ''} 
+                        onClick={() => setAlgorithm('pvs')}
+                    >
+                        Principal Variation Search
+                    </button>
+                    <button 
+                        className={algorithm === 'mtdf' ? 'active' : ''} 
+                        onClick={() => setAlgorithm('mtdf')}
+                    >
+                        MTD(f)
+                    </button>
                     <button 
                         className={algorithm === 'expectimax' ? 'active' : ''} 
                         onClick={() => setAlgorithm('expectimax')}
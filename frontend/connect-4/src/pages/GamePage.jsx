@@ -122,7 +122,8 @@ function GamePage() {
                     ),
                     current_player: colorToNumber(currentPlayer),
                     algorithm: gameSettings.algorithm,
-                    depth: gameSettings.depth
+                    depth: gameSettings.depth,
+                    tree: 'full'  // The tree page shows the whole search tree
                 }),
             });
 
@@ -132,12 +133,11 @@ function GamePage() {
 
             const data = await response.json();
             const aiMove = data.move;
-            const treeRoot = data.root;
-            //////////////// For Testing
-            localStorage.setItem('tree', JSON.stringify(treeRoot));
+            // The tree stays on the server; the tree page loads it node by node
+            localStorage.setItem('treeId', data.tree_id);
 
             console.log('AI Move:', aiMove);
-            console.log('AI Tree Root:', treeRoot);
+            console.log('AI Tree Id:', data.tree_id);
 
             // Make the AI move
             const newTiles = tiles.map(row => [...row]);
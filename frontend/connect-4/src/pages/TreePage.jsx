@@ -2,6 +2,8 @@ import React, { useEffect, useState } from 'react';
 import Tree from 'react-d3-tree';
 import '../App.css';
 
+const API_URL = 'http://localhost:8000';
+
 // Util: Convert board string to 2D array
 function parseBoardString(boardStr) {
     const lines = boardStr.trim().split('\n');
@@ -15,15 +17,38 @@ function parseBoardString(boardStr) {
     return board;
 }
 
-// Util: Convert raw node to d3-tree-compatible node
+// Util: Convert raw node to d3-tree-compatible node; children arrive with
+// their own child count only and are loaded when clicked
 function convertToTreeNode(aiNode) {
     return {
         name: `Move ${aiNode.move ?? '-'} | Player${aiNode.player} | Score: ${aiNode.score}`,
-        board: parseBoardString(aiNode.board),
+        board: aiNode.board ? parseBoardString(aiNode.board) : null,
+        path: aiNode.path,
+        childCount: aiNode.child_count,
         children: aiNode.children?.map(convertToTreeNode) || []
     };
 }
 
+// Util: Copy of the tree with the node at path given new children
+function withChildren(node, path, children) {
+    if (path.length === 0) {
+        return { ...node, children };
+    }
+    const [rank, ...rest] = path;
+    return {
+        ...node,
+        children: node.children.map((child, i) => i === rank ? withChildren(child, rest, children) : child)
+    };
+}
+
+async function fetchNode(treeId, path) {
+    const response = await fetch(`${API_URL}/ai/tree/${treeId}/node/${path.join('/')}`);
+    if (!response.ok) {
+        throw new Error(response.status === 404 ? 'Tree expired, make a new AI move' : 'Failed to load tree node');
+    }
+    return convertToTreeNode(await response.json());
+}
+
 const renderMiniBoard = (board) => (
     <table className="mini-board">
         <tbody>
@@ -38,30 +63,48 @@ const renderMiniBoard = (board) => (
     </table>
 );
 
-const renderCustomNode = ({ nodeDatum }) => (
+const renderCustomNode = (onExpand) => ({ nodeDatum }) => (
     <foreignObject width={220} height={160}>
-        <div style={{ border: '1px solid black', background: 'white', borderRadius: 4, padding: 4 , marginRight: 4}}>
+        <div onClick={() => onExpand(nodeDatum)}
+             style={{ border: '1px solid black', background: 'white', borderRadius: 4, padding: 4 , marginRight: 4,
+                      cursor: nodeDatum.childCount > 0 ? 'pointer' : 'default' }}>
             <h4 style={{ margin: 0 }}>{nodeDatum.name}</h4>
             {nodeDatum.board && renderMiniBoard(nodeDatum.board)}
+            {nodeDatum.childCount > 0 && nodeDatum.children.length === 0 &&
+                <small>{nodeDatum.childCount} children, click to expand</small>}
         </div>
     </foreignObject>
 );
 
 function TreeVisualizer() {
     const [treeData, setTreeData] = useState(null);
+    const [error, setError] = useState(null);
+    const treeId = localStorage.getItem('treeId');
 
     useEffect(() => {
-        const storedTree = localStorage.getItem('tree');
-        if (storedTree) {
-            try {
-                const parsed = JSON.parse(storedTree);
-                const tree = convertToTreeNode(parsed);
-                setTreeData(tree);
-            } catch (err) {
-                console.error('Failed to parse AI tree from localStorage:', err);
-            }
+        if (treeId) {
+            fetchNode(treeId, [])
+                .then(setTreeData)
+                .catch(err => {
+                    console.error('Failed to load AI tree:', err);
+                    setError(err.message);
+                });
+        }
+    }, [treeId]);
+
+    // Load a node's children the first time it is clicked
+    const expandNode = async (nodeDatum) => {
+        if (nodeDatum.childCount === 0 || nodeDatum.children.length > 0) {
+            return;
         }
-    }, []);
+        try {
+            const node = await fetchNode(treeId, nodeDatum.path);
+            setTreeData(tree => withChildren(tree, nodeDatum.path, node.children));
+        } catch (err) {
+            console.error('Failed to load AI tree node:', err);
+            setError(err.message);
+        }
+    };
 
     return (
         <div style={{ width: '100vw', height: '100vh' }}>
@@ -70,11 +113,12 @@ function TreeVisualizer() {
                 <Tree
                     data={treeData}
                     orientation="vertical"
-                    renderCustomNodeElement={renderCustomNode}
+                    renderCustomNodeElement={renderCustomNode(expandNode)}
                     nodeSize={{ x: 220, y: 200 }}
+                    collapsible={false}
                 />
             ) : (
-                <p>No tree data found in localStorage.</p>
+                <p>{error ?? 'No tree data found, make an AI move first.'}</p>
             )}
         </div>
     );